@@ -0,0 +1,449 @@
+"""
+Load Generator - Benchmark Suite for the SOA, RPC and REST Servers
+==================================================================
+Starts each server of the assignment locally, drives it with a configurable
+number of concurrent clients, request mix and payload size, and reports
+throughput, tail latency and server memory. Results can be saved as a
+baseline and later runs compared against it, so performance regressions
+show up as a failing exit code.
+
+Targets:
+- soa:  soa/server_interactive.py  (raw TCP, port 9000). The server handles
+        exactly one client connection and exits when it disconnects, so it
+        is always driven by a single client and restarted for every run.
+        Messages are not framed, so payloads are capped at SOA_MAX_PAYLOAD.
+- rpc:  rpc/server_interactive.py  (XML-RPC over HTTP/1.0, port 9001)
+- rest: rest/app.py                (Flask, HTTP/1.1 keep-alive, port 5201)
+
+Every run gets a fresh server process. Server output is discarded: all
+servers log every request to the console, which is part of what we measure.
+
+Request Mix (--mix, weights per operation; unknown names are ignored):
+- soa:  message
+- rpc:  greet, add, multiply, echo, info (get_server_info)
+- rest: get (GET /books/<id>), list (GET /books?limit=100),
+        create (POST /books), update (PUT /books/<id>), search
+`--payload N` sets the size of the variable part of each request: the SOA
+message, the RPC echo/greet text and the REST book title.
+
+Output (per target and concurrency level):
+- req/s and p50/p95/p99 latency in milliseconds, errors
+- server RSS at the end of the run and its peak (VmHWM), from /proc
+
+Usage:
+    python bench/loadgen.py                               # all targets
+    python bench/loadgen.py --targets rest --concurrency 1,10,50 --duration 5
+    python bench/loadgen.py --mix get=80,create=20 --payload 512
+    python bench/loadgen.py --json > results.json         # machine-readable
+    python bench/loadgen.py --save-baseline               # write bench/baseline.json
+    python bench/loadgen.py --baseline bench/baseline.json --tolerance 0.25
+Exit code 1 means a result regressed beyond the tolerance.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import xmlrpc.client
+
+HOST = '127.0.0.1'
+
+# HOST as it appears in /proc/net/tcp (little-endian hex)
+HOST_HEX = '0100007F'
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(ROOT, 'bench', 'baseline.json')
+
+# Port the REST server is started on (BOOKS_PORT)
+REST_PORT = 5201
+
+# The SOA server reads at most 1024 bytes per message
+SOA_MAX_PAYLOAD = 900
+
+# Default request mix per target: operation -> weight
+DEFAULT_MIXES = {
+    'soa': {'message': 1},
+    'rpc': {'greet': 2, 'add': 3, 'multiply': 3, 'echo': 2, 'info': 1},
+    'rest': {'get': 60, 'list': 15, 'create': 10, 'update': 10, 'search': 5}
+}
+
+# Server script and port of every target
+TARGETS = {
+    'soa': ('soa/server_interactive.py', 9000),
+    'rpc': ('rpc/server_interactive.py', 9001),
+    'rest': ('rest/app.py', REST_PORT)
+}
+
+
+# ----------------------------------------------------------------------
+# Servers
+# ----------------------------------------------------------------------
+
+def start_server(target):
+    """Start the server of `target` in a subprocess and wait until it accepts connections."""
+    script, port = TARGETS[target]
+    path = os.path.join(ROOT, script)
+    env = dict(os.environ, BOOKS_PORT=str(REST_PORT), BOOKS_STORE='memory')
+    server = subprocess.Popen([sys.executable, path], cwd=os.path.dirname(path), env=env,
+                              stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                              stderr=subprocess.DEVNULL)
+    if target == 'soa':
+        # Probing would use up the SOA server's only connection
+        wait_for_listen(server, port)
+    else:
+        wait_for_port(server, port)
+    return server
+
+
+def wait_for_port(server, port, timeout=15.0):
+    """Block until something accepts connections on `port`."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server for port {port} exited with code {server.returncode}")
+        try:
+            socket.create_connection((HOST, port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Server on port {port} did not start")
+
+
+def wait_for_listen(server, port, timeout=15.0):
+    """Block until `port` is in the LISTEN state, without connecting to it."""
+    listening = f"{HOST_HEX}:{port:04X} 00000000:0000 0A"
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server for port {port} exited with code {server.returncode}")
+        with open('/proc/net/tcp') as f:
+            if any(listening in line for line in f):
+                return
+        time.sleep(0.1)
+    raise RuntimeError(f"Server on port {port} did not start")
+
+
+def stop_server(server):
+    """Stop a server started by start_server()."""
+    if server.poll() is None:
+        server.terminate()
+        try:
+            server.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            server.kill()
+            server.wait()
+
+
+def memory_usage(pid):
+    """
+    Read a process's memory use from /proc.
+
+    Returns:
+        tuple: (current RSS, peak RSS) in megabytes, or (None, None) if
+        /proc isn't available (e.g. not on Linux) or the process is gone
+    """
+    values = {}
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in ('VmRSS', 'VmHWM'):
+                    values[key] = int(value.split()[0]) / 1024
+    except OSError:
+        pass
+    return values.get('VmRSS'), values.get('VmHWM')
+
+
+# ----------------------------------------------------------------------
+# Protocol clients
+# ----------------------------------------------------------------------
+
+async def read_http_response(reader):
+    """
+    Read one HTTP response.
+
+    Returns:
+        tuple: (status code, body bytes, True if the connection stays open)
+    """
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split()[1])
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            key, value = line.split(':', 1)
+            headers[key.strip().lower()] = value.strip()
+    if 'content-length' in headers:
+        body = await reader.readexactly(int(headers['content-length']))
+    else:
+        body = await reader.read()
+    keep_alive = (lines[0].startswith('HTTP/1.1') and 'content-length' in headers
+                  and headers.get('connection', '').lower() != 'close')
+    return status, body, keep_alive
+
+
+class Client:
+    """One simulated client: a connection (reopened as needed) and a request mix."""
+
+    def __init__(self, target, mix, payload, rng, shared):
+        self.target = target
+        self.port = TARGETS[target][1]
+        self.ops = list(mix)
+        self.weights = [mix[op] for op in self.ops]
+        self.text = 'x' * payload
+        self.rng = rng
+        self.shared = shared  # State shared by all clients (known book IDs)
+        self.reader = self.writer = None
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(HOST, self.port)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+    async def request(self):
+        """Send one request picked from the mix; raises on any failure."""
+        op = self.rng.choices(self.ops, self.weights)[0]
+        if self.writer is None:
+            await self.connect()
+        await getattr(self, f'{self.target}_request')(op)
+
+    async def soa_request(self, op):
+        self.writer.write(self.text.encode('utf-8'))
+        await self.writer.drain()
+        if not await self.reader.read(65536):
+            raise ConnectionError("SOA server closed the connection")
+
+    async def rpc_request(self, op):
+        method, params = {
+            'greet': ('greet', (self.text,)),
+            'add': ('add', (self.rng.randint(0, 1000), self.rng.randint(0, 1000))),
+            'multiply': ('multiply', (self.rng.randint(0, 1000), self.rng.randint(0, 1000))),
+            'echo': ('echo', (self.text,)),
+            'info': ('get_server_info', ())
+        }[op]
+        body = xmlrpc.client.dumps(params, method).encode('utf-8')
+        if b'<fault>' in await self.http('POST', '/RPC2', body, 'text/xml'):
+            raise RuntimeError(f"XML-RPC fault from {method}")
+
+    async def rest_request(self, op):
+        ids = self.shared['ids']
+        if op == 'get':
+            await self.http('GET', f'/books/{self.rng.choice(ids)}')
+        elif op == 'list':
+            await self.http('GET', '/books?limit=100')
+        elif op == 'search':
+            await self.http('GET', '/books/search?q=dist')
+        elif op == 'create':
+            book = {"title": self.text, "author": f"Author {self.rng.randint(1, 100)}",
+                    "price": round(self.rng.uniform(5, 150), 2)}
+            body = await self.http('POST', '/books', json.dumps(book).encode(), 'application/json')
+            ids.append(json.loads(body)['id'])
+        elif op == 'update':
+            body = json.dumps({"price": round(self.rng.uniform(5, 150), 2)}).encode()
+            await self.http('PUT', f'/books/{self.rng.choice(ids)}', body, 'application/json')
+
+    async def http(self, method, path, body=b'', content_type=None):
+        """Send one HTTP request on the client's connection and return the response body."""
+        headers = f"{method} {path} HTTP/1.1\r\nHost: {HOST}:{self.port}\r\n"
+        if content_type:
+            headers += f"Content-Type: {content_type}\r\n"
+        if body or method in ('POST', 'PUT'):
+            headers += f"Content-Length: {len(body)}\r\n"
+        self.writer.write(headers.encode('latin-1') + b'\r\n' + body)
+        await self.writer.drain()
+        status, response, keep_alive = await read_http_response(self.reader)
+        if not keep_alive:
+            self.close()
+        if status >= 400:
+            raise RuntimeError(f"HTTP {status} for {method} {path}")
+        return response
+
+
+# ----------------------------------------------------------------------
+# Load
+# ----------------------------------------------------------------------
+
+async def client_loop(client, deadline, latencies, errors):
+    """Send requests back to back until the deadline, recording each latency."""
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            await client.request()
+            latencies.append(time.perf_counter() - start)
+        except (OSError, RuntimeError, ValueError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            errors.append(1)
+            client.close()
+            await asyncio.sleep(0.01)
+
+
+def percentile(sorted_values, fraction):
+    """Return the value at `fraction` (0-1) of an already sorted list."""
+    if not sorted_values:
+        return float('nan')
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+async def run_load(target, concurrency, duration, mix, payload, seed, pid):
+    """
+    Drive `target` with `concurrency` clients for `duration` seconds.
+
+    The server's memory (process `pid`) is read before the clients
+    disconnect, since the SOA server exits as soon as its client is gone.
+    """
+    latencies, errors = [], []
+    shared = {'ids': [1, 2]}  # Books every REST store starts with
+    clients = [Client(target, mix, payload, random.Random(seed + i), shared) for i in range(concurrency)]
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(client_loop(c, deadline, latencies, errors) for c in clients))
+    elapsed = time.perf_counter() - start
+    rss, peak = memory_usage(pid)
+    for client in clients:
+        client.close()
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "req_per_sec": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "rss_mb": rss,
+        "peak_rss_mb": peak
+    }
+
+
+def run_target(target, concurrency, args):
+    """Start a fresh server for `target`, load it and measure its memory."""
+    mix = parse_mix(args.mix, target)
+    payload = min(args.payload, SOA_MAX_PAYLOAD) if target == 'soa' else args.payload
+    server = start_server(target)
+    try:
+        result = asyncio.run(run_load(target, concurrency, args.duration, mix, payload, args.seed, server.pid))
+    finally:
+        stop_server(server)
+    result.update(target=target, concurrency=concurrency, payload=payload, mix=mix)
+    return result
+
+
+def parse_mix(spec, target):
+    """Return the request mix for `target` from --mix, or its default mix."""
+    if not spec:
+        return dict(DEFAULT_MIXES[target])
+    mix = {}
+    for item in spec.split(','):
+        op, _, weight = item.partition('=')
+        op = op.strip()
+        if op in DEFAULT_MIXES[target]:
+            mix[op] = float(weight or 1)
+    return {op: w for op, w in mix.items() if w > 0} or dict(DEFAULT_MIXES[target])
+
+
+# ----------------------------------------------------------------------
+# Baseline
+# ----------------------------------------------------------------------
+
+def result_key(result):
+    return f"{result['target']}@{result['concurrency']}"
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compare results with a baseline.
+
+    A result regresses if its throughput dropped, or its p99 latency grew,
+    by more than `tolerance` (a fraction, e.g. 0.2 for 20%).
+
+    Returns:
+        list: (key, metric, baseline value, current value, change) for every regression
+    """
+    previous = {result_key(r): r for r in baseline.get('results', [])}
+    regressions = []
+    for result in results:
+        old = previous.get(result_key(result))
+        if old is None:
+            continue
+        change = result['req_per_sec'] / old['req_per_sec'] - 1 if old['req_per_sec'] else 0.0
+        if change < -tolerance:
+            regressions.append((result_key(result), 'req/s', old['req_per_sec'], result['req_per_sec'], change))
+        change = result['p99_ms'] / old['p99_ms'] - 1 if old['p99_ms'] else 0.0
+        if change > tolerance:
+            regressions.append((result_key(result), 'p99 ms', old['p99_ms'], result['p99_ms'], change))
+    return regressions
+
+
+def print_result(result):
+    rss = '-' if result['rss_mb'] is None else f"{result['rss_mb']:.1f}/{result['peak_rss_mb']:.1f} MB"
+    print(f"[{result['target']:>4}] {result['concurrency']:>4} clients: {result['req_per_sec']:>9,.0f} req/s  "
+          f"p50 {result['p50_ms']:7.2f} ms  p95 {result['p95_ms']:7.2f} ms  p99 {result['p99_ms']:7.2f} ms  "
+          f"errors {result['errors']}  RSS {rss}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the SOA, RPC and REST servers")
+    parser.add_argument('--targets', default='soa,rpc,rest', help="comma-separated targets (default: all)")
+    parser.add_argument('--concurrency', default='1,10,50',
+                        help="comma-separated client counts (default: 1,10,50; always 1 for soa)")
+    parser.add_argument('--duration', type=float, default=3.0, help="seconds per run (default: 3)")
+    parser.add_argument('--mix', default='', help="request mix, e.g. get=80,create=20 (default: per target)")
+    parser.add_argument('--payload', type=int, default=64, help="payload size in bytes (default: 64)")
+    parser.add_argument('--seed', type=int, default=1, help="random seed for the request mix")
+    parser.add_argument('--json', action='store_true', help="print results as JSON")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE,
+                        help="baseline to compare against (default: bench/baseline.json)")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="allowed regression as a fraction (default: 0.2 = 20%%)")
+    parser.add_argument('--save-baseline', action='store_true', help="write the results to --baseline")
+    args = parser.parse_args()
+
+    targets = [t.strip() for t in args.targets.split(',') if t.strip()]
+    unknown = [t for t in targets if t not in TARGETS]
+    if unknown:
+        parser.error(f"unknown target(s): {', '.join(unknown)}")
+    levels = [int(c) for c in args.concurrency.split(',')]
+
+    results = []
+    for target in targets:
+        for concurrency in ([1] if target == 'soa' else levels):
+            result = run_target(target, concurrency, args)
+            results.append(result)
+            if not args.json:
+                print_result(result)
+
+    report = {"duration": args.duration, "payload": args.payload, "results": results}
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+        if not args.json:
+            print(f"[INFO] Baseline written to {args.baseline}")
+        regressions = []
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+    else:
+        regressions = []
+
+    if args.json:
+        report["regressions"] = [dict(zip(('key', 'metric', 'baseline', 'current', 'change'), r))
+                                 for r in regressions]
+        print(json.dumps(report, indent=2))
+    else:
+        for key, metric, old, new, change in regressions:
+            print(f"[REGRESSION] {key} {metric}: {old:,.2f} -> {new:,.2f} ({change:+.0%})")
+        if not regressions and os.path.exists(args.baseline) and not args.save_baseline:
+            print(f"[SUCCESS] No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
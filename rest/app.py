@@ -24,33 +24,547 @@ Each book has the following attributes:
 
 API Endpoints:
 --------------
-GET    /books          - Retrieve all books
+GET    /books          - Retrieve all books (supports ?limit=&cursor= and ?stream=1,
+                         filtered by ?author= and/or ?min_price=&max_price=)
 GET    /books/<id>     - Retrieve a specific book by ID
+                         (both GETs accept ?fields=title,price to return only some fields)
+GET    /books/search   - Ranked full-text search / autocomplete (?q=&limit=)
+GET    /books/stats    - Price count/min/max/mean/percentiles (?p=50,95)
+GET    /books/changes  - Feed of changes after ?since=<offset> (long-poll or SSE)
+GET    /metrics        - Request counts, latencies and sizes (Prometheus text format)
 POST   /books          - Create a new book
 PUT    /books/<id>     - Update an existing book
 DELETE /books/<id>     - Delete a book
 
+Responses of 1 KB or more are gzip/deflate compressed when the client sends
+Accept-Encoding; compressed listings are cached until the store changes.
+
 Usage:
 ------
 1. Start the server: python app.py
 2. Test with browser: http://127.0.0.1:5000/books
 3. Test with Postman or curl for POST/PUT/DELETE operations
+4. To use several CPU cores: python serve_multi.py --workers 4
 """
 
-from flask import Flask, jsonify, request, abort
+import atexit
+import base64
+import binascii
+import json
+import math
+import os
+import sys
+from bisect import bisect_right
+from urllib.parse import urlencode
+
+from flask import Flask, Response, jsonify, request, abort
+
+from changes import ChangeLog
+from compression import COMPRESSION_MIN_SIZE, CompressedCache, compress, negotiate_encoding
+from fragments import FragmentCache
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, Metrics
+from search import SearchIndex, tokenize
+from shared_store import connect_store
+from stats import DEFAULT_PERCENTILES, PriceStats
+from store import BatchError, open_store
 
 # Create Flask application
 app = Flask(__name__)
 
-# In-memory database: dictionary mapping book ID to book data
-# In a production system, this would be replaced with a real database
-books = {
-    1: {"title": "Distributed Systems", "author": "Tanenbaum", "price": 50.0},
-    2: {"title": "Clean Code", "author": "Robert C. Martin", "price": 45.0}
-}
+# Per-route request metrics for GET /metrics. Registered first so that its
+# after_request hook runs last and sees the final (compressed) response.
+metrics = Metrics()
+metrics.init_app(app)
+
+# Server address (the port can be overridden with BOOKS_PORT)
+HOST = '127.0.0.1'
+PORT = int(os.environ.get('BOOKS_PORT', 5000))
+
+# Book storage backend, chosen with the BOOKS_STORE environment variable:
+#   memory   - in-process dictionary (default, lost on restart)
+#   log      - append-only log + snapshots in BOOKS_DATA_DIR (survives restarts)
+#   columnar - in-process typed columns, far smaller for huge catalogues
+# The handlers below only use the BookStore interface from store.py.
+# BOOKS_SHARDS=N partitions the books over N stores of that type by ID hash.
+STORE_TYPE = os.environ.get('BOOKS_STORE', 'memory')
+DATA_DIR = os.environ.get('BOOKS_DATA_DIR', 'data')
+SHARDS = int(os.environ['BOOKS_SHARDS']) if os.environ.get('BOOKS_SHARDS') else None
+
+# Set by serve_multi.py: the address of a store process shared by several
+# worker processes. This process then serves reads from a replica of it and
+# sends writes to it (see shared_store.py).
+STORE_ADDRESS = os.environ.get('BOOKS_STORE_ADDRESS')
+
+if STORE_ADDRESS:
+    store = connect_store(STORE_ADDRESS, os.environ.get('BOOKS_STORE_KEY', ''))
+    # Catch up with writes made through other workers before every request
+    app.before_request(store.sync)
+else:
+    store = open_store(STORE_TYPE, data_dir=DATA_DIR, shards=SHARDS)
+atexit.register(store.close)
+
+# Books every new store starts with
+SEED_BOOKS = [
+    {"title": "Distributed Systems", "author": "Tanenbaum", "price": 50.0},
+    {"title": "Clean Code", "author": "Robert C. Martin", "price": 45.0}
+]
+
+if store.version() == 0:
+    for _book in SEED_BOOKS:
+        store.create(_book)
+
+# Full-text index over titles and authors for GET /books/search, kept
+# current through the store's change notifications
+search_index = SearchIndex()
+search_index.attach(store)
+
+# Price aggregates for GET /books/stats, also maintained from the change
+# notifications so the endpoint never rescans the books
+price_stats = PriceStats()
+price_stats.attach(store)
+
+# Bounded log of recent changes for GET /books/changes
+change_log = ChangeLog()
+change_log.attach(store)
+
+# Encoded JSON of the most recently served books (up to 64 MB), reused by
+# GET /books and GET /books/<id> until the book changes
+fragments = FragmentCache(store)
+fragments.attach()
+
+# Compressed GET /books responses, keyed by (listing ETag, query string,
+# encoding); every store change empties it
+listing_cache = CompressedCache()
+store.add_listener(listing_cache.clear)
+
+metrics.add_gauge('store_books', "Books in the store.", store.count)
+metrics.add_gauge('store_version', "Store version (number of changes applied).", store.version)
+metrics.add_counter('fragment_cache_hits_total', "Book JSON served from the fragment cache.",
+                    lambda: fragments.hits)
+metrics.add_counter('fragment_cache_misses_total', "Book JSON that had to be encoded.",
+                    lambda: fragments.misses)
+metrics.add_counter('listing_cache_hits_total', "GET /books served from the compressed cache.",
+                    lambda: listing_cache.hits)
+metrics.add_counter('listing_cache_misses_total', "Compressed GET /books cache misses.",
+                    lambda: listing_cache.misses)
+
+# Fields every book has (besides its ID)
+BOOK_FIELDS = ('title', 'author', 'price')
+
+# Maximum number of operations accepted by POST /books:batch
+MAX_BATCH_SIZE = 10000
+
+# Pagination limits for GET /books?limit=
+MAX_PAGE_SIZE = 1000
+
+# Number of books fetched per step when streaming a listing
+STREAM_CHUNK_SIZE = 100
+
+# Result limits for GET /books/search?limit=
+DEFAULT_SEARCH_LIMIT = 10
+MAX_SEARCH_LIMIT = 100
+
+# GET /books/changes: default page size, longest long-poll (?wait=) in
+# seconds, and how often an idle event stream sends a keep-alive comment
+DEFAULT_CHANGES_LIMIT = 100
+MAX_CHANGES_WAIT = 30
+SSE_KEEPALIVE = 15
+
 
-# Counter for generating new book IDs
-next_id = 3
+class BookError(Exception):
+    """
+    A create/update/delete operation could not be applied.
+    
+    Attributes:
+        status (int): HTTP status code describing the failure (400, 404 or 409)
+        message (str): Human-readable reason, reported by the batch endpoint
+    """
+    
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def validate_fields(data, required):
+    """
+    Extract the book fields from a request body.
+    
+    Args:
+        data: Parsed JSON body
+        required (bool): If True, title, author and price must all be present
+        
+    Returns:
+        dict: The provided book fields, with price converted to float
+        
+    Raises:
+        BookError: 400 if the body is empty, incomplete, has a title or
+        author that isn't a string or a price that isn't a finite number
+    """
+    if not data or not isinstance(data, dict):
+        raise BookError(400, "Request body must be a non-empty JSON object")
+    if required and not all(k in data for k in BOOK_FIELDS):
+        raise BookError(400, "title, author and price are required")
+    
+    fields = {k: data[k] for k in BOOK_FIELDS if k in data}
+    if any(not isinstance(fields[k], str) for k in ('title', 'author') if k in fields):
+        raise BookError(400, "title and author must be strings")
+    if 'price' in fields:
+        try:
+            fields['price'] = float(fields['price'])
+        except (TypeError, ValueError):
+            raise BookError(400, "price must be a number")
+        if not math.isfinite(fields['price']):
+            raise BookError(400, "price must be a finite number")
+    return fields
+
+
+def create_book(data):
+    """
+    Validate and store a new book.
+    
+    Returns:
+        int: The new book's ID
+        
+    Raises:
+        BookError: 400 if validation fails
+    """
+    book = validate_fields(data, required=True)
+    return store.create(book)
+
+
+def modify_book(book_id, data):
+    """
+    Apply a partial update to an existing book.
+    
+    Returns:
+        dict: Copy of the book as it was before the update
+        
+    Raises:
+        BookError: 404 if the book doesn't exist, 400 if validation fails
+    """
+    if store.get(book_id) is None:
+        raise BookError(404, f"Book {book_id} not found")
+    changes = validate_fields(data, required=False)
+    
+    try:
+        return store.update(book_id, changes)
+    except KeyError:
+        raise BookError(404, f"Book {book_id} not found")
+
+
+def remove_book(book_id):
+    """
+    Delete a book from the store.
+    
+    Returns:
+        dict: The deleted book
+        
+    Raises:
+        BookError: 404 if the book doesn't exist
+    """
+    try:
+        return store.delete(book_id)
+    except KeyError:
+        raise BookError(404, f"Book {book_id} not found")
+
+
+def batch_target_id(op):
+    """Return the integer "id" of a batch operation, or raise BookError(400)."""
+    book_id = op.get('id')
+    if not isinstance(book_id, int) or isinstance(book_id, bool):
+        raise BookError(400, "id must be an integer")
+    return book_id
+
+
+def parse_operation(op):
+    """
+    Validate one operation from a POST /books:batch request without touching the store.
+    
+    Args:
+        op (dict): {"op": "create"|"update"|"delete", "id": ..., "book": {...}}
+        
+    Returns:
+        tuple: (kind, book ID or None, validated fields or None), as taken
+        by the store's apply_batch()
+        
+    Raises:
+        BookError: 400 if the operation is malformed
+    """
+    kind = op.get('op') if isinstance(op, dict) else None
+    
+    if kind == 'create':
+        return kind, None, validate_fields(op.get('book'), required=True)
+    
+    if kind == 'update':
+        return kind, batch_target_id(op), validate_fields(op.get('book'), required=False)
+    
+    if kind == 'delete':
+        return kind, batch_target_id(op), None
+    
+    raise BookError(400, "op must be one of: create, update, delete")
+
+
+def apply_operation(op):
+    """
+    Apply one operation from a non-atomic POST /books:batch request.
+    
+    Args:
+        op (dict): {"op": "create"|"update"|"delete", "id": ..., "book": {...}}
+        
+    Returns:
+        dict: Result for the response
+        
+    Raises:
+        BookError: If the operation is malformed or cannot be applied
+    """
+    kind = op.get('op') if isinstance(op, dict) else None
+    
+    if kind == 'create':
+        return {"status": 201, "id": create_book(op.get('book'))}
+    
+    if kind == 'update':
+        book_id = batch_target_id(op)
+        modify_book(book_id, op.get('book'))
+        return {"status": 200, "id": book_id}
+    
+    if kind == 'delete':
+        book_id = batch_target_id(op)
+        remove_book(book_id)
+        return {"status": 200, "id": book_id}
+    
+    raise BookError(400, "op must be one of: create, update, delete")
+
+
+def batch_error(op, error):
+    """Return the result item of a failed batch operation."""
+    result = {"status": error.status, "error": error.message}
+    if isinstance(op, dict) and 'id' in op:
+        result['id'] = op['id']
+    return result
+
+
+def encode_json(obj):
+    """Encode `obj` as compact JSON with sorted keys, the same way jsonify() does."""
+    return json.dumps(obj, separators=(',', ':'), sort_keys=True)
+
+
+def not_modified(etag):
+    """
+    Answer a conditional GET without rendering the body.
+    
+    Args:
+        etag (str): Current entity tag of the requested resource
+        
+    Returns:
+        Response or None: A 304 Not Modified response if the client's
+        If-None-Match already has `etag`, otherwise None
+    """
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+    return None
+
+
+def encode_cursor(book_id):
+    """
+    Encode the ID of the last book on a page as an opaque cursor.
+    
+    Args:
+        book_id (int): ID of the last book returned
+        
+    Returns:
+        str: URL-safe cursor to pass back as ?cursor=
+    """
+    raw = f"after:{book_id}".encode('ascii')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor().
+    
+    Args:
+        cursor (str): Cursor from the ?cursor= query parameter
+        
+    Returns:
+        int: ID after which the next page starts
+        
+    Raises:
+        BookError: 400 if the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        prefix, _, value = raw.decode('ascii').partition(':')
+        if prefix != 'after':
+            raise ValueError(cursor)
+        return int(value)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise BookError(400, "Invalid cursor")
+
+
+def parse_paging(args):
+    """
+    Validate the ?limit= and ?cursor= query parameters.
+    
+    Args:
+        args: Query parameters (Flask's request.args or any dict-like)
+        
+    Returns:
+        tuple: (limit or None, cursor or None, ID the page starts after)
+        
+    Raises:
+        BookError: 400 if limit or cursor is invalid
+    """
+    limit = None
+    if 'limit' in args:
+        try:
+            limit = int(args.get('limit'))
+        except (TypeError, ValueError):
+            raise BookError(400, "limit must be an integer")
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise BookError(400, f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    cursor = args.get('cursor')
+    after_id = decode_cursor(cursor) if cursor else 0
+    return limit, cursor, after_id
+
+
+def parse_fields(args):
+    """
+    Validate the ?fields= projection (e.g. "title,price").
+    
+    "id" is accepted but changes nothing: the ID is always the key of
+    each book in the response.
+    
+    Returns:
+        tuple or None: The requested book fields in BOOK_FIELDS order, or
+        None if the parameter is absent or asks for every field
+        
+    Raises:
+        BookError: 400 if the list is empty or names an unknown field
+    """
+    value = args.get('fields')
+    if value is None:
+        return None
+    names = {name.strip() for name in value.split(',')}
+    unknown = names - set(BOOK_FIELDS) - {'id'}
+    if unknown or names == {''}:
+        raise BookError(400, f"fields must be a comma-separated list of: id, {', '.join(BOOK_FIELDS)}")
+    fields = tuple(k for k in BOOK_FIELDS if k in names)
+    # Asking for everything is the plain representation, which shares its cache
+    return None if len(fields) == len(BOOK_FIELDS) else fields
+
+
+def wants_stream(args):
+    """Return True if the query string asks for a streamed listing (?stream=1)."""
+    return args.get('stream', '').lower() in ('1', 'true', 'yes')
+
+
+def parse_price_arg(args, name):
+    """
+    Read an optional price bound from the query string.
+    
+    Returns:
+        float or None: The bound, or None if the parameter is absent
+        
+    Raises:
+        BookError: 400 if the value is not a number
+    """
+    value = args.get(name)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise BookError(400, f"{name} must be a number")
+
+
+def select_ids(args):
+    """
+    Resolve the ?author= and ?min_price=&max_price= filters through the indexes.
+    
+    Returns:
+        list or None: Sorted IDs of the matching books, or None if no
+        filter was given (meaning "every book")
+    """
+    author = args.get('author')
+    min_price = parse_price_arg(args, 'min_price')
+    max_price = parse_price_arg(args, 'max_price')
+    
+    if author is None and min_price is None and max_price is None:
+        return None
+    
+    if author is not None:
+        ids = store.by_author(author)
+        if min_price is not None or max_price is not None:
+            lo = float('-inf') if min_price is None else min_price
+            hi = float('inf') if max_price is None else max_price
+            ids = [k for k, b in books_by_id(ids) if lo <= b['price'] <= hi]
+        return ids
+    
+    # The price index returns IDs in price order; listings are in ID order
+    return sorted(store.price_range(min_price, max_price))
+
+
+def books_by_id(ids):
+    """Return (ID, book) pairs for `ids`, skipping books that no longer exist."""
+    pairs = []
+    for book_id in ids:
+        b = store.get(book_id)
+        if b is not None:
+            pairs.append((book_id, b))
+    return pairs
+
+
+def page_ids(after_id, limit, ids=None):
+    """
+    Return up to `limit` book IDs greater than `after_id`, in ascending order.
+    
+    Args:
+        after_id (int): Only IDs greater than this are returned
+        limit (int): Maximum number of IDs to return
+        ids (list or None): Sorted IDs to page through (None = all books)
+    
+    Runs in O(log n + limit) thanks to the sorted ID list.
+    """
+    if ids is None:
+        return store.ids_after(after_id, limit)
+    start = bisect_right(ids, after_id)
+    return ids[start:start + limit]
+
+
+def stream_books(after_id, limit, ids=None, fields=None):
+    """
+    Generate the JSON listing chunk by chunk.
+    
+    The body has the same shape as the non-streamed listing, but only one
+    small page of books is held in memory at a time, so the first bytes go
+    out immediately no matter how large the catalogue is.
+    
+    Args:
+        after_id (int): Start after this book ID (0 for the beginning)
+        limit (int or None): Maximum number of books to emit (None = all)
+        ids (list or None): Sorted IDs to stream (None = all books)
+        fields (tuple or None): Fields from parse_fields() (None = all)
+    """
+    yield '{'
+    first = True
+    remaining = limit
+    while remaining is None or remaining > 0:
+        step = STREAM_CHUNK_SIZE if remaining is None else min(STREAM_CHUNK_SIZE, remaining)
+        chunk = page_ids(after_id, step, ids)
+        if not chunk:
+            break
+        # Books deleted while we were streaming are skipped
+        parts = fragments.members(chunk, fields)
+        if parts:
+            yield ('' if first else ',') + ','.join(parts)
+            first = False
+        after_id = chunk[-1]
+        if remaining is not None:
+            remaining -= len(chunk)
+    yield '}\n'
 
 
 @app.route('/books', methods=['GET'])
@@ -58,17 +572,438 @@ def get_books():
     """
     GET /books - Retrieve all books
     
+    Query Parameters (all optional):
+        limit (int): Return at most this many books (1-1000)
+        cursor (str): Opaque cursor from a previous page's X-Next-Cursor header
+        stream (bool): If "1"/"true", stream the body chunk by chunk
+        author (str): Only books by this author (case-insensitive)
+        min_price (float): Only books costing at least this much
+        max_price (float): Only books costing at most this much
+        fields (str): Only return these fields of each book, e.g. "title,price";
+            the others are never encoded, so wide listings get much smaller
+    
+    Headers:
+        If-None-Match: ETag from a previous response; answered with
+        304 Not Modified if nothing in the store has changed since
+    
     Returns:
-        JSON object with all books (key: book ID, value: book data)
+        JSON object with the books (key: book ID, value: book data), in ID order.
+        When a page is cut short by `limit`, the X-Next-Cursor header (and a
+        Link header with rel="next") point at the following page.
         
     Example Response:
         {
             "1": {"title": "...", "author": "...", "price": 50.0},
             "2": {"title": "...", "author": "...", "price": 45.0}
         }
+        
+    Errors:
+        400 Bad Request - If limit, cursor, a price bound or fields is invalid
+    """
+    try:
+        limit, cursor, after_id = parse_paging(request.args)
+        fields = parse_fields(request.args)
+    except BookError as e:
+        abort(e.status)
+    
+    # The listing only changes when the store version does
+    etag = listing_etag(fields)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
+    # Repeated polls of an unchanged listing reuse the compressed bytes
+    encoding = negotiate_encoding(request.headers.get('Accept-Encoding'))
+    cacheable = encoding is not None and not wants_stream(request.args)
+    if cacheable:
+        entry = listing_cache.get(etag, request.query_string, encoding)
+        if entry is not None:
+            body, headers = entry
+            response = Response(body, mimetype='application/json', headers=headers)
+            response.set_etag(etag, weak=True)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+    
+    try:
+        response = render_books(limit, cursor, after_id, fields)
+    except BookError as e:
+        abort(e.status)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    
+    if cacheable and compress_response(response, encoding):
+        headers = [(k, v) for k, v in response.headers.items()
+                   if k in ('Content-Encoding', 'Vary', 'X-Next-Cursor', 'Link')]
+        listing_cache.put(etag, request.query_string, encoding, (response.get_data(), headers))
+    return response
+
+
+def render_books(limit, cursor, after_id, fields=None):
+    """Build the GET /books response for the already-validated paging and fields arguments."""
+    selected = select_ids(request.args)
+    
+    if wants_stream(request.args):
+        return Response(stream_books(after_id, limit, selected, fields), mimetype='application/json')
+    
+    page, next_cursor = list_books(limit, cursor, after_id, selected, fields)
+    response = Response(page, mimetype='application/json')
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+        response.headers['Link'] = next_link(request.base_url, request.args, limit, next_cursor)
+    return response
+
+
+def list_books(limit, cursor, after_id, selected, fields=None):
+    """
+    Collect one page of the listing as JSON text.
+    
+    The body is assembled from the books' cached JSON fragments, so only
+    books that changed since they were last listed get encoded.
+    
+    Args:
+        limit (int or None): Page size from ?limit=
+        cursor (str or None): Cursor from ?cursor=
+        after_id (int): Decoded cursor (0 for the first page)
+        selected (list or None): IDs from select_ids() (None = all books)
+        fields (tuple or None): Fields from parse_fields() (None = all)
+        
+    Returns:
+        tuple: ('{"<id>": book, ...}' text, cursor for the next page or None)
+    """
+    if limit is None and not cursor:
+        ids = store.ids_after(0, sys.maxsize) if selected is None else selected
+        return fragments.listing(ids, fields) + '\n', None
+    
+    ids = page_ids(after_id, limit or MAX_PAGE_SIZE, selected)
+    page = fragments.listing(ids, fields) + '\n'
+    
+    # Only advertise a next page if there is at least one more book after it
+    if ids and page_ids(ids[-1], 1, selected):
+        return page, encode_cursor(ids[-1])
+    return page, None
+
+
+def next_link(base_url, args, limit, next_cursor):
+    """Build the Link header pointing at the next page, keeping the other parameters."""
+    next_args = dict(args.items())
+    next_args.update(limit=limit or MAX_PAGE_SIZE, cursor=next_cursor)
+    return f'<{base_url}?{urlencode(next_args)}>; rel="next"'
+
+
+def compress_response(response, encoding):
+    """
+    Compress a response body in place with the negotiated content encoding.
+    
+    Streamed, empty, non-200 and small (< COMPRESSION_MIN_SIZE) responses are
+    left alone. A compressed response gets Content-Encoding and
+    Vary: Accept-Encoding, and its ETag becomes weak: the bytes differ from
+    the identity encoding but the content is the same, so If-None-Match
+    still matches either form.
+    
+    Args:
+        response (Response): The response to compress
+        encoding (str or None): Result of negotiate_encoding()
+        
+    Returns:
+        bool: True if the body was compressed
+    """
+    response.vary.add('Accept-Encoding')
+    if (encoding is None or response.status_code != 200 or response.is_streamed
+            or 'Content-Encoding' in response.headers):
+        return False
+    body = response.get_data()
+    if len(body) < COMPRESSION_MIN_SIZE:
+        return False
+    
+    response.set_data(compress(body, encoding))
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return True
+
+
+@app.after_request
+def compress_body(response):
+    """Compress every eligible response for clients that accept it."""
+    compress_response(response, negotiate_encoding(request.headers.get('Accept-Encoding')))
+    return response
+
+
+def fields_tag(fields):
+    """ETag suffix telling a projection (?fields=) apart from the full representation."""
+    return '' if fields is None else '-' + '.'.join(fields)
+
+
+def listing_etag(fields=None):
+    """ETag of the GET /books listing: it only changes when the store version does."""
+    return f"books-{store.epoch()}-v{store.version()}{fields_tag(fields)}"
+
+
+def book_etag(book_id, fields=None):
+    """ETag of GET /books/<id>: it only changes when that book does."""
+    return f"book-{book_id}-{store.epoch()}-v{store.book_version(book_id)}{fields_tag(fields)}"
+
+
+@app.route('/books/search', methods=['GET'])
+def search_books():
+    """
+    GET /books/search?q=<text> - Full-text search over titles and authors
+    
+    Query Parameters:
+        q (str): Search text. Every word must match; the last word may be
+                 just the start of a word, so this works for autocomplete.
+        limit (int): Maximum number of results (1-100, default 10)
+        
+    Returns:
+        JSON object with ranked results and completions for the last word
+        
+    Example Response (for ?q=distributed sys):
+        {
+            "query": "distributed sys",
+            "results": [
+                {"id": 1, "score": 4, "title": "Distributed Systems",
+                 "author": "Tanenbaum", "price": 50.0}
+            ],
+            "completions": ["systems"]
+        }
+        
+    Errors:
+        400 Bad Request - If q is missing or limit is invalid
+    """
+    try:
+        return jsonify(run_search(request.args))
+    except BookError as e:
+        abort(e.status)
+
+
+def run_search(args):
+    """
+    Run a GET /books/search query.
+    
+    Returns:
+        dict: The response body ({"query", "results", "completions"})
+        
+    Raises:
+        BookError: 400 if q is missing or limit is invalid
+    """
+    query = args.get('q', '').strip()
+    try:
+        limit = int(args.get('limit', DEFAULT_SEARCH_LIMIT))
+    except (TypeError, ValueError):
+        raise BookError(400, "limit must be an integer")
+    if not query or not 1 <= limit <= MAX_SEARCH_LIMIT:
+        raise BookError(400, f"q is required and limit must be between 1 and {MAX_SEARCH_LIMIT}")
+    
+    results = []
+    for book_id, score in search_index.search(query, limit):
+        b = store.get(book_id)
+        if b is not None:
+            results.append({"id": book_id, "score": score, **b})
+    
+    words = tokenize(query)
+    completions = search_index.complete(words[-1], limit) if words else []
+    return {"query": query, "results": results, "completions": completions}
+
+
+@app.route('/books/stats', methods=['GET'])
+def get_stats():
+    """
+    GET /books/stats - Price statistics over the whole catalogue
+    
+    Query Parameters:
+        p (str): Comma-separated percentiles to report (0-100),
+                 default "25,50,75,90,95,99"
+    
+    Headers:
+        If-None-Match: ETag from a previous response; answered with
+        304 Not Modified if nothing in the store has changed since
+    
+    Returns:
+        JSON object with the aggregates, served from incrementally
+        maintained state (no scan of the books)
+        
+    Example Response:
+        {"count": 2, "min": 45.0, "max": 50.0, "mean": 47.5,
+         "percentiles": {"p50": 45.0, "p95": 50.0}}
+        
+    Errors:
+        400 Bad Request - If a percentile is not a number between 0 and 100
+    """
+    try:
+        percentiles = parse_percentiles(request.args)
+    except BookError as e:
+        abort(e.status)
+    
+    etag = stats_etag()
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
+    response = jsonify(price_stats.summary(percentiles))
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def parse_percentiles(args):
+    """
+    Read the ?p= list of percentiles.
+    
+    Returns:
+        tuple: Percentiles as numbers (DEFAULT_PERCENTILES if ?p= is absent)
+        
+    Raises:
+        BookError: 400 if a value is not a number between 0 and 100
+    """
+    raw = args.get('p')
+    if raw is None:
+        return DEFAULT_PERCENTILES
+    try:
+        percentiles = tuple(float(p) for p in raw.split(','))
+    except ValueError:
+        raise BookError(400, "p must be a comma-separated list of numbers")
+    if not all(0 <= p <= 100 for p in percentiles):
+        raise BookError(400, "percentiles must be between 0 and 100")
+    return percentiles
+
+
+def stats_etag():
+    """ETag of GET /books/stats: like the listing, it changes with the store version."""
+    return f"stats-{store.epoch()}-v{store.version()}"
+
+
+@app.route('/books/changes', methods=['GET'])
+def get_changes():
+    """
+    GET /books/changes?since=<offset> - Changes made after an offset
+    
+    Every create/update/delete gets an offset (the store version it
+    produced). Apply the returned changes, then ask again with since=next.
+    
+    Query Parameters:
+        since (int): Last offset already seen (default: now, i.e. only new changes)
+        epoch (str): The "epoch" of the answer `since` came from. If the
+                     store's epoch has changed since (a restart without
+                     durable storage), the offset means nothing any more: 410
+        limit (int): Maximum number of changes per response (1-1000, default 100)
+        wait (float): Long-poll: if there are no changes yet, hold the request
+                      open up to this many seconds (max 30) until one arrives
+        stream (bool): If "1"/"true", answer with a server-sent event stream
+                       (also chosen by Accept: text/event-stream)
+    
+    Headers:
+        Last-Event-ID: Resume an event stream after this "<epoch>:<offset>"
+        event ID (sent automatically by EventSource when it reconnects)
+    
+    Returns:
+        JSON object with the changes, oldest first:
+            {"epoch": "...", "next": 44,
+             "changes": [{"offset": 43, "op": "update", "id": 7, "book": {...}},
+                         {"offset": 44, "op": "delete", "id": 3}]}
+        or a text/event-stream with one "change" event per change.
+        
+    Errors:
+        400 Bad Request - If since, limit or wait is invalid
+        410 Gone - If changes after `since` are no longer in the log, or
+                   `since` is from another epoch; reload GET /books and
+                   resume from its version
+    """
+    try:
+        since, limit, wait, stream = parse_changes_args(request.args, request.headers)
+    except BookError as e:
+        abort(e.status)
+    
+    if stream:
+        response = Response(stream_changes(since), mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'  # Don't let proxies buffer events
+        return response
+    
+    if wait:
+        change_log.wait(since, wait)
+    return jsonify(changes_page(since, limit))
+
+
+def parse_changes_args(args, headers):
+    """
+    Validate the GET /books/changes parameters.
+    
+    Returns:
+        tuple: (since, limit, wait seconds, stream?)
+        
+    Raises:
+        BookError: 400 if a parameter is invalid, 410 if `since` is no
+        longer covered by the change log
+    """
+    stream = wants_stream(args) or 'text/event-stream' in headers.get('Accept', '')
+    since = args.get('since')
+    epoch = args.get('epoch') or None
+    if stream and headers.get('Last-Event-ID'):
+        # Event IDs are "<epoch>:<offset>"
+        epoch, _, since = headers.get('Last-Event-ID').rpartition(':')
+        epoch = epoch or None
+    try:
+        since = change_log.latest() if since is None else int(since)
+        limit = int(args.get('limit', DEFAULT_CHANGES_LIMIT))
+        wait = float(args.get('wait', 0))
+    except ValueError:
+        raise BookError(400, "since and limit must be integers, wait a number")
+    if not 1 <= limit <= MAX_PAGE_SIZE or not 0 <= wait <= MAX_CHANGES_WAIT:
+        raise BookError(400, f"limit must be 1-{MAX_PAGE_SIZE}, wait 0-{MAX_CHANGES_WAIT}")
+    if not change_log.covers(since, epoch):
+        raise BookError(410, f"Changes after offset {since} are no longer available")
+    return since, limit, wait, stream
+
+
+def changes_page(since, limit):
+    """Return the GET /books/changes body for changes after `since`."""
+    changes = change_log.read(since, limit)
+    return {
+        "epoch": store.epoch(),
+        "changes": changes,
+        "next": changes[-1]["offset"] if changes else since
+    }
+
+
+def sse_event(change):
+    """Format one change as a server-sent event (its ID carries the store epoch)."""
+    return f"id: {store.epoch()}:{change['offset']}\nevent: change\ndata: {encode_json(change)}\n\n"
+
+
+def stream_changes(since):
+    """
+    Generate a server-sent event stream of changes after `since`, forever.
+    
+    Idle streams get a comment line every SSE_KEEPALIVE seconds so proxies
+    keep the connection open. If the consumer falls so far behind that the
+    log has dropped changes it hasn't seen, a "reset" event is sent and the
+    stream ends; the consumer reloads GET /books and reconnects.
     """
-    # Convert integer keys to strings for JSON serialization
-    return jsonify({str(k): v for k, v in books.items()})
+    yield "retry: 1000\n\n"
+    while True:
+        if not change_log.covers(since):
+            yield "event: reset\ndata: {}\n\n"
+            return
+        changes = change_log.read(since, STREAM_CHUNK_SIZE)
+        if changes:
+            yield ''.join(sse_event(c) for c in changes)
+            since = changes[-1]['offset']
+        elif not change_log.wait(since, SSE_KEEPALIVE):
+            yield ": keep-alive\n\n"
+
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """
+    GET /metrics - Request metrics in the Prometheus text format
+    
+    Returns:
+        text/plain exposition with request counts by route and status,
+        latency and response size histograms, the in-flight gauge and
+        store/cache figures (see metrics.py)
+    """
+    return Response(metrics.render(), content_type=METRICS_CONTENT_TYPE)
 
 
 @app.route('/books/<int:book_id>', methods=['GET'])
@@ -79,16 +1014,39 @@ def get_book(book_id):
     Args:
         book_id (int): The ID of the book to retrieve
         
+    Query Parameters (optional):
+        fields (str): Only return these fields, e.g. "title,price"
+        
+    Headers:
+        If-None-Match: ETag from a previous response; answered with
+        304 Not Modified if the book hasn't changed since
+        
     Returns:
         JSON object with the book data
         
     Errors:
+        400 Bad Request - If fields is invalid
         404 Not Found - If book doesn't exist
     """
-    b = books.get(book_id)
-    if not b:
+    try:
+        fields = parse_fields(request.args)
+    except BookError as e:
+        abort(e.status)
+    if store.book_version(book_id) is None:
         abort(404)  # Return 404 Not Found if book doesn't exist
-    return jsonify({str(book_id): b})
+    
+    etag = book_etag(book_id, fields)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
+    text = fragments.fragment(book_id, fields)
+    if text is None:
+        abort(404)  # Deleted since the check above
+    response = Response(f'{{"{book_id}":{text}}}\n', mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 
 @app.route('/books', methods=['POST'])
@@ -108,27 +1066,18 @@ def add_book():
         HTTP Status: 201 Created
         
     Errors:
-        400 Bad Request - If required fields are missing
+        400 Bad Request - If required fields are missing or price is not a number
     """
-    global next_id
-    
     # Get JSON data from request body
     data = request.get_json()
     
-    # Validate that all required fields are present
-    if not data or not all(k in data for k in ('title', 'author', 'price')):
-        abort(400)  # Return 400 Bad Request if validation fails
-    
-    # Create new book entry
-    books[next_id] = {
-        "title": data['title'],
-        "author": data['author'],
-        "price": float(data['price'])
-    }
+    try:
+        book_id = create_book(data)
+    except BookError as e:
+        abort(e.status)  # Return 400 Bad Request if validation fails
     
     # Prepare response
-    resp = {"message": "Book added", "id": next_id}
-    next_id += 1
+    resp = {"message": "Book added", "id": book_id}
     
     return jsonify(resp), 201  # Return 201 Created status
 
@@ -153,20 +1102,15 @@ def update_book(book_id):
         
     Errors:
         404 Not Found - If book doesn't exist
-        400 Bad Request - If request body is empty
+        400 Bad Request - If request body is empty or price is not a number
     """
     data = request.get_json()
     
-    # Check if book exists
-    if book_id not in books:
-        abort(404)
-    
-    # Validate request body
-    if not data:
-        abort(400)
-    
-    # Update only the fields that are provided
-    books[book_id].update({k: data[k] for k in ('title', 'author', 'price') if k in data})
+    try:
+        # Update only the fields that are provided
+        modify_book(book_id, data)
+    except BookError as e:
+        abort(e.status)
     
     return jsonify({"message": "Book updated", "id": book_id})
 
@@ -185,28 +1129,155 @@ def delete_book(book_id):
     Errors:
         404 Not Found - If book doesn't exist
     """
-    if book_id not in books:
-        abort(404)
-    
-    # Remove book from dictionary
-    del books[book_id]
+    try:
+        remove_book(book_id)
+    except BookError as e:
+        abort(e.status)
     
     return jsonify({"message": "Book deleted", "id": book_id})
 
 
+@app.route('/books:batch', methods=['POST'])
+def batch_books():
+    """
+    POST /books:batch - Apply many create/update/delete operations at once
+    
+    Request Body (JSON):
+        {
+            "atomic": false,
+            "operations": [
+                {"op": "create", "book": {"title": "...", "author": "...", "price": 10.0}},
+                {"op": "update", "id": 1, "book": {"price": 55.0}},
+                {"op": "delete", "id": 2}
+            ]
+        }
+        
+    Operations are applied in order. With "atomic": true the batch is
+    all-or-nothing: every operation is checked first and the batch is then
+    applied by the store as one write, so either all of it is applied (with
+    no other write in between) or none of it is and nothing changes.
+    
+    Returns:
+        JSON object with one result per operation, in request order:
+            {"committed": true,
+             "results": [{"status": 201, "id": 3},
+                         {"status": 200, "id": 1},
+                         {"status": 404, "id": 2, "error": "Book 2 not found"}]}
+        HTTP Status: 200 OK (check each item's "status"), or 409 Conflict if
+        an atomic batch was refused. In a refused batch "committed" is false,
+        the failing item reports its error, the items before it report
+        status 409 (not applied) and the items after it are omitted.
+        
+    Errors:
+        400 Bad Request - If the body is not {"operations": [...]}
+        413 Payload Too Large - If there are more than MAX_BATCH_SIZE operations
+    """
+    try:
+        body, status = run_batch(request.get_json())
+    except BookError as e:
+        abort(e.status)
+    return jsonify(body), status
+
+
+def run_batch(data):
+    """
+    Apply a POST /books:batch request body.
+    
+    Returns:
+        tuple: (response body, HTTP status)
+        
+    Raises:
+        BookError: 400 if the body is malformed, 413 if it is too large
+    """
+    if not isinstance(data, dict) or not isinstance(data.get('operations'), list):
+        raise BookError(400, 'Request body must be {"operations": [...]}')
+    operations = data['operations']
+    if len(operations) > MAX_BATCH_SIZE:
+        raise BookError(413, f"At most {MAX_BATCH_SIZE} operations per batch")
+    atomic = bool(data.get('atomic', False))
+    return apply_batch(operations, atomic)
+
+
+def apply_batch(operations, atomic):
+    """
+    Apply batch operations in order; if atomic, all of them or none.
+    
+    Returns:
+        tuple: (response body, HTTP status)
+    """
+    if atomic:
+        return apply_atomic_batch(operations)
+    
+    results = []
+    for op in operations:
+        try:
+            results.append(apply_operation(op))
+        except BookError as e:
+            results.append(batch_error(op, e))
+    return {"committed": True, "results": results}, 200
+
+
+def apply_atomic_batch(operations):
+    """
+    Validate every operation, then apply them with one store.apply_batch() call.
+    
+    Under serve_multi.py that is a single call into the store process, which
+    checks the books the batch touches and applies it without any other
+    write in between.
+    
+    Returns:
+        tuple: (response body, HTTP status)
+    """
+    parsed = []
+    for index, op in enumerate(operations):
+        try:
+            parsed.append(parse_operation(op))
+        except BookError as e:
+            return refused_batch(operations, index, e)
+    
+    try:
+        outcomes = store.apply_batch(parsed)
+    except BatchError as e:
+        if isinstance(e.error, KeyError):
+            error = BookError(404, f"Book {parsed[e.index][1]} not found")
+        else:
+            error = BookError(400, str(e.error))
+        return refused_batch(operations, e.index, error)
+    
+    results = [{"status": 201, "id": outcome} if kind == 'create' else {"status": 200, "id": book_id}
+               for (kind, book_id, _), outcome in zip(parsed, outcomes)]
+    return {"committed": True, "results": results}, 200
+
+
+def refused_batch(operations, index, error):
+    """Return the 409 response of an atomic batch whose operation `index` failed."""
+    results = [batch_error(op, BookError(409, f"Not applied: operation {index} failed"))
+               for op in operations[:index]]
+    results.append(batch_error(operations[index], error))
+    return {"committed": False, "results": results}, 409
+
+
 if __name__ == '__main__':
     print("=" * 70)
     print("REST API SERVER - Book Management System")
     print("=" * 70)
     print("API Endpoints:")
-    print("  GET    /books       - Retrieve all books")
+    print("  GET    /books       - Retrieve all books (?limit=&cursor=, ?stream=1)")
+    print("                        filters: ?author=, ?min_price=&max_price=")
     print("  GET    /books/<id>  - Retrieve a specific book")
+    print("  GET    /books/search?q=  - Search titles and authors")
+    print("  GET    /books/stats - Price statistics (?p=50,95)")
+    print("  GET    /books/changes?since=  - Change feed (?wait= long-poll, ?stream=1 SSE)")
+    print("  GET    /metrics     - Prometheus metrics")
     print("  POST   /books       - Create a new book")
     print("  PUT    /books/<id>  - Update a book")
     print("  DELETE /books/<id>  - Delete a book")
+    print("  POST   /books:batch - Bulk create/update/delete")
     print("=" * 70)
-    print("Server starting on http://127.0.0.1:5000")
+    print(f"Storage backend: {STORE_TYPE}" + (f" (data dir: {DATA_DIR})" if STORE_TYPE != 'memory' else "")
+          + (f", {SHARDS} shard(s)" if SHARDS is not None else ""))
+    print(f"Server starting on http://{HOST}:{PORT}")
     print("Press Ctrl+C to stop the server")
     print("=" * 70)
     
-    app.run(host='127.0.0.1', port=5000)
+    app.run(host=HOST, port=PORT, threaded=True)
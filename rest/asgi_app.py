@@ -0,0 +1,412 @@
+"""
+REST API (ASGI) - Book Management System
+========================================
+An asyncio-native entry point for the same Book API served by app.py.
+
+Why ASGI?
+---------
+The Flask app in app.py is a WSGI application: every in-flight request
+occupies a server thread, even while it just waits on a slow client. This
+module exposes the same routes as a plain ASGI application, so an asyncio
+server (such as uvicorn) can keep thousands of concurrent keep-alive
+connections open from a single process and a single thread.
+
+Same API, Same Data:
+--------------------
+The routes, query parameters, status codes, ETags, compression and JSON
+bodies match app.py. Both front ends share app.py's store, indexes and
+request helpers, so a feature added there (filters, search, batching...)
+behaves the same way here. Reads come from memory, so read handlers run
+straight through on the event loop; streamed listings yield to it between
+chunks. Writes can block: a durable store may fsync, and a write waits for
+its turn behind other writes or, with a shared store, for the store
+process. So writes run on a worker thread (asyncio.to_thread) while the
+loop keeps serving other requests.
+
+When BOOKS_STORE_ADDRESS points at a shared store (see serve_multi.py), the
+replica catches up with writes made through other processes before every
+request, like app.py's before_request hook.
+
+API Endpoints:
+--------------
+GET    /books          - Retrieve all books (?limit=&cursor=, ?stream=1, filters)
+GET    /books/<id>     - Retrieve a specific book by ID
+GET    /books/search   - Ranked full-text search / autocomplete (?q=&limit=)
+GET    /books/stats    - Price count/min/max/mean/percentiles (?p=50,95)
+GET    /books/changes  - Feed of changes after ?since=<offset> (long-poll or SSE)
+GET    /metrics        - Request counts, latencies and sizes (Prometheus text format)
+POST   /books          - Create a new book
+PUT    /books/<id>     - Update an existing book
+DELETE /books/<id>     - Delete a book
+POST   /books:batch    - Apply many create/update/delete operations in one request
+
+Usage:
+------
+1. Install an ASGI server: pip install uvicorn
+2. Start the server: python asgi_app.py [--port 5000]
+   (or: uvicorn asgi_app:app --port 5000)
+3. Use it exactly like the Flask server, e.g. python client_interactive.py
+"""
+
+import argparse
+import asyncio
+import json
+import re
+from http import HTTPStatus
+from urllib.parse import parse_qsl
+
+import app as api
+from app import BookError
+from compression import COMPRESSION_MIN_SIZE, compress, negotiate_encoding
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+
+# Matches /books/<id> and captures the ID
+BOOK_PATH = re.compile(r'^/books/(\d+)$')
+
+# Paths with a fixed route, used as the metrics "route" label
+ROUTES = ('/books', '/books/search', '/books/stats', '/books/changes', '/books:batch', '/metrics')
+
+
+def route_of(path):
+    """Return the route label for metrics, named like the Flask URL rules."""
+    if path in ROUTES:
+        return path
+    if BOOK_PATH.match(path):
+        return '/books/<int:book_id>'
+    return 'unmatched'
+
+
+def parse_query(raw):
+    """Parse a query string; like Flask's request.args.get(), the first value wins."""
+    args = {}
+    for key, value in parse_qsl(raw.decode('latin-1'), keep_blank_values=True):
+        args.setdefault(key, value)
+    return args
+
+
+def etag_matches(headers, etag):
+    """Return True if the If-None-Match header already contains `etag`."""
+    header = headers.get('if-none-match')
+    if not header:
+        return False
+    for tag in header.split(','):
+        tag = tag.strip()
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        if tag == '*' or tag == f'"{etag}"':
+            return True
+    return False
+
+
+async def read_body(receive):
+    """Read the complete request body from the ASGI receive channel."""
+    chunks = []
+    more_body = True
+    while more_body:
+        message = await receive()
+        chunks.append(message.get('body', b''))
+        more_body = message.get('more_body', False)
+    return b''.join(chunks)
+
+
+async def read_json(receive, headers):
+    """
+    Read and decode a JSON request body.
+
+    Raises:
+        BookError: 415 if the body isn't declared as JSON, 400 if it doesn't parse
+    """
+    if not headers.get('content-type', '').startswith('application/json'):
+        raise BookError(415, "Request body must be application/json")
+    try:
+        return json.loads(await read_body(receive))
+    except ValueError:
+        raise BookError(400, "Request body is not valid JSON")
+
+
+async def send_response(send, status, body=b'', headers=()):
+    """Send a complete response with the given status, body bytes and headers."""
+    header_list = [(b'content-length', str(len(body)).encode())]
+    header_list += [(k.encode('latin-1'), v.encode('latin-1')) for k, v in headers]
+    await send({'type': 'http.response.start', 'status': status, 'headers': header_list})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def encode_body(status, obj, headers, encoding):
+    """
+    Encode `obj` like Flask's jsonify() and compress it like app.compress_response().
+    
+    Returns:
+        tuple: (body bytes, headers including content-type and any content-encoding)
+    """
+    return finish_body(status, api.encode_json(obj) + '\n', headers, encoding)
+
+
+def finish_body(status, text, headers, encoding):
+    """Like encode_body(), for a body that is already JSON text."""
+    body = text.encode('utf-8')
+    headers = [('content-type', 'application/json'), ('vary', 'Accept-Encoding')] + list(headers)
+    if encoding is not None and status == 200 and len(body) >= COMPRESSION_MIN_SIZE:
+        body = compress(body, encoding)
+        headers = [(k, 'W/' + v if k == 'etag' else v) for k, v in headers]
+        headers.append(('content-encoding', encoding))
+    return body, headers
+
+
+async def send_json(send, status, obj, headers=(), encoding=None):
+    """Send `obj` as a JSON response, compressed if `encoding` is given and it's worth it."""
+    body, headers = encode_body(status, obj, headers, encoding)
+    await send_response(send, status, body, headers)
+
+
+async def send_error(send, status):
+    """Send a JSON error body for an HTTP status code."""
+    await send_json(send, status, {"error": HTTPStatus(status).phrase})
+
+
+async def get_books(scope, receive, send, args, headers):
+    """GET /books - see app.get_books()."""
+    limit, cursor, after_id = api.parse_paging(args)
+    fields = api.parse_fields(args)
+    etag = api.listing_etag(fields)
+    etag_headers = [('etag', f'"{etag}"'), ('cache-control', 'no-cache')]
+    if etag_matches(headers, etag):
+        await send_response(send, 304, headers=etag_headers)
+        return
+
+    encoding = negotiate_encoding(headers.get('accept-encoding'))
+    query = scope.get('query_string', b'')
+    if encoding is not None and not api.wants_stream(args):
+        entry = api.listing_cache.get(etag, query, encoding)
+        if entry is not None:
+            await send_response(send, 200, *entry)
+            return
+
+    selected = api.select_ids(args)
+    if api.wants_stream(args):
+        header_list = [(b'content-type', b'application/json')]
+        header_list += [(k.encode(), v.encode()) for k, v in etag_headers]
+        await send({'type': 'http.response.start', 'status': 200, 'headers': header_list})
+        for chunk in api.stream_books(after_id, limit, selected, fields):
+            await send({'type': 'http.response.body', 'body': chunk.encode('utf-8'), 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+
+    page, next_cursor = api.list_books(limit, cursor, after_id, selected, fields)
+    if next_cursor:
+        host = headers.get('host', f"{api.HOST}:{api.PORT}")
+        base_url = f"{scope.get('scheme', 'http')}://{host}{scope['path']}"
+        etag_headers += [('x-next-cursor', next_cursor),
+                         ('link', api.next_link(base_url, args, limit, next_cursor))]
+    body, response_headers = finish_body(200, page, etag_headers, encoding)
+    if ('content-encoding', encoding) in response_headers:
+        api.listing_cache.put(etag, query, encoding, (body, response_headers))
+    await send_response(send, 200, body, response_headers)
+
+
+async def get_book(send, book_id, args, headers):
+    """GET /books/<id> - see app.get_book()."""
+    fields = api.parse_fields(args)
+    if api.store.book_version(book_id) is None:
+        raise BookError(404, f"Book {book_id} not found")
+    etag = api.book_etag(book_id, fields)
+    etag_headers = [('etag', f'"{etag}"'), ('cache-control', 'no-cache')]
+    if etag_matches(headers, etag):
+        await send_response(send, 304, headers=etag_headers)
+        return
+    text = api.fragments.fragment(book_id, fields)
+    if text is None:
+        raise BookError(404, f"Book {book_id} not found")
+    body, response_headers = finish_body(200, f'{{"{book_id}":{text}}}\n', etag_headers,
+                                         negotiate_encoding(headers.get('accept-encoding')))
+    await send_response(send, 200, body, response_headers)
+
+
+async def get_stats(send, args, headers):
+    """GET /books/stats - see app.get_stats()."""
+    percentiles = api.parse_percentiles(args)
+    etag = api.stats_etag()
+    etag_headers = [('etag', f'"{etag}"'), ('cache-control', 'no-cache')]
+    if etag_matches(headers, etag):
+        await send_response(send, 304, headers=etag_headers)
+        return
+    await send_json(send, 200, api.price_stats.summary(percentiles), etag_headers,
+                    negotiate_encoding(headers.get('accept-encoding')))
+
+
+async def get_changes(receive, send, args, headers):
+    """
+    GET /books/changes - see app.get_changes().
+    
+    Long-polls and event streams wait on the change log without holding a
+    thread, so idle subscribers cost one coroutine each.
+    """
+    since, limit, wait, stream = api.parse_changes_args(args, {
+        'Accept': headers.get('accept', ''), 'Last-Event-ID': headers.get('last-event-id')})
+    if not stream:
+        if wait:
+            await api.change_log.wait_async(since, wait)
+        await send_json(send, 200, api.changes_page(since, limit))
+        return
+
+    await send({'type': 'http.response.start', 'status': 200, 'headers': [
+        (b'content-type', b'text/event-stream'), (b'cache-control', b'no-cache'),
+        (b'x-accel-buffering', b'no')]})
+    # The stream never ends by itself: stop once the client disconnects
+    disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+    try:
+        await send({'type': 'http.response.body', 'body': b'retry: 1000\n\n', 'more_body': True})
+        while not disconnected.done():
+            if not api.change_log.covers(since):
+                await send({'type': 'http.response.body', 'body': b'event: reset\ndata: {}\n\n'})
+                return
+            changes = api.change_log.read(since, api.STREAM_CHUNK_SIZE)
+            if changes:
+                chunk = ''.join(api.sse_event(c) for c in changes)
+                since = changes[-1]['offset']
+            elif await api.change_log.wait_async(since, api.SSE_KEEPALIVE):
+                continue
+            else:
+                chunk = ': keep-alive\n\n'
+            await send({'type': 'http.response.body', 'body': chunk.encode('utf-8'), 'more_body': True})
+    finally:
+        disconnected.cancel()
+
+
+async def wait_for_disconnect(receive):
+    """Return once the ASGI server reports that the client went away."""
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def sync_replica():
+    """Catch up with writes made through other processes, if the store is a replica."""
+    store = api.store
+    # Reading the published version is cheap; only a replica that is behind
+    # asks the store process, and does it off the event loop
+    if api.STORE_ADDRESS and store.published_version() != store.version():
+        await asyncio.to_thread(store.sync)
+
+
+async def dispatch(scope, receive, send):
+    """Route one HTTP request to its handler."""
+    method = scope['method']
+    path = scope['path']
+    args = parse_query(scope.get('query_string', b''))
+    headers = {k.decode('latin-1').lower(): v.decode('latin-1') for k, v in scope.get('headers', [])}
+
+    if path == '/books':
+        if method == 'GET':
+            return await get_books(scope, receive, send, args, headers)
+        if method == 'POST':
+            book_id = await asyncio.to_thread(api.create_book, await read_json(receive, headers))
+            return await send_json(send, 201, {"message": "Book added", "id": book_id})
+        raise BookError(405, "Method not allowed")
+
+    if path == '/books/search':
+        if method == 'GET':
+            return await send_json(send, 200, api.run_search(args), (),
+                                   negotiate_encoding(headers.get('accept-encoding')))
+        raise BookError(405, "Method not allowed")
+
+    if path == '/books/stats':
+        if method == 'GET':
+            return await get_stats(send, args, headers)
+        raise BookError(405, "Method not allowed")
+
+    if path == '/books/changes':
+        if method == 'GET':
+            return await get_changes(receive, send, args, headers)
+        raise BookError(405, "Method not allowed")
+
+    if path == '/metrics':
+        if method == 'GET':
+            body = api.metrics.render().encode('utf-8')
+            return await send_response(send, 200, body, [('content-type', METRICS_CONTENT_TYPE)])
+        raise BookError(405, "Method not allowed")
+
+    if path == '/books:batch':
+        if method == 'POST':
+            body, status = await asyncio.to_thread(api.run_batch, await read_json(receive, headers))
+            return await send_json(send, status, body)
+        raise BookError(405, "Method not allowed")
+
+    match = BOOK_PATH.match(path)
+    if match:
+        book_id = int(match.group(1))
+        if method == 'GET':
+            return await get_book(send, book_id, args, headers)
+        if method == 'PUT':
+            await asyncio.to_thread(api.modify_book, book_id, await read_json(receive, headers))
+            return await send_json(send, 200, {"message": "Book updated", "id": book_id})
+        if method == 'DELETE':
+            await asyncio.to_thread(api.remove_book, book_id)
+            return await send_json(send, 200, {"message": "Book deleted", "id": book_id})
+        raise BookError(405, "Method not allowed")
+
+    raise BookError(404, "Not found")
+
+
+async def app(scope, receive, send):
+    """ASGI application entry point."""
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                api.store.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    if scope['type'] != 'http':
+        return
+
+    # Record the status and body size for the metrics as the response goes out
+    response = {'status': 500, 'size': 0, 'streamed': False}
+
+    async def measured_send(message):
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+        elif message['type'] == 'http.response.body':
+            response['size'] += len(message.get('body', b''))
+            response['streamed'] |= message.get('more_body', False)
+        await send(message)
+
+    started = api.metrics.start()
+    try:
+        await sync_replica()
+        await dispatch(scope, receive, measured_send)
+    except BookError as e:
+        await send_error(measured_send, e.status)
+    finally:
+        api.metrics.finish(scope['method'], route_of(scope['path']), response['status'], started,
+                           None if response['streamed'] else response['size'])
+
+
+def main():
+    """Serve the ASGI app with uvicorn."""
+    parser = argparse.ArgumentParser(description="Serve the Book API as an asyncio (ASGI) application")
+    parser.add_argument('--host', default=api.HOST, help=f"bind address (default: {api.HOST})")
+    parser.add_argument('--port', type=int, default=api.PORT, help=f"port (default: {api.PORT})")
+    args = parser.parse_args()
+
+    try:
+        import uvicorn
+    except ImportError:
+        print("[ERROR] The ASGI mode needs an ASGI server: pip install uvicorn")
+        raise SystemExit(1)
+
+    print("=" * 70)
+    print("REST API SERVER (ASGI) - Book Management System")
+    print("=" * 70)
+    print(f"Storage backend: {api.STORE_TYPE}")
+    print(f"Server starting on http://{args.host}:{args.port} (asyncio, single process)")
+    print("Press Ctrl+C to stop the server")
+    print("=" * 70)
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level='warning', backlog=4096)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""
+Serving Benchmark - Flask (WSGI, threaded) vs ASGI (asyncio)
+=============================================================
+Starts app.py and asgi_app.py as local servers and drives both with the same
+number of concurrent keep-alive clients, reporting throughput and latency.
+
+How it Works:
+- Each server runs in its own subprocess on its own port
+- The load generator is a single asyncio process: every simulated client is
+  one persistent HTTP/1.1 connection sending requests back to back
+- For each concurrency level the clients run for a fixed duration and every
+  request's latency is recorded
+
+Output (per server and concurrency level):
+- req/s and p50/p95/p99 latency in milliseconds
+- errors (failed connections or requests)
+
+Usage:
+    python bench_asgi.py                            # 10, 100, 500 clients
+    python bench_asgi.py --concurrency 50,1000 --duration 10
+    python bench_asgi.py --path "/books?limit=100" --json
+Requires uvicorn for the ASGI server (pip install uvicorn).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+HOST = '127.0.0.1'
+
+# Ports used for the two servers during the benchmark
+FLASK_PORT = 5101
+ASGI_PORT = 5102
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def start_server(kind, port):
+    """Start app.py ("flask") or asgi_app.py ("asgi") on `port`."""
+    env = dict(os.environ, BOOKS_PORT=str(port))
+    script = 'app.py' if kind == 'flask' else 'asgi_app.py'
+    return subprocess.Popen([sys.executable, os.path.join(HERE, script)], cwd=HERE, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def wait_for_port(port, timeout=15.0):
+    """Block until something accepts connections on `port`."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection((HOST, port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Server on port {port} did not start")
+
+
+async def read_response(reader):
+    """Read one HTTP response; return True if the server keeps the connection open."""
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            key, value = line.split(':', 1)
+            headers[key.strip().lower()] = value.strip()
+    await reader.readexactly(int(headers.get('content-length', 0)))
+    http10 = lines[0].startswith('HTTP/1.0')
+    return headers.get('connection', '').lower() != 'close' and not http10
+
+
+async def client(port, path, deadline, latencies, errors):
+    """One keep-alive client sending GET requests until the deadline."""
+    request = f"GET {path} HTTP/1.1\r\nHost: {HOST}:{port}\r\n\r\n".encode('latin-1')
+    writer = None
+    while time.perf_counter() < deadline:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(HOST, port)
+            start = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            keep_alive = await read_response(reader)
+            latencies.append(time.perf_counter() - start)
+            if not keep_alive:
+                writer.close()
+                writer = None
+        except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            errors.append(1)
+            if writer is not None:
+                writer.close()
+            writer = None
+            await asyncio.sleep(0.01)
+    if writer is not None:
+        writer.close()
+
+
+def percentile(sorted_values, fraction):
+    """Return the value at `fraction` (0-1) of an already sorted list."""
+    if not sorted_values:
+        return float('nan')
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+async def run_load(port, path, concurrency, duration):
+    """Drive `concurrency` clients against `port` for `duration` seconds."""
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(*(client(port, path, deadline, latencies, errors) for _ in range(concurrency)))
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "req_per_sec": len(latencies) / duration,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the Flask and ASGI servers under concurrent load")
+    parser.add_argument('--concurrency', default='10,100,500',
+                        help="comma-separated client counts (default: 10,100,500)")
+    parser.add_argument('--duration', type=float, default=3.0, help="seconds per run (default: 3)")
+    parser.add_argument('--path', default='/books/1', help="request path (default: /books/1)")
+    parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = parser.parse_args()
+    levels = [int(c) for c in args.concurrency.split(',')]
+
+    results = []
+    for kind, port in (('flask', FLASK_PORT), ('asgi', ASGI_PORT)):
+        server = start_server(kind, port)
+        try:
+            wait_for_port(port)
+            for concurrency in levels:
+                result = asyncio.run(run_load(port, args.path, concurrency, args.duration))
+                result["server"] = kind
+                results.append(result)
+                if not args.json:
+                    print(f"[{kind:>5}] {concurrency:>5} clients: {result['req_per_sec']:>9,.0f} req/s  "
+                          f"p50 {result['p50_ms']:7.2f} ms  p95 {result['p95_ms']:7.2f} ms  "
+                          f"p99 {result['p99_ms']:7.2f} ms  errors {result['errors']}")
+        finally:
+            server.terminate()
+            server.wait()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""
+Serialization Benchmark - jsonify vs Cached JSON Fragments
+==========================================================
+Measures how long it takes to turn books into a JSON response body, the way
+GET /books and GET /books/<id> used to (encoding every book dict on every
+request, like jsonify()) and the way they do now (joining cached per-book
+fragments from fragments.py).
+
+Cases (each timed per request):
+- full:  the whole catalogue, GET /books
+- page:  one page of 100 books, GET /books?limit=100
+- book:  a single book, GET /books/<id>
+For the fragment cache, "cold" is the first request after every book changed
+(all fragments invalid), "warm" is every request after that.
+
+Projection:
+The whole catalogue and the page are also listed with ?fields=title,price
+(warm fragments), reporting the body size and time next to the full listing.
+
+Usage:
+    python bench_serialize.py                    # 10,000 books, memory store
+    python bench_serialize.py --books 100000 --store columnar
+    python bench_serialize.py --json             # machine-readable output
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+
+from bench_store import LAYOUTS, make_books
+from fragments import FragmentCache, encode_book
+from store import open_store
+
+# Page size used for the "page" case
+PAGE_SIZE = 100
+
+# Fields kept by the projection cases (?fields=title,price)
+PROJECTION = ('title', 'price')
+
+
+def per_request(fn, requests):
+    """Run `fn` `requests` times and return the mean time per call in microseconds."""
+    start = time.perf_counter()
+    for _ in range(requests):
+        fn()
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def bench(store, requests):
+    """Time every case before (re-encoding) and after (fragments) for `store`."""
+    fragments = FragmentCache(store)
+    fragments.attach()
+    all_ids = store.ids_after(0, sys.maxsize)
+    page = all_ids[len(all_ids) // 2:len(all_ids) // 2 + PAGE_SIZE]
+    rng = random.Random(3)
+
+    def encode_all():
+        return encode_book({str(k): v for k, v in store.items()})
+
+    def encode_page():
+        return encode_book({str(k): store.get(k) for k in page})
+
+    def encode_one():
+        book_id = rng.choice(all_ids)
+        return encode_book({str(book_id): store.get(book_id)})
+
+    def fragments_one():
+        book_id = rng.choice(all_ids)
+        return f'{{"{book_id}":{fragments.fragment(book_id)}}}'
+
+    # Cold: the first listing, before any fragment was encoded
+    start = time.perf_counter()
+    listing = fragments.listing(all_ids)
+    full_cold = (time.perf_counter() - start) * 1e6
+    assert json.loads(listing) == json.loads(encode_all())
+
+    projected = fragments.listing(all_ids, PROJECTION)
+    assert all(set(book) == set(PROJECTION) for book in json.loads(projected).values())
+
+    full_requests = max(1, requests // 20)
+    return {
+        "store": store.__class__.__name__,
+        "books": store.count(),
+        "full_before_us": per_request(encode_all, full_requests),
+        "full_cold_us": full_cold,
+        "full_after_us": per_request(lambda: fragments.listing(all_ids), full_requests),
+        "page_before_us": per_request(encode_page, requests),
+        "page_after_us": per_request(lambda: fragments.listing(page), requests),
+        "book_before_us": per_request(encode_one, requests),
+        "book_after_us": per_request(fragments_one, requests),
+        "full_bytes": len(listing.encode('utf-8')),
+        "full_projected_bytes": len(projected.encode('utf-8')),
+        "full_projected_us": per_request(lambda: fragments.listing(all_ids, PROJECTION), full_requests),
+        "page_bytes": len(fragments.listing(page).encode('utf-8')),
+        "page_projected_bytes": len(fragments.listing(page, PROJECTION).encode('utf-8')),
+        "page_projected_us": per_request(lambda: fragments.listing(page, PROJECTION), requests)
+    }
+
+
+def print_table(result):
+    """Print the timings as a human-readable table."""
+    print("=" * 70)
+    print(f"SERIALIZATION BENCHMARK - {result['books']:,} books ({result['store']})")
+    print("=" * 70)
+    print(f"{'Case':<24} {'jsonify':>14} {'fragments':>14} {'speed-up':>10}")
+    print("-" * 70)
+    for case, label in (('full', 'GET /books'), ('page', f'GET /books?limit={PAGE_SIZE}'),
+                        ('book', 'GET /books/<id>')):
+        before, after = result[f'{case}_before_us'], result[f'{case}_after_us']
+        print(f"{label:<24} {before:>11,.1f} us {after:>11,.1f} us {before / after:>9.1f}x")
+    print("-" * 70)
+    print(f"First GET /books after every book changed (cold cache): {result['full_cold_us']:,.0f} us")
+    print("-" * 70)
+    print(f"{'?fields=' + ','.join(PROJECTION):<28} {'all fields':>12} {'projected':>12} {'smaller':>10}")
+    print("-" * 70)
+    for case, label in (('full', 'GET /books'), ('page', f'GET /books?limit={PAGE_SIZE}')):
+        full, projected = result[f'{case}_bytes'], result[f'{case}_projected_bytes']
+        print(f"{label + ' (bytes)':<28} {full:>12,} {projected:>12,} {full / projected:>9.1f}x")
+        print(f"{label + ' (time)':<28} {result[f'{case}_after_us']:>9,.1f} us "
+              f"{result[f'{case}_projected_us']:>9,.1f} us")
+    print("=" * 70)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-request JSON serialization cost, with and without fragments")
+    parser.add_argument('--books', type=int, default=10000, help="catalogue size (default: 10000)")
+    parser.add_argument('--requests', type=int, default=2000, help="requests timed per case (default: 2000)")
+    parser.add_argument('--store', choices=LAYOUTS, default='memory',
+                        help="in-memory layout to read from (default: memory)")
+    parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = parser.parse_args()
+
+    store = open_store(args.store)
+    for book in make_books(args.books):
+        store.create(book)
+
+    result = bench(store, args.requests)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_table(result)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""
+Store Benchmark - Dict vs Columnar Book Layout
+==============================================
+Compares the memory footprint and throughput of the in-memory storage
+layouts in store.py:
+- memory:   one Python dict per book (MemoryBookStore)
+- columnar: typed array columns with interned authors (ColumnarBookStore)
+
+For each layout the benchmark loads N synthetic books and reports:
+- Memory:   bytes allocated by the store (tracemalloc), total and per book
+- create/s: store.create() throughput while loading
+- get/s:    random store.get() lookups
+- update/s: random price updates (re-indexing included)
+- list/s:   books per second through store.items()
+- range/s:  price-range queries per second (100 results each)
+
+Usage:
+    python bench_store.py                   # 200,000 books
+    python bench_store.py --books 1000000
+    python bench_store.py --json            # machine-readable output
+"""
+
+import argparse
+import gc
+import json
+import random
+import time
+import tracemalloc
+
+from store import open_store
+
+# Layouts compared by this benchmark
+LAYOUTS = ('memory', 'columnar')
+
+# Number of distinct authors in the synthetic catalogue
+AUTHOR_COUNT = 5000
+
+
+def make_books(count, seed=42):
+    """Generate `count` synthetic books with realistic-looking fields."""
+    rng = random.Random(seed)
+    authors = [f"Author {i:05d}" for i in range(AUTHOR_COUNT)]
+    for i in range(count):
+        yield {
+            "title": f"Book Title Number {i:07d}",
+            # Parsed JSON hands us a new string per book, not a shared one
+            "author": "".join(rng.choice(authors)),
+            "price": round(rng.uniform(5.0, 150.0), 2)
+        }
+
+
+def rate(count, seconds):
+    """Operations per second, guarding against a zero duration."""
+    return count / seconds if seconds > 0 else float('inf')
+
+
+def bench_layout(layout, count, ops):
+    """Load `count` books into a `layout` store and time the common operations."""
+    books = list(make_books(count))
+    rng = random.Random(7)
+    gc.collect()
+
+    tracemalloc.start()
+    start_mem = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    store = open_store(layout)
+    for book in books:
+        store.create(book)
+    create_time = time.perf_counter() - start
+    gc.collect()
+    memory = tracemalloc.get_traced_memory()[0] - start_mem
+    tracemalloc.stop()
+    del books  # Only the store's own copies remain
+
+    ids = [rng.randint(1, count) for _ in range(ops)]
+    start = time.perf_counter()
+    for book_id in ids:
+        store.get(book_id)
+    get_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for book_id in ids[:ops // 10]:
+        store.update(book_id, {"price": round(rng.uniform(5.0, 150.0), 2)})
+    update_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    listed = len(store.items())
+    list_time = time.perf_counter() - start
+
+    queries = ops // 100
+    start = time.perf_counter()
+    for _ in range(queries):
+        low = rng.uniform(5.0, 145.0)
+        store.price_range(low, low + 100 * 145.0 / count)
+    range_time = time.perf_counter() - start
+
+    return {
+        "layout": layout,
+        "books": count,
+        "memory_bytes": memory,
+        "bytes_per_book": memory / count,
+        "create_per_sec": rate(count, create_time),
+        "get_per_sec": rate(ops, get_time),
+        "update_per_sec": rate(ops // 10, update_time),
+        "list_books_per_sec": rate(listed, list_time),
+        "range_queries_per_sec": rate(queries, range_time)
+    }
+
+
+def print_table(results):
+    """Print the results side by side, with the columnar/dict ratio."""
+    print("=" * 70)
+    print(f"STORE BENCHMARK - {results[0]['books']:,} books")
+    print("=" * 70)
+    print(f"{'Metric':<24}" + "".join(f"{r['layout']:>15}" for r in results) + f"{'ratio':>10}")
+    print("-" * 70)
+    rows = [
+        ("Memory (MB)", "memory_bytes", 1 / 1e6),
+        ("Bytes per book", "bytes_per_book", 1),
+        ("create/s", "create_per_sec", 1),
+        ("get/s", "get_per_sec", 1),
+        ("update/s", "update_per_sec", 1),
+        ("list books/s", "list_books_per_sec", 1),
+        ("range queries/s", "range_queries_per_sec", 1)
+    ]
+    for label, key, scale in rows:
+        values = [r[key] * scale for r in results]
+        ratio = values[-1] / values[0] if values[0] else float('nan')
+        print(f"{label:<24}" + "".join(f"{v:>15,.1f}" for v in values) + f"{ratio:>9.2f}x")
+    print("=" * 70)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory/throughput benchmark of the book store layouts")
+    parser.add_argument('--books', type=int, default=200000, help="catalogue size (default: 200000)")
+    parser.add_argument('--ops', type=int, default=200000, help="random reads to time (default: 200000)")
+    parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = parser.parse_args()
+
+    results = [bench_layout(layout, args.books, args.ops) for layout in LAYOUTS]
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_table(results)
+
+
+if __name__ == '__main__':
+    main()
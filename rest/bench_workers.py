@@ -0,0 +1,181 @@
+"""
+Scaling Benchmark - Throughput vs Number of Worker Processes
+============================================================
+Starts serve_multi.py with 1, 2, 4... workers and measures how many
+requests per second the API answers with each, plus a consistency check.
+
+How it Works:
+- For each worker count a fresh serve_multi.py runs on its own port
+- Consistency check first: books are created over new connections (which
+  land on different workers) and each is read back over another new
+  connection; any 404 is a stale read, any repeated ID a duplicate
+- Then the load: several load-generator processes (so the client side
+  isn't limited to one core either) run keep-alive clients, like
+  bench_asgi.py, for a fixed duration after a short warm-up
+
+Speed-up can't exceed the number of CPU cores, which are also shared with
+the load generators and the store process; the report prints the count.
+
+Usage:
+    python bench_workers.py                          # 1, 2, 4 workers
+    python bench_workers.py --workers 1,2,4,8 --concurrency 64 --duration 10
+    python bench_workers.py --path "/books?limit=20" --json
+"""
+
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from bench_asgi import HOST, client, percentile
+
+# First port used for the servers under test (one per worker count)
+BASE_PORT = 5110
+
+# Seconds of load before measuring, so every worker has warmed up
+WARMUP = 1.0
+
+# Books written (and read back) by the consistency check
+CHECK_BOOKS = 50
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def start_server(workers, port, timeout=60.0):
+    """Start serve_multi.py and wait until all of its workers are ready."""
+    server = subprocess.Popen([sys.executable, os.path.join(HERE, 'serve_multi.py'),
+                               '--workers', str(workers), '--port', str(port)],
+                              cwd=HERE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    deadline = time.time() + timeout
+    ready = 0
+    while ready < workers:
+        line = server.stdout.readline()
+        if not line or time.time() > deadline:
+            server.kill()
+            raise RuntimeError(f"serve_multi.py with {workers} worker(s) did not start")
+        if line.startswith('[INFO] Worker') and line.rstrip().endswith('ready'):
+            ready += 1
+    return server
+
+
+def fresh_request(port, method, path, body=None):
+    """Send one request over a new connection; return (status, parsed JSON body)."""
+    conn = http.client.HTTPConnection(HOST, port, timeout=10)
+    try:
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+        response = conn.getresponse()
+        return response.status, json.loads(response.read() or 'null')
+    finally:
+        conn.close()
+
+
+def check_consistency(port, books=CHECK_BOOKS):
+    """
+    Write books and read each back through (likely) another worker.
+
+    Returns:
+        dict: stale_reads (404 right after a successful create) and
+        duplicate_ids (the same ID handed out twice)
+    """
+    ids, stale = [], 0
+    for i in range(books):
+        status, result = fresh_request(port, 'POST', '/books',
+                                       {"title": f"Consistency {i}", "author": "Bench", "price": 1.0})
+        if status != 201:
+            raise RuntimeError(f"POST /books failed with status {status}")
+        ids.append(result['id'])
+        status, _ = fresh_request(port, 'GET', f"/books/{result['id']}")
+        stale += status != 200
+    return {"stale_reads": stale, "duplicate_ids": len(ids) - len(set(ids))}
+
+
+async def drive_async(port, path, clients, duration):
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(*(client(port, path, deadline, latencies, errors) for _ in range(clients)))
+    return latencies, len(errors)
+
+
+def drive(port, path, clients, duration):
+    """Load-generator process: run `clients` keep-alive clients, return (latencies, errors)."""
+    return asyncio.run(drive_async(port, path, clients, duration))
+
+
+def run_load(pool, procs, port, path, concurrency, duration):
+    """Spread `concurrency` clients over `procs` processes and merge their results."""
+    shares = [concurrency // procs + (i < concurrency % procs) for i in range(procs)]
+    futures = [pool.submit(drive, port, path, share, duration) for share in shares if share]
+    latencies, errors = [], 0
+    for future in futures:
+        part, part_errors = future.result()
+        latencies.extend(part)
+        errors += part_errors
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "req_per_sec": len(latencies) / duration,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000
+    }
+
+
+def print_table(results, args):
+    """Print throughput per worker count as a human-readable table."""
+    print("=" * 70)
+    print(f"SCALING BENCHMARK - GET {args.path}, {args.concurrency} clients, {os.cpu_count()} CPU core(s)")
+    print("=" * 70)
+    print(f"{'Workers':>7} {'req/s':>10} {'speed-up':>9} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'errors':>7} {'stale':>6} {'dup IDs':>8}")
+    print("-" * 70)
+    base = results[0]["req_per_sec"] or 1
+    for r in results:
+        print(f"{r['workers']:>7} {r['req_per_sec']:>10,.0f} {r['req_per_sec'] / base:>8.2f}x "
+              f"{r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['errors']:>7} "
+              f"{r['stale_reads']:>6} {r['duplicate_ids']:>8}")
+    print("=" * 70)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure API throughput against the number of worker processes")
+    parser.add_argument('--workers', default='1,2,4', help="comma-separated worker counts (default: 1,2,4)")
+    parser.add_argument('--concurrency', type=int, default=32, help="concurrent clients (default: 32)")
+    parser.add_argument('--duration', type=float, default=5.0, help="seconds measured per run (default: 5)")
+    parser.add_argument('--path', default='/books/1', help="request path (default: /books/1)")
+    parser.add_argument('--load-procs', type=int, default=2,
+                        help="load-generator processes (default: 2)")
+    parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = parser.parse_args()
+    levels = [int(n) for n in args.workers.split(',')]
+
+    results = []
+    with ProcessPoolExecutor(max_workers=args.load_procs) as pool:
+        for index, workers in enumerate(levels):
+            port = BASE_PORT + index
+            server = start_server(workers, port)
+            try:
+                result = {"workers": workers, **check_consistency(port)}
+                run_load(pool, args.load_procs, port, args.path, args.concurrency, WARMUP)
+                result.update(run_load(pool, args.load_procs, port, args.path, args.concurrency, args.duration))
+            finally:
+                server.terminate()
+                server.wait()
+            results.append(result)
+            if not args.json:
+                print(f"[INFO] {workers} worker(s): {result['req_per_sec']:,.0f} req/s", flush=True)
+
+    if args.json:
+        print(json.dumps({"cpu_count": os.cpu_count(), "path": args.path,
+                          "concurrency": args.concurrency, "results": results}, indent=2))
+    else:
+        print_table(results, args)
+
+
+if __name__ == '__main__':
+    main()
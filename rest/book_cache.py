@@ -0,0 +1,140 @@
+"""
+Book Cache - Client-Side Read-Through Cache for the REST Client
+===============================================================
+Keeps the responses of recent GET requests in memory, so viewing the same
+listing or book again doesn't download it again.
+
+How a Read Works:
+-----------------
+1. Fresh entry (younger than `ttl` seconds): served from memory, no request
+2. Stale entry: revalidated with a conditional GET (If-None-Match with the
+   entry's ETag). The server answers 304 Not Modified without a body if
+   nothing changed, and the entry is fresh again; a 200 replaces it.
+3. No entry: plain GET; the response is cached if it carries an ETag
+
+A fresh entry can be up to `ttl` seconds behind changes made by *other*
+clients; use ttl=0 to revalidate on every read (still saving the download).
+The client's own POST/PUT/DELETE calls invalidate() the affected book and
+every listing right away, so it always sees its own writes.
+
+Eviction:
+---------
+At most `max_entries` responses are kept; the least recently used one is
+evicted to make room.
+
+Usage:
+    cache = BookCache(session, max_entries=128, ttl=30)
+    status, books, source = cache.get('http://127.0.0.1:5000/books')
+    # source: "hit", "revalidated" or "miss"
+    cache.invalidate(book_id)      # after creating/updating/deleting a book
+    cache.stats()                  # -> {"hits": ..., "misses": ..., ...}
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+# Paths of single-book resources; everything else under /books is a listing
+BOOK_PATH = re.compile(r'/books/(\d+)$')
+
+
+class BookCache:
+    """
+    LRU + TTL cache of GET responses, revalidated with ETags.
+
+    Args:
+        session (requests.Session): Session used for the requests
+        max_entries (int): Number of responses kept
+        ttl (float): Seconds an entry is served without asking the server
+    """
+
+    def __init__(self, session, max_entries=128, ttl=30.0):
+        self.session = session
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # url -> (etag, data, stored_at)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "revalidated": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def get(self, url, timeout=10):
+        """
+        Read `url` through the cache.
+
+        Returns:
+            tuple: (HTTP status, parsed JSON body or error text, source) where
+            source is "hit" (from memory), "revalidated" (304 from the server)
+            or "miss" (downloaded)
+
+        Raises:
+            requests.exceptions.RequestException: If the server can't be reached
+        """
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                self._entries.move_to_end(url)
+                if time.monotonic() - entry[2] < self.ttl:
+                    self._stats["hits"] += 1
+                    return 200, entry[1], "hit"
+
+        headers = {'If-None-Match': entry[0]} if entry is not None else {}
+        response = self.session.get(url, headers=headers, timeout=timeout)
+
+        with self._lock:
+            if response.status_code == 304 and entry is not None:
+                self._stats["revalidated"] += 1
+                self._store(url, entry[0], entry[1])
+                return 200, entry[1], "revalidated"
+
+            self._stats["misses"] += 1
+            if response.status_code != 200:
+                self._entries.pop(url, None)
+                return response.status_code, response.text, "miss"
+            data = response.json()
+            etag = response.headers.get('ETag')
+            if etag:
+                self._store(url, etag, data)
+            return 200, data, "miss"
+
+    def _store(self, url, etag, data):
+        """Insert or refresh an entry, evicting the least recently used if full."""
+        self._entries[url] = (etag, data, time.monotonic())
+        self._entries.move_to_end(url)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def invalidate(self, book_id=None):
+        """
+        Drop entries made stale by this client's own write.
+
+        Removes the entry of book `book_id` (if given) and every listing
+        (GET /books with any query, search, stats), since those may include it.
+        """
+        with self._lock:
+            for url in list(self._entries):
+                match = BOOK_PATH.search(urlsplit(url).path)
+                if match is None or (book_id is not None and int(match.group(1)) == int(book_id)):
+                    del self._entries[url]
+                    self._stats["invalidations"] += 1
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Return the cache statistics.
+
+        Returns:
+            dict: hits, revalidated, misses, evictions and invalidations
+            counts, the number of entries and the hit ratio (hits and
+            revalidations both avoided a download)
+        """
+        with self._lock:
+            stats = dict(self._stats, entries=len(self._entries))
+        reads = stats["hits"] + stats["revalidated"] + stats["misses"]
+        stats["hit_ratio"] = (stats["hits"] + stats["revalidated"]) / reads if reads else 0.0
+        return stats
@@ -0,0 +1,154 @@
+"""
+Change Log - Resumable Feed of Book Mutations
+=============================================
+A bounded, in-memory log of every create/update/delete, served as
+GET /books/changes so downstream caches can fetch only what changed instead
+of re-polling the whole listing.
+
+Offsets:
+--------
+Every change is numbered with the store version it produced, so offsets
+increase by one per change and match the version in the listing ETag. A
+consumer remembers the last offset it applied and asks for `since=<offset>`
+to resume, e.g. after a disconnect.
+
+Bounded History:
+----------------
+Only the newest `max_events` changes are kept. A consumer that falls
+further behind than that (or whose offset belongs to a previous run of the
+server: the consumer passes the store epoch it got with the offset) can't be
+served a delta; covers() tells the caller so it
+can answer 410 Gone, and the consumer reloads GET /books and resumes from
+the listing's version.
+
+Waiting:
+--------
+wait() blocks a thread and wait_async() suspends a coroutine until a change
+newer than `since` exists, which gives long-polling and server-sent events
+without busy loops.
+
+Usage:
+    change_log = ChangeLog()
+    change_log.attach(store)
+    change_log.read(since=41, limit=100)
+    # -> [{"offset": 42, "op": "update", "id": 7, "book": {...}}, ...]
+"""
+
+import asyncio
+import threading
+from collections import deque
+
+# Number of changes kept in memory
+DEFAULT_MAX_EVENTS = 10000
+
+
+class ChangeLog:
+    """
+    Ring buffer of change events fed by the store's change notifications.
+
+    Args:
+        max_events (int): Number of most recent changes kept
+    """
+
+    def __init__(self, max_events=DEFAULT_MAX_EVENTS):
+        self._events = deque(maxlen=max_events)
+        self._store = None
+        self._first = 1   # Offset of the oldest change still kept
+        self._latest = 0  # Offset of the newest change
+        self._cond = threading.Condition()
+        self._async_waiters = []
+
+    def attach(self, store):
+        """Record every change `store` makes from now on (existing books are not replayed)."""
+        with self._cond:
+            self._latest = store.version()
+            self._first = self._latest + 1
+        # add_listener() replays the existing books before returning; the
+        # feed only carries changes, so those calls are ignored
+        store.add_listener(self.on_change)
+        self._store = store
+
+    def on_change(self, op, book_id, book, old):
+        """Store listener: append one event and wake up everyone waiting."""
+        if self._store is None:
+            return
+        if op == 'delete':
+            event = {"op": "delete", "id": book_id}
+        else:
+            event = {"op": "update" if old is not None else "create", "id": book_id, "book": book}
+        with self._cond:
+            self._latest = event["offset"] = self._store.version()
+            if not self._events:
+                self._first = self._latest
+            elif len(self._events) == self._events.maxlen:
+                self._first = self._events[0]["offset"] + 1
+            self._events.append(event)
+            self._cond.notify_all()
+            waiters, self._async_waiters = self._async_waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_wake, future)
+
+    def latest(self):
+        """Return the offset of the newest change (the current store version)."""
+        return self._latest
+
+    def covers(self, since, epoch=None):
+        """
+        Return True if every change after `since` is still in the log.
+
+        Args:
+            since (int): Last offset the consumer has seen
+            epoch (str or None): Store epoch that offset belongs to, if the
+                consumer knows it. Offsets from another epoch (e.g. from
+                before a restart of a memory store) are never covered.
+        """
+        if epoch is not None and self._store is not None and epoch != self._store.epoch():
+            return False
+        with self._cond:
+            return self._first - 1 <= since <= self._latest
+
+    def read(self, since, limit):
+        """
+        Return up to `limit` changes with offsets greater than `since`, oldest first.
+
+        Check covers() first: changes already dropped from the log are
+        silently missing here.
+        """
+        with self._cond:
+            if since >= self._latest or not self._events:
+                return []
+            # Offsets are consecutive, so the start position is arithmetic
+            start = max(0, since + 1 - self._events[0]["offset"])
+            return [self._events[i] for i in range(start, min(start + limit, len(self._events)))]
+
+    def wait(self, since, timeout):
+        """
+        Block until there is a change newer than `since`, or `timeout` seconds pass.
+
+        Returns:
+            bool: True if there is a newer change
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: self._latest > since, timeout)
+
+    async def wait_async(self, since, timeout):
+        """Like wait(), but suspends the calling coroutine instead of a thread."""
+        loop = asyncio.get_running_loop()
+        with self._cond:
+            if self._latest > since:
+                return True
+            future = loop.create_future()
+            self._async_waiters.append((loop, future))
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            with self._cond:
+                if (loop, future) in self._async_waiters:
+                    self._async_waiters.remove((loop, future))
+        return self._latest > since
+
+
+def _wake(future):
+    """Resolve a wait_async() future (runs on the future's event loop)."""
+    if not future.done():
+        future.set_result(None)
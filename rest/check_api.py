@@ -0,0 +1,338 @@
+"""
+API Checks - Book Management System
+===================================
+Runs the REST API's trickier behaviours end to end (in process, through
+Flask's test client or the helper classes directly) and checks the answers.
+stress_store.py covers the stores under concurrency; this covers what is
+built on top of them.
+
+Checks:
+1. Search ranking: completions and prefix searches are ranked over every
+   matching word, so the most popular completion is returned even when it
+   was indexed last, behind more words than one answer holds, and the
+   rankings kept on the trie match a full recount after random edits
+2. Change feed across a restart: an offset (or event stream ID) from a
+   previous run of a memory store must get 410 Gone, not a delta that
+   happens to exist under the same numbers in the new run
+3. Bad field types: a title or author that isn't a string gets 400, and
+   leaves a columnar store exactly as it was
+4. Non-finite prices: NaN and infinite prices get 400, and price statistics
+   stay valid JSON even if such a price reaches them
+5. Fragment cache size: listings (full and projected) bigger than the
+   cache's cap stay correct while the cache stays under its cap
+6. Atomic batches: a failing batch leaves no trace (no change-feed event,
+   no used-up ID) in any backend, a successful one is applied in full, and
+   a batch logged by the "log" backend is replayed after a restart
+7. ASGI on a shared store: asgi_app.py serves a book written through
+   another process's replica right away, and its writes (run on a worker
+   thread) reach the store process
+
+Usage:
+    python check_api.py
+Exits with status 1 if any check fails.
+"""
+
+import asyncio
+import importlib
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+from multiprocessing.connection import Listener
+
+from shared_store import StoreService, connect_store
+from search import DEFAULT_COMPLETIONS, MAX_COMPLETIONS, SearchIndex, book_tokens
+from fragments import FragmentCache, encode_book
+from stats import PriceStats
+from store import BatchError, DurableBookStore, MemoryBookStore, open_store
+
+
+def check_search_ranking():
+    """The most popular completion must win even if it was indexed last."""
+    index = SearchIndex()
+    rare = DEFAULT_COMPLETIONS * 2
+    for book_id in range(rare):
+        index.add(book_id, {"title": f"distributed{book_id:04d}", "author": "Lamport", "price": 1.0})
+    for book_id in range(rare, rare + 5):
+        index.add(book_id, {"title": "distributed systems", "author": "Tanenbaum", "price": 1.0})
+
+    failures = []
+    completions = index.complete("dist")
+    if completions[:1] != ["distributed"]:
+        failures.append(f"most popular completion missing, got {completions[:3]}")
+    if len(completions) != DEFAULT_COMPLETIONS:
+        failures.append(f"expected {DEFAULT_COMPLETIONS} completions, got {len(completions)}")
+    # The prefix expands to its top completions: the 5 popular books plus
+    # one rare book for each remaining completion
+    matched = {book_id for book_id, _ in index.search("dist", limit=rare + 5)}
+    expected = set(range(rare, rare + 5)) | set(range(DEFAULT_COMPLETIONS - 1))
+    if matched != expected:
+        failures.append(f"prefix search matched {len(matched)} books, expected {len(expected)}")
+    failures.extend(check_ranking_upkeep())
+    return failures
+
+
+def check_ranking_upkeep():
+    """Rankings kept on the trie must match a full recount after random edits."""
+    rng = random.Random(8)
+    words = [''.join(rng.choice('abcd') for _ in range(rng.randint(1, 5))) for _ in range(1000)]
+    index, books = SearchIndex(), {}
+    for step in range(4000):
+        book_id = rng.randrange(400)
+        if book_id in books and rng.random() < 0.5:
+            index.on_change('delete', book_id, None, books.pop(book_id))
+        else:
+            book = {"title": ' '.join(rng.sample(words, 3)), "author": rng.choice(words)}
+            index.on_change('put', book_id, book, books.get(book_id))
+            books[book_id] = book
+
+    counts = {}
+    for book in books.values():
+        for token in book_tokens(book):
+            counts[token] = counts.get(token, 0) + 1
+    for prefix in ['', 'a', 'b', 'ab', 'ca', 'abc', 'dd']:
+        expected = sorted((t for t in counts if t.startswith(prefix)),
+                          key=lambda t: (-counts[t], t))[:MAX_COMPLETIONS]
+        got = index.complete(prefix, MAX_COMPLETIONS)
+        if got != expected:
+            return [f"completions of {prefix!r} drifted from a recount: {got[:5]} vs {expected[:5]}"]
+    return []
+
+
+def start_app(store='memory'):
+    """(Re)start app.py in this process on a fresh store; return its test client."""
+    os.environ['BOOKS_STORE'] = store
+    os.environ.pop('BOOKS_SHARDS', None)
+    import app as api
+    if getattr(start_app, 'started', False):
+        api = importlib.reload(api)
+    start_app.started = True
+    return api, api.app.test_client()
+
+
+def make_changes(client, count):
+    for i in range(count):
+        client.post('/books', json={"title": f"Book {i}", "author": "Knuth", "price": float(i)})
+
+
+def check_changes_restart():
+    """Offsets from before a restart must be refused, not answered from the new run."""
+    _, client = start_app()
+    start = client.get('/books/changes').get_json()["next"]
+    make_changes(client, 3)
+    before = client.get(f'/books/changes?since={start}').get_json()
+    old_epoch, old_next = before["epoch"], before["next"]
+
+    # Restart, then make more changes than before, so the old offset is in range
+    _, client = start_app()
+    make_changes(client, old_next + 2)
+
+    failures = []
+    current = client.get('/books/changes').get_json()
+    if current["epoch"] == old_epoch:
+        failures.append("the store epoch didn't change across a restart")
+    status = client.get(f'/books/changes?since={old_next}&epoch={old_epoch}').status_code
+    if status != 410:
+        failures.append(f"offset from before the restart got {status}, expected 410")
+    status = client.get('/books/changes', headers={"Accept": "text/event-stream",
+                                                   "Last-Event-ID": f"{old_epoch}:{old_next}"}).status_code
+    if status != 410:
+        failures.append(f"event stream resumed from before the restart got {status}, expected 410")
+    page = client.get(f'/books/changes?since={old_next}&epoch={current["epoch"]}')
+    if page.status_code != 200 or page.get_json()["changes"][0]["offset"] != old_next + 1:
+        failures.append(f"offset from the current run got {page.status_code}, expected its changes")
+    return failures
+
+
+def check_bad_types():
+    """A wrongly typed field must be refused before it reaches the store."""
+    api, client = start_app('columnar')
+    count = api.store.count()
+    failures = []
+    for body in ({"title": "T", "author": ["a"], "price": 1.0},
+                 {"title": {"t": 1}, "author": "A", "price": 1.0}):
+        status = client.post('/books', json=body).status_code
+        if status != 400:
+            failures.append(f"POST {body} got {status}, expected 400")
+    try:
+        api.store.create({"title": "T", "author": ["a"], "price": 1.0})
+        failures.append("the store accepted an unhashable author")
+    except TypeError:
+        pass
+    if api.store.count() != count:
+        failures.append(f"store holds {api.store.count()} books after refused writes, expected {count}")
+    if client.post('/books', json={"title": "T", "author": "A", "price": 1.0}).status_code != 201:
+        failures.append("a valid book was refused after the bad ones")
+    return failures
+
+
+def check_non_finite_prices():
+    """NaN and infinite prices must be refused and never reach /books/stats."""
+    api, client = start_app()
+    failures = []
+    for price in ("NaN", "Infinity", "-Infinity", float('nan'), 1e309):
+        status = client.post('/books', json={"title": "T", "author": "A", "price": price}).status_code
+        if status != 400:
+            failures.append(f"price {price!r} got {status}, expected 400")
+
+    stats = PriceStats()
+    stats.on_change('put', 1, {"price": 2.0}, None)
+    stats.on_change('put', 2, {"price": float('nan')}, None)
+    stats.on_change('delete', 2, None, {"price": float('nan')})
+    summary = stats.summary((50,))
+    try:
+        json.dumps(summary, allow_nan=False)
+    except ValueError:
+        failures.append(f"stats summary isn't valid JSON: {summary}")
+    if summary["count"] != 1:
+        failures.append(f"stats count is {summary['count']} after a NaN price, expected 1")
+    return failures
+
+
+def check_fragment_cache_size():
+    """The fragment cache must stay under its cap while serving correct listings."""
+    store = MemoryBookStore()
+    for i in range(2000):
+        store.create({"title": f"Book {i}", "author": "Knuth", "price": float(i)})
+    ids = store.ids_after(0, sys.maxsize)
+    cap = 100_000
+    fragments = FragmentCache(store, max_bytes=cap)
+    fragments.attach()
+
+    failures = []
+    expected = {str(k): v for k, v in store.items()}
+    for fields in (None, ('title',), None):
+        listing = json.loads(fragments.listing(ids, fields))
+        want = expected if fields is None else {k: {"title": v["title"]} for k, v in expected.items()}
+        if listing != want:
+            failures.append(f"listing with fields={fields} is wrong")
+        if fragments.size > cap:
+            failures.append(f"cache holds {fragments.size} bytes, over its cap of {cap}")
+    store.update(ids[-1], {"price": 0.5})
+    if fragments.fragment(ids[-1]) != encode_book(store.get(ids[-1])):
+        failures.append("a changed book was served from the cache")
+    return failures
+
+
+def check_atomic_batch():
+    """A refused atomic batch must change nothing; an accepted one all of its books."""
+    api, client = start_app()
+    book_id = client.post('/books', json={"title": "T", "author": "A", "price": 1.0}).get_json()["id"]
+    since = client.get('/books/changes').get_json()["next"]
+    next_id = api.store.next_id()
+
+    failures = []
+    refused = client.post('/books:batch', json={"atomic": True, "operations": [
+        {"op": "create", "book": {"title": "New", "author": "A", "price": 2.0}},
+        {"op": "update", "id": book_id, "book": {"price": 3.0}},
+        {"op": "delete", "id": 999999}]})
+    body = refused.get_json()
+    if refused.status_code != 409 or body["committed"] or [r["status"] for r in body["results"]] != [409, 409, 404]:
+        failures.append(f"failing batch got {refused.status_code} {body}, expected 409 with statuses 409, 409, 404")
+    if client.get(f'/books/changes?since={since}').get_json()["changes"]:
+        failures.append("a refused batch emitted change-feed events")
+    if api.store.next_id() != next_id or api.store.get(book_id)["price"] != 1.0:
+        failures.append("a refused batch used up an ID or changed a book")
+
+    accepted = client.post('/books:batch', json={"atomic": True, "operations": [
+        {"op": "create", "book": {"title": "New", "author": "A", "price": 2.0}},
+        {"op": "update", "id": book_id, "book": {"price": 3.0}},
+        {"op": "delete", "id": book_id}]})
+    events = client.get(f'/books/changes?since={since}').get_json()["changes"]
+    if accepted.status_code != 200 or len(events) != 3 or api.store.get(book_id) is not None:
+        failures.append(f"accepted batch got {accepted.status_code} and {len(events)} events, expected 200 and 3")
+
+    operations = [('create', None, {"title": "New", "author": "A", "price": 2.0}), ('delete', 999999, None)]
+    for kind in ('columnar', 'sharded'):
+        store = open_store('memory', shards=3) if kind == 'sharded' else open_store(kind)
+        try:
+            store.apply_batch(operations)
+            failures.append(f"{kind} store applied a batch deleting a missing book")
+        except BatchError as e:
+            if e.index != 1 or store.next_id() != 1 or store.count():
+                failures.append(f"{kind} store changed after refusing a batch")
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        store = DurableBookStore(data_dir)
+        kept = store.create({"title": "Kept", "author": "A", "price": 1.0})
+        store.apply_batch([operations[0], ('update', kept, {"price": 5.0})])
+        # Reopened without closing, so the batch is replayed from the log
+        reopened = DurableBookStore(data_dir)
+        if reopened.items() != store.items() or reopened.version() != store.version():
+            failures.append("a logged batch wasn't replayed as it was applied")
+        reopened.close()
+        store.close()
+    return failures
+
+
+def asgi_request(asgi_app, method, path, body=None):
+    """Run one request through the ASGI app in process; return (status, decoded JSON body)."""
+    messages = [{'type': 'http.request', 'body': json.dumps(body).encode('utf-8') if body is not None else b''}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': b'',
+             'headers': [(b'content-type', b'application/json')]}
+    asyncio.run(asgi_app.app(scope, receive, send))
+    return sent[0]['status'], json.loads(b''.join(m.get('body', b'') for m in sent[1:]))
+
+
+def check_asgi_shared_store():
+    """The ASGI front end must sync its replica before requests and write through the store process."""
+    store = MemoryBookStore()
+    key = os.urandom(16)
+    listener = Listener(('127.0.0.1', 0), authkey=key)
+    threading.Thread(target=StoreService(store).serve, args=(listener,), daemon=True).start()
+    address = '%s:%d' % listener.address
+    os.environ['BOOKS_STORE_ADDRESS'], os.environ['BOOKS_STORE_KEY'] = address, key.hex()
+    try:
+        start_app()
+        import asgi_app
+        asgi_app = importlib.reload(asgi_app)  # Pick up the app module start_app() just loaded
+        other = connect_store(address, key.hex())
+
+        failures = []
+        book_id = other.create({"title": "Elsewhere", "author": "A", "price": 1.0})
+        status, _ = asgi_request(asgi_app, 'GET', f'/books/{book_id}')
+        if status != 200:
+            failures.append(f"a book written through another replica got {status}, expected 200")
+        status, body = asgi_request(asgi_app, 'POST', '/books', {"title": "Here", "author": "A", "price": 2.0})
+        if status != 201 or store.get(body.get("id")) is None:
+            failures.append(f"POST through the ASGI app got {status} and didn't reach the store process")
+        other.close()
+        return failures
+    finally:
+        del os.environ['BOOKS_STORE_ADDRESS'], os.environ['BOOKS_STORE_KEY']
+
+
+CHECKS = [
+    ("search ranking", check_search_ranking),
+    ("change feed across a restart", check_changes_restart),
+    ("bad field types", check_bad_types),
+    ("non-finite prices", check_non_finite_prices),
+    ("fragment cache size", check_fragment_cache_size),
+    ("atomic batches", check_atomic_batch),
+    ("ASGI on a shared store", check_asgi_shared_store),
+]
+
+
+def main():
+    ok = True
+    for label, check in CHECKS:
+        failures = check()
+        print(f"[{'PASS' if not failures else 'FAIL'}] {label}")
+        for failure in failures:
+            print(f"    - {failure}")
+        ok = ok and not failures
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -9,20 +9,94 @@ Features:
 - Input validation and error handling
 - Formatted display of books
 - Multiple operations in one session
+- Non-interactive bulk mode (import/export/delete) for scripts
+
+Connections:
+All requests go through one requests.Session, so the TCP connection to the
+server is kept alive and reused instead of being opened for every call.
+Transient failures (connection errors, 429/502/503/504) are retried with
+exponential backoff; POST is only retried if the request never reached the
+server, so a retry can't create a book twice.
+
+Caching:
+"View all" and "view book" read through a local cache (book_cache.py): a
+response seen in the last CACHE_TTL seconds is shown straight from memory,
+an older one is revalidated with its ETag (304 = unchanged, no download).
+Adding, updating or deleting a book drops the affected entries at once.
+Menu option 7 shows the cache statistics.
 
 Usage:
 1. Start the REST API server: python app.py
 2. Run this interactive client: python client_interactive.py
 3. Follow the menu prompts
+
+Non-interactive mode:
+    python client_interactive.py import books.csv --workers 16
+    python client_interactive.py export books.csv
+    python client_interactive.py delete 3-500 --workers 8
+    python client_interactive.py --url http://host:5000 --retries 5 import books.csv
+The CSV file has a header row with title,author,price. Each command runs its
+requests on a pool of worker threads sharing the keep-alive connections and
+ends with a throughput report; the exit code is 1 if any request (or CSV row)
+failed.
 """
 
+import argparse
+import csv
 import requests
 import sys
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from book_cache import BookCache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # API Base URL
 BASE_URL = 'http://127.0.0.1:5000'
 
+# Default number of worker threads (and pooled connections) in bulk mode
+DEFAULT_WORKERS = 8
+
+# Default retries per request for transient failures
+DEFAULT_RETRIES = 3
+
+# Statuses worth retrying: the server is busy or briefly unavailable
+RETRY_STATUSES = (429, 502, 503, 504)
+
+# Responses kept by the read cache, and seconds one is shown without asking the server
+CACHE_MAX_ENTRIES = 128
+CACHE_TTL = 30
+
+
+def make_session(pool_size=DEFAULT_WORKERS, retries=DEFAULT_RETRIES):
+    """
+    Create a Session with a keep-alive connection pool and retries.
+    
+    Args:
+        pool_size (int): Connections kept open to the server (one per worker)
+        retries (int): Retries per request, waiting 0.2s, 0.4s, 0.8s... between them
+        
+    Returns:
+        requests.Session: Session to send every request through
+    """
+    retry = Retry(total=retries, backoff_factor=0.2, status_forcelist=RETRY_STATUSES,
+                  # Only idempotent methods are retried once the request was sent
+                  allowed_methods=Retry.DEFAULT_ALLOWED_METHODS, raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+# Shared by the interactive menu and the bulk commands
+session = make_session()
+
+# Read-through cache for "view all" and "view book"
+book_cache = BookCache(session, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL)
+
 def print_header():
     """Print the application header."""
     print("=" * 70)
@@ -42,7 +116,32 @@ def print_menu():
     print("  3. Add a new book (POST /books)")
     print("  4. Update a book (PUT /books/<id>)")
     print("  5. Delete a book (DELETE /books/<id>)")
-    print("  6. Exit")
+    print("  6. Search books (GET /books/search)")
+    print("  7. Cache statistics")
+    print("  8. Exit")
+    print("-" * 70)
+
+
+# How a cached read was answered, as shown after [SUCCESS]
+CACHE_SOURCES = {
+    "hit": "from cache",
+    "revalidated": "cache revalidated, unchanged",
+    "miss": "downloaded"
+}
+
+
+def show_cache_stats():
+    """Show how many reads the local cache answered."""
+    stats = book_cache.stats()
+    print("\n" + "-" * 70)
+    print(f"CACHE STATISTICS (TTL {book_cache.ttl}s, max {book_cache.max_entries} entries)")
+    print("-" * 70)
+    print(f"  Served from memory:        {stats['hits']}")
+    print(f"  Revalidated (304):         {stats['revalidated']}")
+    print(f"  Downloaded:                {stats['misses']}")
+    print(f"  Hit ratio:                 {stats['hit_ratio']:.1%}")
+    print(f"  Entries cached:            {stats['entries']}")
+    print(f"  Evicted / invalidated:     {stats['evictions']} / {stats['invalidations']}")
     print("-" * 70)
 
 
@@ -71,14 +170,13 @@ def get_all_books():
     """View all books in the system."""
     try:
         print("\n[GET] Fetching all books from /books...")
-        response = requests.get(f'{BASE_URL}/books')
+        status, books, source = book_cache.get(f'{BASE_URL}/books')
         
-        if response.status_code == 200:
-            books = response.json()
-            print(f"[SUCCESS] Retrieved {len(books)} book(s)")
+        if status == 200:
+            print(f"[SUCCESS] Retrieved {len(books)} book(s) ({CACHE_SOURCES[source]})")
             display_books(books)
         else:
-            print(f"[ERROR] Status {response.status_code}: {response.text}")
+            print(f"[ERROR] Status {status}: {books}")
     
     except requests.exceptions.ConnectionError:
         print("[ERROR] Cannot connect to the API server. Is it running?")
@@ -96,16 +194,15 @@ def get_book_by_id():
             return
         
         print(f"\n[GET] Fetching book from /books/{book_id}...")
-        response = requests.get(f'{BASE_URL}/books/{book_id}')
+        status, book_data, source = book_cache.get(f'{BASE_URL}/books/{book_id}')
         
-        if response.status_code == 200:
-            book_data = response.json()
-            print("[SUCCESS] Book found!")
+        if status == 200:
+            print(f"[SUCCESS] Book found! ({CACHE_SOURCES[source]})")
             display_books(book_data)
-        elif response.status_code == 404:
+        elif status == 404:
             print(f"[ERROR] Book with ID {book_id} not found.")
         else:
-            print(f"[ERROR] Status {response.status_code}: {response.text}")
+            print(f"[ERROR] Status {status}: {book_data}")
     
     except requests.exceptions.ConnectionError:
         print("[ERROR] Cannot connect to the API server.")
@@ -148,10 +245,11 @@ def add_book():
         print(f"\n[POST] Creating new book at /books...")
         print(f"Data: {json.dumps(book_data, indent=2)}")
         
-        response = requests.post(f'{BASE_URL}/books', json=book_data)
+        response = session.post(f'{BASE_URL}/books', json=book_data)
         
         if response.status_code == 201:
             result = response.json()
+            book_cache.invalidate(result['id'])
             print(f"[SUCCESS] Book added successfully!")
             print(f"  New Book ID: {result['id']}")
             print(f"  Message: {result['message']}")
@@ -202,10 +300,11 @@ def update_book():
         print(f"\n[PUT] Updating book at /books/{book_id}...")
         print(f"Data: {json.dumps(update_data, indent=2)}")
         
-        response = requests.put(f'{BASE_URL}/books/{book_id}', json=update_data)
+        response = session.put(f'{BASE_URL}/books/{book_id}', json=update_data)
         
         if response.status_code == 200:
             result = response.json()
+            book_cache.invalidate(result['id'])
             print(f"[SUCCESS] {result['message']} (ID: {result['id']})")
         elif response.status_code == 404:
             print(f"[ERROR] Book with ID {book_id} not found.")
@@ -235,10 +334,11 @@ def delete_book():
             return
         
         print(f"\n[DELETE] Deleting book at /books/{book_id}...")
-        response = requests.delete(f'{BASE_URL}/books/{book_id}')
+        response = session.delete(f'{BASE_URL}/books/{book_id}')
         
         if response.status_code == 200:
             result = response.json()
+            book_cache.invalidate(result['id'])
             print(f"[SUCCESS] {result['message']} (ID: {result['id']})")
         elif response.status_code == 404:
             print(f"[ERROR] Book with ID {book_id} not found.")
@@ -251,6 +351,196 @@ def delete_book():
         print(f"[ERROR] {e}")
 
 
+def search_books():
+    """Search books by (partial) title or author on the server."""
+    try:
+        query = input("\nEnter search text (title or author): ").strip()
+        
+        if not query:
+            print("[ERROR] Search text cannot be empty.")
+            return
+        
+        print(f"\n[GET] Searching /books/search?q={query}...")
+        response = session.get(f'{BASE_URL}/books/search', params={'q': query})
+        
+        if response.status_code == 200:
+            result = response.json()
+            matches = {str(r['id']): r for r in result['results']}
+            print(f"[SUCCESS] Found {len(matches)} matching book(s)")
+            display_books(matches)
+            if result['completions']:
+                print(f"  Did you mean: {', '.join(result['completions'])}")
+        else:
+            print(f"[ERROR] Status {response.status_code}: {response.text}")
+    
+    except requests.exceptions.ConnectionError:
+        print("[ERROR] Cannot connect to the API server.")
+    except Exception as e:
+        print(f"[ERROR] {e}")
+
+
+# ----------------------------------------------------------------------
+# Non-interactive bulk mode
+# ----------------------------------------------------------------------
+
+def run_bulk(label, tasks, workers):
+    """
+    Run `tasks` (callables returning True on success) on a thread pool and report throughput.
+    
+    Args:
+        label (str): Name of the operation for the report
+        tasks (list): Callables, each performing one request
+        workers (int): Number of concurrent worker threads
+        
+    Returns:
+        int: Number of failed tasks
+    """
+    print(f"[INFO] {label}: {len(tasks)} request(s) on {workers} worker(s) -> {BASE_URL}")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        outcomes = list(pool.map(lambda task: task(), tasks))
+    elapsed = time.perf_counter() - start
+    
+    failed = outcomes.count(False)
+    print("=" * 70)
+    print(f"[SUMMARY] {label}")
+    print(f"  Succeeded:  {len(outcomes) - failed}")
+    print(f"  Failed:     {failed}")
+    print(f"  Elapsed:    {elapsed:.2f} s")
+    print(f"  Throughput: {len(outcomes) / elapsed if elapsed > 0 else 0:,.1f} requests/s")
+    print("=" * 70)
+    return failed
+
+
+def send_request(method, path, **kwargs):
+    """
+    Send one bulk-mode request, reporting failures instead of raising.
+    
+    Returns:
+        bool: True if the server answered with a 2xx status
+    """
+    try:
+        response = session.request(method, f'{BASE_URL}{path}', timeout=30, **kwargs)
+    except requests.exceptions.RequestException as e:
+        print(f"[ERROR] {method} {path}: {e}")
+        return False
+    if not response.ok:
+        print(f"[ERROR] {method} {path}: status {response.status_code}")
+        return False
+    return True
+
+
+def read_books_csv(path):
+    """
+    Read books from a CSV file with a title,author,price header.
+    
+    Returns:
+        tuple: (list of valid book dicts, number of invalid rows skipped)
+    """
+    books = []
+    invalid = 0
+    with open(path, newline='', encoding='utf-8') as f:
+        for line, row in enumerate(csv.DictReader(f), start=2):
+            try:
+                title = row['title'].strip()
+                author = row['author'].strip()
+                price = float(row['price'])
+            except (KeyError, AttributeError, TypeError, ValueError):
+                title = author = None
+            if not title or not author or price < 0:
+                print(f"[WARNING] {path}:{line}: skipping invalid row")
+                invalid += 1
+                continue
+            books.append({"title": title, "author": author, "price": price})
+    return books, invalid
+
+
+def import_books(path, workers):
+    """Create every book of a CSV file concurrently."""
+    books, invalid = read_books_csv(path)
+    tasks = [lambda book=book: send_request('POST', '/books', json=book) for book in books]
+    return run_bulk(f"Import {path}", tasks, workers) + invalid
+
+
+def export_books(path):
+    """Write every book to a CSV file (id,title,author,price)."""
+    start = time.perf_counter()
+    try:
+        response = session.get(f'{BASE_URL}/books', timeout=60)
+        response.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        print(f"[ERROR] {e}")
+        return 1
+    books = response.json()
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['id', 'title', 'author', 'price'])
+        for book_id, book in books.items():
+            writer.writerow([book_id, book['title'], book['author'], book['price']])
+    elapsed = time.perf_counter() - start
+    print(f"[SUCCESS] Exported {len(books)} book(s) to {path} in {elapsed:.2f} s "
+          f"({len(books) / elapsed if elapsed > 0 else 0:,.0f} books/s)")
+    return 0
+
+
+def parse_ids(spec):
+    """Parse "1,5,9" and/or "3-500" style ID lists."""
+    ids = []
+    for part in spec.split(','):
+        first, _, last = part.strip().partition('-')
+        ids.extend(range(int(first), int(last or first) + 1))
+    return ids
+
+
+def delete_books(spec, workers):
+    """Delete the books with the given IDs concurrently."""
+    tasks = [lambda book_id=book_id: send_request('DELETE', f'/books/{book_id}')
+             for book_id in parse_ids(spec)]
+    return run_bulk(f"Delete {spec}", tasks, workers)
+
+
+def run_cli(argv):
+    """
+    Entry point of the non-interactive mode.
+    
+    Returns:
+        int: Process exit code (0 if every request succeeded)
+    """
+    global BASE_URL, session
+    parser = argparse.ArgumentParser(description="Book Management REST client (bulk mode)")
+    parser.add_argument('--url', default=BASE_URL, help=f"API base URL (default: {BASE_URL})")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f"concurrent requests (default: {DEFAULT_WORKERS})")
+    parser.add_argument('--retries', type=int, default=DEFAULT_RETRIES,
+                        help=f"retries for transient failures (default: {DEFAULT_RETRIES})")
+    commands = parser.add_subparsers(dest='command', required=True)
+    command = commands.add_parser('import', help="create the books listed in a CSV file")
+    command.add_argument('csv_file')
+    command = commands.add_parser('export', help="write all books to a CSV file")
+    command.add_argument('csv_file')
+    command = commands.add_parser('delete', help="delete books by ID, e.g. 3-500 or 1,5,9")
+    command.add_argument('ids')
+    # Options may also follow the command: "import books.csv --workers 16"
+    for command in commands.choices.values():
+        command.add_argument('--workers', type=int, default=argparse.SUPPRESS, help=argparse.SUPPRESS)
+        command.add_argument('--retries', type=int, default=argparse.SUPPRESS, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    
+    BASE_URL = args.url.rstrip('/')
+    session = make_session(pool_size=args.workers, retries=args.retries)
+    try:
+        if args.command == 'import':
+            failed = import_books(args.csv_file, args.workers)
+        elif args.command == 'export':
+            failed = export_books(args.csv_file)
+        else:
+            failed = delete_books(args.ids, args.workers)
+    except (OSError, ValueError) as e:
+        print(f"[ERROR] {e}")
+        return 1
+    return 1 if failed else 0
+
+
 def main():
     """Main application loop."""
     print_header()
@@ -258,7 +548,7 @@ def main():
     # Test connection
     try:
         print("\n[INFO] Testing connection to API server...")
-        response = requests.get(f'{BASE_URL}/books', timeout=2)
+        response = session.get(f'{BASE_URL}/books', timeout=2)
         print("[INFO] ✓ Connection successful!")
     except requests.exceptions.ConnectionError:
         print("[ERROR] ✗ Cannot connect to API server!")
@@ -272,7 +562,7 @@ def main():
     
     while True:
         print_menu()
-        choice = input("Enter your choice (1-6): ").strip()
+        choice = input("Enter your choice (1-8): ").strip()
         
         if choice == '1':
             get_all_books()
@@ -290,18 +580,28 @@ def main():
             delete_book()
             operation_count += 1
         elif choice == '6':
+            search_books()
+            operation_count += 1
+        elif choice == '7':
+            show_cache_stats()
+        elif choice == '8':
             print("\n[EXIT] Exiting application...")
             break
         else:
-            print("[WARNING] Invalid choice. Please enter 1-6.")
+            print("[WARNING] Invalid choice. Please enter 1-8.")
     
     print("\n" + "=" * 70)
     print(f"[SUMMARY] Total operations performed: {operation_count}")
+    stats = book_cache.stats()
+    print(f"[SUMMARY] Reads served by the cache: {stats['hits'] + stats['revalidated']} "
+          f"of {stats['hits'] + stats['revalidated'] + stats['misses']} ({stats['hit_ratio']:.1%})")
     print("Thank you for using the Book Management System!")
     print("=" * 70)
 
 
 if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        sys.exit(run_cli(sys.argv[1:]))
     try:
         main()
     except KeyboardInterrupt:
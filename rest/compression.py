@@ -0,0 +1,129 @@
+"""
+Response Compression - Book Management System
+=============================================
+HTTP content negotiation and compression helpers for the REST API, plus a
+small cache of already-compressed listings.
+
+Content Negotiation:
+--------------------
+The client lists the encodings it understands in Accept-Encoding, e.g.
+    Accept-Encoding: gzip, deflate;q=0.5
+negotiate_encoding() picks the best one we support (gzip or deflate),
+honouring q-values (q=0 means "never send me this"). Bodies smaller than
+COMPRESSION_MIN_SIZE are sent as-is: compressing them costs more CPU than
+it saves on the wire.
+
+Compressed Listing Cache:
+-------------------------
+Dashboards poll the same GET /books listing over and over. CompressedCache
+keeps the compressed body (and the headers that go with it) keyed by
+(store version, query string, encoding), so a repeated poll is a dictionary
+lookup instead of a JSON encode plus a gzip run. Entries are dropped
+whenever the store changes.
+"""
+
+import gzip
+import threading
+import zlib
+from collections import OrderedDict
+
+# Encodings we can produce, in order of preference
+SUPPORTED_ENCODINGS = ('gzip', 'deflate')
+
+# Bodies smaller than this (in bytes) are never compressed
+COMPRESSION_MIN_SIZE = 1024
+
+# zlib/gzip compression level: 6 is the usual speed/size balance
+COMPRESSION_LEVEL = 6
+
+
+def negotiate_encoding(accept_encoding):
+    """
+    Choose a content encoding from an Accept-Encoding header.
+
+    Args:
+        accept_encoding (str or None): The header value
+
+    Returns:
+        str or None: "gzip", "deflate", or None to send the body uncompressed
+    """
+    if not accept_encoding:
+        return None
+
+    quality = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.strip().partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        quality[name.strip().lower()] = q
+
+    best, best_q = None, 0.0
+    for encoding in SUPPORTED_ENCODINGS:
+        q = quality.get(encoding, quality.get('*', 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(body, encoding):
+    """
+    Compress `body` (bytes) with the given content encoding.
+
+    gzip output uses a fixed timestamp, so equal inputs give equal outputs.
+    """
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=COMPRESSION_LEVEL, mtime=0)
+    if encoding == 'deflate':
+        return zlib.compress(body, COMPRESSION_LEVEL)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+class CompressedCache:
+    """
+    Bounded LRU cache of compressed responses.
+
+    Each entry is whatever the caller stores, typically a
+    (compressed body, extra headers) pair.
+
+    Keys include the store version, so a stale entry can never be served
+    even if a clear() were missed; clear() just frees the memory early.
+
+    Args:
+        max_entries (int): Number of (version, key, encoding) entries kept
+    """
+
+    def __init__(self, max_entries=64):
+        self._entries = OrderedDict()
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, version, key, encoding):
+        """Return the cached entry, or None."""
+        with self._lock:
+            entry = self._entries.get((version, key, encoding))
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((version, key, encoding))
+            self.hits += 1
+            return entry
+
+    def put(self, version, key, encoding, entry):
+        """Cache an entry, evicting the least recently used one if full."""
+        with self._lock:
+            self._entries[(version, key, encoding)] = entry
+            self._entries.move_to_end((version, key, encoding))
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self, *args):
+        """Drop every entry. Accepts (and ignores) store listener arguments."""
+        with self._lock:
+            self._entries.clear()
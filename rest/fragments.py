@@ -0,0 +1,206 @@
+"""
+Fragment Cache - Pre-encoded JSON for Every Book
+================================================
+Most of the work in a GET /books response is turning the same unchanged book
+dicts into JSON again and again. FragmentCache keeps each book's encoded
+JSON text (its "fragment") and builds listings by joining fragments, so a
+book is encoded once per change instead of once per request.
+
+Validity:
+---------
+A fragment is stored together with the store's book_version() it was
+encoded from and is only served while that version is still current, so a
+reader can never get a stale book even if it races with a writer. The
+store's change notifications also drop the fragment of every updated or
+deleted book right away, so dead fragments don't linger in memory.
+
+Size:
+-----
+The cache is a least-recently-used cache holding at most `max_bytes` of
+fragments (their str objects plus a rough per-book overhead), so a large
+catalogue or many different projections can't grow it without bound. A
+listing bigger than the cap re-encodes the books that didn't fit, which
+is what every request cost before there was a cache.
+
+Output Format:
+--------------
+Fragments are encoded like app.encode_json() (compact, sorted keys), and
+listings have the same shape as before: {"<id>": {book}, ...} in ID
+order. See bench_serialize.py for the cost per request with and without the
+cache.
+
+Projections:
+------------
+Every method takes an optional `fields` tuple (e.g. ('price', 'title')).
+Only those fields are put into the encoded text, and each projection of a
+book is cached next to the full fragment under the same book version, so
+a changed book drops all of its projections at once.
+
+Usage:
+    fragments = FragmentCache(store)
+    fragments.attach()
+    fragments.fragment(1)          # -> '{"author":"Tanenbaum",...}'
+    fragments.listing([1, 2])      # -> '{"1":{...},"2":{...}}'
+    fragments.fragment(1, ('price',))  # -> '{"price":50.0}'
+"""
+
+import json
+import sys
+import threading
+from collections import OrderedDict
+
+# One shared encoder: json.dumps() with options builds a new one per call,
+# which costs more than encoding a small book
+_encoder = json.JSONEncoder(separators=(',', ':'), sort_keys=True)
+
+# Default cap on the memory held by a FragmentCache (bytes)
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Rough bytes of a book's entry besides its fragments (the entry list, the
+# {fields: fragment} dict and the LRU's links)
+_ENTRY_OVERHEAD = 500
+
+# Books looked up per turn of the lock when building a listing: large enough
+# to make locking cheap, small enough not to hold up writers' invalidations
+_LOOKUP_CHUNK = 256
+
+
+def encode_book(book):
+    """Encode a book as compact JSON with sorted keys."""
+    return _encoder.encode(book)
+
+
+class FragmentCache:
+    """
+    Bounded LRU cache of the encoded JSON text of each book, keyed by
+    (book ID, book version).
+
+    Args:
+        store (BookStore): Store the books are read from
+        encode (callable): Function turning a book dict into JSON text
+        max_bytes (int): Memory the fragments may hold before the least
+            recently used books are dropped
+    """
+
+    def __init__(self, store, encode=encode_book, max_bytes=DEFAULT_MAX_BYTES):
+        self._store = store
+        self._encode = encode
+        self._max_bytes = max_bytes
+        self._fragments = OrderedDict()  # book_id -> [book_version, {fields: fragment}, bytes]
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def size(self):
+        """Approximate bytes held by the cached fragments."""
+        return self._bytes
+
+    def attach(self):
+        """Follow the store's changes to drop fragments of changed books."""
+        self._store.add_listener(self.on_change)
+
+    def on_change(self, op, book_id, book, old):
+        """Store listener: forget the fragment of a book that was put or deleted."""
+        with self._lock:
+            self._drop(book_id)
+
+    def _drop(self, book_id):
+        entry = self._fragments.pop(book_id, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def fragment(self, book_id, fields=None):
+        """
+        Return the JSON text of one book, encoding it only if it changed.
+
+        Args:
+            book_id (int): ID of the book
+            fields (tuple or None): Only encode these fields (None = all)
+
+        Returns:
+            str or None: The fragment, or None if the book doesn't exist
+        """
+        # Read the version before the book: if a writer slips in between,
+        # the fragment is filed under the older version and simply re-encoded
+        # on the next request, never served as current when it isn't
+        version = self._store.book_version(book_id)
+        with self._lock:
+            entry = self._fragments.get(book_id)
+            if entry is not None and entry[0] == version:
+                text = entry[1].get(fields)
+                if text is not None:
+                    self._fragments.move_to_end(book_id)
+                    self.hits += 1
+                    return text
+            self.misses += 1
+        return self._encode_fragment(book_id, version, fields)
+
+    def _lookup(self, ids, versions, fields):
+        """Return the cached fragment of each book at its version (None if missing)."""
+        texts = []
+        with self._lock:
+            for book_id, version in zip(ids, versions):
+                entry = self._fragments.get(book_id)
+                text = entry[1].get(fields) if entry is not None and entry[0] == version else None
+                if text is not None:
+                    self._fragments.move_to_end(book_id)
+                texts.append(text)
+            misses = texts.count(None)
+            self.misses += misses
+            self.hits += len(texts) - misses
+        return texts
+
+    def _encode_fragment(self, book_id, version, fields):
+        # Encoded outside the lock so readers of other books aren't held up
+        book = self._store.get(book_id)
+        if book is None:
+            return None
+        if fields is not None:
+            book = {k: book[k] for k in fields if k in book}
+        text = self._encode(book)
+        self._put(book_id, version, fields, text)
+        return text
+
+    def _put(self, book_id, version, fields, text):
+        """File a fragment under `version`, then evict until under max_bytes."""
+        size = sys.getsizeof(text)
+        with self._lock:
+            entry = self._fragments.get(book_id)
+            if entry is None or entry[0] != version:
+                self._drop(book_id)
+                entry = self._fragments[book_id] = [version, {}, _ENTRY_OVERHEAD]
+                self._bytes += _ENTRY_OVERHEAD
+            elif fields in entry[1]:
+                size -= sys.getsizeof(entry[1][fields])
+            entry[1][fields] = text
+            entry[2] += size
+            self._bytes += size
+            self._fragments.move_to_end(book_id)
+            while self._bytes > self._max_bytes and self._fragments:
+                _, evicted = self._fragments.popitem(last=False)
+                self._bytes -= evicted[2]
+
+    def members(self, ids, fields=None):
+        """
+        Return '"<id>":{book}' members for `ids`, skipping books that no longer exist.
+
+        Returns:
+            list: JSON object members, in the order of `ids`
+        """
+        members = []
+        for i in range(0, len(ids), _LOOKUP_CHUNK):
+            chunk = ids[i:i + _LOOKUP_CHUNK]
+            versions = [self._store.book_version(book_id) for book_id in chunk]
+            for book_id, version, text in zip(chunk, versions, self._lookup(chunk, versions, fields)):
+                if text is None:
+                    text = self._encode_fragment(book_id, version, fields)
+                    if text is None:
+                        continue
+                members.append(f'"{book_id}":{text}')
+        return members
+
+    def listing(self, ids, fields=None):
+        """Return the JSON object {"<id>": {book}, ...} for `ids`, as text."""
+        return '{' + ','.join(self.members(ids, fields)) + '}'
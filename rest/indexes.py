@@ -0,0 +1,177 @@
+"""
+Secondary Indexes - Book Management System
+==========================================
+In-memory secondary indexes over the book store used by the REST API.
+
+The primary store maps book ID -> book, which answers "get book 42" in O(1)
+but forces a full scan for any other question. These indexes are kept up to
+date incrementally on every create/update/delete so that queries touch only
+the matching books.
+
+Indexes:
+- AuthorIndex: hash index, author -> sorted list of book IDs
+  Lookup: O(1) to find the author, O(k) to return k IDs
+- PriceIndex: sorted list of (price, book ID) pairs
+  Range query: O(log n) binary search + O(k) to return k IDs
+- PackedPriceIndex: same as PriceIndex, but stored in two typed arrays
+  (16 bytes per book instead of a tuple, a float and an int object)
+
+Usage:
+    author_index = AuthorIndex()
+    author_index.add(1, "Tanenbaum")
+    author_index.lookup("tanenbaum")       # -> [1]
+
+    price_index = PriceIndex()
+    price_index.add(1, 50.0)
+    price_index.range(20.0, 60.0)          # -> [1]
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right, insort
+
+
+def normalize_author(author):
+    """
+    Normalize an author name for index lookups.
+
+    Lookups are case-insensitive and ignore surrounding whitespace, so
+    "Tanenbaum", "tanenbaum" and " TANENBAUM " all hit the same bucket.
+    """
+    return str(author).strip().casefold()
+
+
+class AuthorIndex:
+    """
+    Hash index mapping a normalized author name to a sorted list of book IDs.
+
+    Args:
+        bucket_type (callable): Factory for the per-author ID lists. Any
+            mutable sequence works, e.g. `partial(array, 'q')` for compact
+            typed buckets.
+    """
+
+    def __init__(self, bucket_type=list):
+        self._ids_by_author = {}
+        self._bucket_type = bucket_type
+
+    def add(self, book_id, author):
+        """Index `book_id` under `author`."""
+        key = normalize_author(author)
+        ids = self._ids_by_author.get(key)
+        if ids is None:
+            ids = self._ids_by_author[key] = self._bucket_type()
+        # IDs are usually handed out in increasing order, so this is an append
+        if not ids or ids[-1] < book_id:
+            ids.append(book_id)
+        else:
+            insort(ids, book_id)
+
+    def remove(self, book_id, author):
+        """Remove `book_id` from the bucket for `author`."""
+        key = normalize_author(author)
+        ids = self._ids_by_author.get(key)
+        if not ids:
+            return
+        i = bisect_left(ids, book_id)
+        if i < len(ids) and ids[i] == book_id:
+            del ids[i]
+        if not ids:
+            del self._ids_by_author[key]
+
+    def lookup(self, author):
+        """
+        Return the IDs of all books by `author`.
+
+        Returns:
+            list: Book IDs in ascending order (a copy, safe to keep)
+        """
+        return list(self._ids_by_author.get(normalize_author(author), ()))
+
+
+class PriceIndex:
+    """Sorted index of (price, book ID) pairs supporting range queries."""
+
+    def __init__(self):
+        self._entries = []
+
+    def add(self, book_id, price):
+        """Index `book_id` at `price`."""
+        insort(self._entries, (float(price), book_id))
+
+    def add_many(self, entries):
+        """
+        Index many (book ID, price) pairs at once.
+
+        Sorting once is O(n log n), where adding them one by one would shift
+        the list on every insert. Used when loading a snapshot at startup.
+        """
+        self._entries.extend((float(price), book_id) for book_id, price in entries)
+        self._entries.sort()
+
+    def remove(self, book_id, price):
+        """Remove the entry for `book_id` at `price`."""
+        entry = (float(price), book_id)
+        i = bisect_left(self._entries, entry)
+        if i < len(self._entries) and self._entries[i] == entry:
+            del self._entries[i]
+
+    def range(self, min_price=None, max_price=None):
+        """
+        Return the IDs of books priced within [min_price, max_price].
+
+        Args:
+            min_price (float or None): Inclusive lower bound (None = unbounded)
+            max_price (float or None): Inclusive upper bound (None = unbounded)
+
+        Returns:
+            list: Book IDs ordered by price, then ID
+        """
+        lo = 0 if min_price is None else bisect_left(self._entries, (min_price, float('-inf')))
+        hi = len(self._entries) if max_price is None else bisect_right(self._entries, (max_price, float('inf')))
+        return [book_id for _, book_id in self._entries[lo:hi]]
+
+
+class PackedPriceIndex:
+    """
+    PriceIndex stored as two parallel typed arrays sorted by (price, book ID).
+
+    Same interface and complexity as PriceIndex, for stores holding millions
+    of books where a tuple per entry would dominate memory use.
+    """
+
+    def __init__(self):
+        self._prices = array('d')
+        self._ids = array('q')
+
+    def _position(self, book_id, price):
+        """Return (index of the (price, book_id) slot, end of the equal-price run)."""
+        lo = bisect_left(self._prices, price)
+        hi = bisect_right(self._prices, price, lo)
+        return bisect_left(self._ids, book_id, lo, hi), hi
+
+    def add(self, book_id, price):
+        """Index `book_id` at `price`."""
+        price = float(price)
+        i, _ = self._position(book_id, price)
+        self._prices.insert(i, price)
+        self._ids.insert(i, book_id)
+
+    def add_many(self, entries):
+        """Index many (book ID, price) pairs at once."""
+        merged = sorted(list(zip(self._prices, self._ids)) +
+                        [(float(price), book_id) for book_id, price in entries])
+        self._prices = array('d', (price for price, _ in merged))
+        self._ids = array('q', (book_id for _, book_id in merged))
+
+    def remove(self, book_id, price):
+        """Remove the entry for `book_id` at `price`."""
+        i, hi = self._position(book_id, float(price))
+        if i < hi and self._ids[i] == book_id:
+            del self._prices[i]
+            del self._ids[i]
+
+    def range(self, min_price=None, max_price=None):
+        """Return the IDs of books priced within [min_price, max_price], by price."""
+        lo = 0 if min_price is None else bisect_left(self._prices, min_price)
+        hi = len(self._prices) if max_price is None else bisect_right(self._prices, max_price)
+        return self._ids[lo:hi].tolist()
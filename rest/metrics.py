@@ -0,0 +1,218 @@
+"""
+Request Metrics - Book Management System
+========================================
+Lightweight instrumentation for the REST API, exposed at GET /metrics in the
+Prometheus text format (version 0.0.4), so any Prometheus-compatible scraper
+or a plain `curl` can read it.
+
+Metrics (all prefixed with "books_"):
+- http_requests_total{method,route,status}          counter
+- http_request_duration_seconds{method,route}       histogram
+- http_requests_in_flight                           gauge
+- http_response_size_bytes{method,route}            histogram (body bytes
+  as sent, i.e. after compression; streamed bodies are not counted)
+- any values registered with add_gauge()/add_counter() (store size, cache
+  hits...), read when /metrics is scraped
+
+`route` is the URL rule ("/books/<int:book_id>"), not the raw path, so the
+number of series stays small no matter how many books there are.
+
+Overhead:
+---------
+Recording a request is a couple of dictionary lookups, two binary searches
+over the bucket bounds and one short critical section, a few microseconds
+in total. All rendering work happens only when /metrics is scraped.
+
+Usage (Flask):
+    metrics = Metrics()
+    metrics.init_app(app)           # before any other after_request hook
+    metrics.add_gauge('store_books', "Books in the store", store.count)
+    metrics.add_counter('fragment_cache_hits_total', "Cache hits", lambda: cache.hits)
+    metrics.render()                # -> Prometheus text
+"""
+
+import threading
+import time
+from bisect import bisect_left
+
+from flask import g, request
+
+# Upper bounds (seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Upper bounds (bytes) of the response size histogram buckets
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+
+# Content type of the Prometheus text exposition format
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Histogram:
+    """Bucketed observations with a running sum and count (not thread-safe by itself)."""
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # Last slot: above every bound (+Inf)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """
+    Request counters, latency and size histograms and an in-flight gauge.
+
+    Args:
+        prefix (str): Prepended (with "_") to every metric name
+    """
+
+    def __init__(self, prefix='books'):
+        self._prefix = prefix
+        self._lock = threading.Lock()
+        self._requests = {}    # (method, route, status) -> count
+        self._latency = {}     # (method, route) -> Histogram
+        self._sizes = {}       # (method, route) -> Histogram
+        self._in_flight = 0
+        self._values = []      # (name, type, help, callable)
+
+    def init_app(self, app):
+        """
+        Instrument every request handled by a Flask app.
+
+        Register this before other after_request hooks: Flask runs them in
+        reverse order, so the size recorded is the one actually sent.
+        """
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+    def add_gauge(self, name, help_text, fn):
+        """Report `fn()` as gauge `<prefix>_<name>` on every scrape."""
+        self._values.append((name, 'gauge', help_text, fn))
+
+    def add_counter(self, name, help_text, fn):
+        """Report `fn()` (an ever-increasing number) as counter `<prefix>_<name>`."""
+        self._values.append((name, 'counter', help_text, fn))
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """Count a request as in flight; returns its start time for finish()."""
+        with self._lock:
+            self._in_flight += 1
+        return time.perf_counter()
+
+    def finish(self, method, route, status, started, size=None):
+        """
+        Record a completed request started with start().
+
+        Args:
+            method (str): HTTP method
+            route (str): URL rule that handled it (or "unmatched")
+            status (int): Response status code
+            started (float): Value returned by start()
+            size (int or None): Response body size in bytes, if known
+        """
+        duration = time.perf_counter() - started
+        key = (method, route)
+        with self._lock:
+            self._in_flight -= 1
+            counter = (method, route, status)
+            self._requests[counter] = self._requests.get(counter, 0) + 1
+            latency = self._latency.get(key)
+            if latency is None:
+                latency = self._latency[key] = Histogram(LATENCY_BUCKETS)
+            latency.observe(duration)
+            if size is not None:
+                sizes = self._sizes.get(key)
+                if sizes is None:
+                    sizes = self._sizes[key] = Histogram(SIZE_BUCKETS)
+                sizes.observe(size)
+
+    def _before_request(self):
+        g.metrics_started = self.start()
+
+    def _after_request(self, response):
+        g.metrics_status = response.status_code
+        g.metrics_size = None if response.is_streamed else response.calculate_content_length()
+        return response
+
+    def _teardown_request(self, error):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return
+        # No after_request means the view raised: Flask answered 500
+        status = g.pop('metrics_status', 500)
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        self.finish(request.method, route, status, started, g.pop('metrics_size', None))
+
+    # ------------------------------------------------------------------
+    # Exposition
+    # ------------------------------------------------------------------
+
+    def render(self):
+        """Return every metric in the Prometheus text exposition format."""
+        name = self._prefix + '_'
+        with self._lock:
+            requests = sorted(self._requests.items())
+            latency = sorted((k, _copy(h)) for k, h in self._latency.items())
+            sizes = sorted((k, _copy(h)) for k, h in self._sizes.items())
+            in_flight = self._in_flight
+
+        lines = [f"# HELP {name}http_requests_total HTTP requests handled, by route and status.",
+                 f"# TYPE {name}http_requests_total counter"]
+        for (method, route, status), count in requests:
+            lines.append(f'{name}http_requests_total{_labels(method=method, route=route, status=status)} {count}')
+
+        _render_histograms(lines, f"{name}http_request_duration_seconds",
+                           "Time spent handling a request, in seconds.", latency)
+
+        lines += [f"# HELP {name}http_requests_in_flight Requests currently being handled.",
+                  f"# TYPE {name}http_requests_in_flight gauge",
+                  f"{name}http_requests_in_flight {in_flight}"]
+
+        _render_histograms(lines, f"{name}http_response_size_bytes",
+                           "Response body size as sent, in bytes.", sizes)
+
+        for value, kind, help_text, fn in self._values:
+            lines += [f"# HELP {name}{value} {help_text}",
+                      f"# TYPE {name}{value} {kind}",
+                      f"{name}{value} {fn()}"]
+        return '\n'.join(lines) + '\n'
+
+
+def _copy(histogram):
+    """Snapshot a histogram so it can be rendered outside the lock."""
+    snapshot = Histogram(histogram.bounds)
+    snapshot.counts = list(histogram.counts)
+    snapshot.sum = histogram.sum
+    snapshot.count = histogram.count
+    return snapshot
+
+
+def _labels(**labels):
+    """Format labels as {key="value",...}, escaping as the text format requires."""
+    parts = []
+    for key, value in labels.items():
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{value}"')
+    return '{' + ','.join(parts) + '}'
+
+
+def _render_histograms(lines, name, help_text, histograms):
+    """Append one histogram family (cumulative buckets, sum, count) to `lines`."""
+    lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for (method, route), h in histograms:
+        cumulative = 0
+        for bound, count in zip(h.bounds + (float('inf'),), h.counts):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else f'{bound:g}'
+            lines.append(f'{name}_bucket{_labels(method=method, route=route, le=le)} {cumulative}')
+        lines.append(f'{name}_sum{_labels(method=method, route=route)} {h.sum}')
+        lines.append(f'{name}_count{_labels(method=method, route=route)} {h.count}')
@@ -0,0 +1,264 @@
+"""
+Search Index - Full-Text Search and Autocomplete for the Book Store
+===================================================================
+Keeps an inverted token index and a prefix trie over book titles and authors
+so that GET /books/search can answer without scanning the catalogue.
+
+Structures:
+- Inverted index: token -> {book ID: weight}. A title token weighs
+  TITLE_WEIGHT, an author token AUTHOR_WEIGHT, summed if it appears twice.
+- Prefix trie: one node per character of every indexed token. Each node
+  also keeps its MAX_COMPLETIONS most common tokens (in most books), so the
+  best completions of "distr" are read off the node 5 steps down, however
+  many tokens lie below it.
+
+Query Semantics:
+- The query is split into tokens like the books are (lowercase words)
+- Every token except the last must match a word exactly
+- The last token is treated as a prefix ("clean co" matches "Clean Code"),
+  which gives search-as-you-type behaviour. It expands to its
+  DEFAULT_COMPLETIONS most common completions (plus the word itself), so
+  a one-letter prefix costs no more than a longer one
+- Results are ranked by the summed weight of the matched tokens, then by ID
+
+The index subscribes to the store's change notifications, so every
+create/update/delete keeps it current. A write re-ranks the token on each
+node of its trie path (O(length x MAX_COMPLETIONS)), stopping at the first
+node where the token neither ranks nor would.
+
+Usage:
+    index = SearchIndex()
+    index.attach(store)
+    index.search("distributed sys", limit=10)   # -> [(book_id, score), ...]
+    index.complete("tan")                       # -> ["tanenbaum"]
+"""
+
+import heapq
+import re
+from bisect import bisect_left
+
+# Relative importance of a match in the title vs in the author name
+TITLE_WEIGHT = 2
+AUTHOR_WEIGHT = 1
+
+# Completions returned by complete() unless asked for another number, and
+# the number of completions a search prefix expands to
+DEFAULT_COMPLETIONS = 64
+
+# Completions ranked on every trie node: the most complete() can return
+MAX_COMPLETIONS = 100
+
+# Key marking "a token ends here" in a trie node (never a real character)
+_END = ''
+
+# Key of a node's ranked completions, a sorted list of (-book count, token)
+# (never a real character either: tokens are \w+)
+_TOP = '\0'
+
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Split text into lowercase word tokens."""
+    return _TOKEN_RE.findall(str(text).casefold())
+
+
+def book_tokens(book):
+    """Return {token: weight} for a book's title and author."""
+    weights = {}
+    for token in tokenize(book['title']):
+        weights[token] = weights.get(token, 0) + TITLE_WEIGHT
+    for token in tokenize(book['author']):
+        weights[token] = weights.get(token, 0) + AUTHOR_WEIGHT
+    return weights
+
+
+class SearchIndex:
+    """
+    Inverted index plus prefix trie over book titles and authors.
+
+    Writes come from the store's change notifications (one change at a
+    time, in version order). Reads take snapshots of the dicts they
+    walk, so searches can run concurrently with writes.
+    """
+
+    def __init__(self):
+        self._postings = {}   # token -> {book_id: weight}
+        self._trie = {}
+
+    def attach(self, store):
+        """Index every book in `store` and follow its changes from now on."""
+        store.add_listener(self.on_change)
+
+    def on_change(self, op, book_id, book, old):
+        """Store listener: re-index a book after it was put or deleted."""
+        if old is not None:
+            self.remove(book_id, old)
+        if op == 'put':
+            self.add(book_id, book)
+
+    def add(self, book_id, book):
+        """Index a book's title and author tokens."""
+        for token, weight in book_tokens(book).items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                self._trie_insert(token)
+            count = len(postings)
+            postings[book_id] = weight
+            if len(postings) != count:
+                self._rerank(token, count)
+
+    def remove(self, book_id, book):
+        """Remove a book's tokens from the index."""
+        for token in book_tokens(book):
+            postings = self._postings.get(token)
+            if postings is None or book_id not in postings:
+                continue
+            del postings[book_id]
+            if not postings:
+                del self._postings[token]
+            self._rerank(token, len(postings) + 1)
+            if not postings:
+                self._trie_remove(token)
+
+    def _trie_insert(self, token):
+        node = self._trie
+        for ch in token:
+            node = node.setdefault(ch, {})
+        node[_END] = True
+
+    def _trie_remove(self, token):
+        # Walk down remembering the path, then prune nodes left empty
+        path = [self._trie]
+        for ch in token:
+            node = path[-1].get(ch)
+            if node is None:
+                return
+            path.append(node)
+        path[-1].pop(_END, None)
+        for depth in range(len(token), 0, -1):
+            if path[depth]:  # _rerank() already dropped the empty rankings
+                break
+            del path[depth - 1][token[depth - 1]]
+
+    def _rerank(self, token, old_count):
+        """Move `token` from `old_count` books to its current count in every ranking on its path."""
+        path = [self._trie]
+        for ch in token:
+            node = path[-1].get(ch)
+            if node is None:
+                return
+            path.append(node)
+
+        count = len(self._postings.get(token, ()))
+        old = (-old_count, token)
+        entry = (-count, token)
+        # Each change to a ranking is a single list operation (or a new list),
+        # so a reader's slice never sees the token twice or not at all
+        for depth in range(len(token), -1, -1):
+            node = path[depth]
+            top = node.get(_TOP)
+            if top is None:
+                if count:
+                    node[_TOP] = [entry]
+                continue
+            full = len(top) >= MAX_COMPLETIONS
+            i = bisect_left(top, old) if old_count else len(top)
+            if i == len(top) or top[i] != old:
+                if not count or full and entry > top[-1]:
+                    break  # Not ranked here, so not at any node above either
+                top.insert(bisect_left(top, entry), entry)
+                del top[MAX_COMPLETIONS:]
+            elif full and (not count or entry > top[-1]):
+                # Dropping to the cut: a token below it may now outrank this one
+                ranked = self._merge_children(node, token[:depth])
+                if ranked:
+                    node[_TOP] = ranked
+                else:
+                    del node[_TOP]
+            elif not count:
+                if len(top) > 1:
+                    del top[i]
+                else:
+                    del node[_TOP]
+            elif entry < old:
+                j = bisect_left(top, entry, 0, i)
+                top[j:i + 1] = [entry] + top[j:i]
+            else:
+                j = bisect_left(top, entry, i)
+                top[i:j] = top[i + 1:j] + [entry]
+
+    def _merge_children(self, node, word):
+        """Rank a node from scratch: its own token plus its children's rankings."""
+        candidates = []
+        count = len(self._postings.get(word, ()))
+        if count:
+            candidates.append((-count, word))
+        for ch, child in node.items():
+            if ch != _END and ch != _TOP:
+                candidates.extend(child.get(_TOP, ()))
+        return heapq.nsmallest(MAX_COMPLETIONS, candidates)
+
+    def complete(self, prefix, limit=DEFAULT_COMPLETIONS):
+        """
+        Return indexed tokens starting with `prefix`.
+
+        Args:
+            prefix (str): Start of a word (case-insensitive)
+            limit (int): Maximum number of tokens to return (at most
+                MAX_COMPLETIONS)
+
+        Returns:
+            list: The `limit` most common matching tokens (in most books),
+            most common first, ties in alphabetical order
+        """
+        node = self._trie
+        for ch in prefix.casefold():
+            node = node.get(ch)
+            if node is None:
+                return []
+        return [token for _, token in node.get(_TOP, ())[:limit]]
+
+    def search(self, query, limit=10):
+        """
+        Rank books matching `query`.
+
+        Args:
+            query (str): Search text; the last word may be a prefix
+            limit (int): Maximum number of results
+
+        Returns:
+            list: (book_id, score) pairs, best first
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        *exact, last = tokens
+        scores = None
+        for token in exact:
+            postings = dict(self._postings.get(token, {}))
+            if scores is None:
+                scores = postings
+            else:
+                scores = {k: s + postings[k] for k, s in scores.items() if k in postings}
+            if not scores:
+                return []
+
+        # The last token is a prefix: a book matches if one of its most common
+        # completions does, or the word itself if it is a whole token
+        prefix_scores = {}
+        completions = self.complete(last)
+        if last not in completions:
+            completions.append(last)
+        for token in completions:
+            for book_id, weight in list(self._postings.get(token, {}).items()):
+                if weight > prefix_scores.get(book_id, 0):
+                    prefix_scores[book_id] = weight
+        if scores is None:
+            scores = prefix_scores
+        else:
+            scores = {k: s + prefix_scores[k] for k, s in scores.items() if k in prefix_scores}
+
+        return heapq.nsmallest(limit, ((k, s) for k, s in scores.items()), key=lambda r: (-r[1], r[0]))
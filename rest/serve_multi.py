@@ -0,0 +1,153 @@
+"""
+Multi-Process Server - Book Management System
+=============================================
+Runs the Flask API from app.py in several worker processes, so it can use
+more than one CPU core, while all of them share one store.
+
+Processes:
+----------
+- Supervisor (this script): opens the listening socket, starts the others
+  and restarts any worker that dies
+- Store process: owns the BookStore, the only place books change (see
+  shared_store.py)
+- N workers: each imports app.py with a replica of the store and accepts
+  connections on the shared listening socket; the OS hands every new
+  connection to one of them
+
+Every worker sees every write as soon as it is committed, IDs are allocated
+in one place, and ETags/versions are the same whichever worker answers.
+Per-process state stays per process: GET /metrics and the change feed
+history describe the worker that answered.
+
+Usage:
+    python serve_multi.py                       # one worker per CPU core
+    python serve_multi.py --workers 4 --store log --data-dir data
+    python serve_multi.py --workers 4 --shards 8
+See bench_workers.py for throughput versus the number of workers.
+"""
+
+import argparse
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+
+from shared_store import run_store_server
+from store import STORE_TYPES
+
+HOST = '127.0.0.1'
+PORT = int(os.environ.get('BOOKS_PORT', 5000))
+
+# Seconds to wait for the store process or a worker to become ready
+STARTUP_TIMEOUT = 30
+
+# Seconds between checks for dead workers
+SUPERVISE_INTERVAL = 0.5
+
+
+def run_worker(number, sock, ready):
+    """
+    Worker process entry point: serve app.py on the shared socket.
+
+    app.py finds the store process through BOOKS_STORE_ADDRESS and
+    BOOKS_STORE_KEY, which the supervisor sets before starting workers.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # The supervisor stops us
+    from werkzeug.serving import make_server
+    import app as api
+
+    server = make_server(HOST, sock.getsockname()[1], api.app, threaded=True, fd=sock.fileno())
+    print(f"[INFO] Worker {number} (pid {os.getpid()}) ready", flush=True)
+    ready.set()
+    server.serve_forever()
+
+
+def start_worker(ctx, number, sock):
+    """Start worker `number` and wait until it is accepting requests."""
+    ready = ctx.Event()
+    process = ctx.Process(target=run_worker, args=(number, sock, ready), name=f'books-worker-{number}',
+                          daemon=True)
+    process.start()
+    if not ready.wait(STARTUP_TIMEOUT):
+        process.terminate()
+        raise RuntimeError(f"Worker {number} did not start")
+    return process
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the REST API from several processes sharing one store")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="number of worker processes (default: one per CPU core)")
+    parser.add_argument('--port', type=int, default=PORT, help=f"port to listen on (default: {PORT})")
+    parser.add_argument('--store', choices=STORE_TYPES, default=os.environ.get('BOOKS_STORE', 'memory'),
+                        help="storage backend of the store process (default: memory)")
+    parser.add_argument('--data-dir', default=os.environ.get('BOOKS_DATA_DIR', 'data'),
+                        help="data directory for the log backend (default: data)")
+    parser.add_argument('--shards', type=int,
+                        default=int(os.environ['BOOKS_SHARDS']) if os.environ.get('BOOKS_SHARDS') else None,
+                        help="partition the store into this many shards (default: not sharded)")
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    # Spawned (not forked) children start clean, on every platform
+    ctx = multiprocessing.get_context('spawn')
+    authkey = os.urandom(16)
+    receiver, sender = ctx.Pipe(duplex=False)
+    store_process = ctx.Process(target=run_store_server, args=(args.store, args.data_dir, args.shards, authkey, sender),
+                                name='books-store')
+    store_process.start()
+    if not receiver.poll(STARTUP_TIMEOUT):
+        store_process.terminate()
+        raise SystemExit("[ERROR] The store process did not start")
+    store_host, store_port = receiver.recv()
+    os.environ['BOOKS_STORE_ADDRESS'] = f"{store_host}:{store_port}"
+    os.environ['BOOKS_STORE_KEY'] = authkey.hex()
+
+    sock = socket.create_server((HOST, args.port), backlog=128)
+    # Clean up (and close the store properly) on `kill` as on Ctrl+C
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    print("=" * 70)
+    print("REST API SERVER (MULTI-PROCESS) - Book Management System")
+    print("=" * 70)
+    shards = f", {args.shards} shard(s)" if args.shards is not None else ""
+    print(f"Storage backend: {args.store}{shards} (store process pid {store_process.pid})")
+    print(f"Workers: {args.workers}")
+    print(f"Server starting on http://{HOST}:{args.port}")
+    print("Press Ctrl+C to stop the server")
+    print("=" * 70)
+
+    workers = []
+    try:
+        # The first worker seeds an empty store; start the others after it
+        # so they don't all seed it at once
+        for number in range(1, args.workers + 1):
+            workers.append(start_worker(ctx, number, sock))
+
+        while True:
+            time.sleep(SUPERVISE_INTERVAL)
+            if not store_process.is_alive():
+                print(f"[ERROR] The store process exited (code {store_process.exitcode})")
+                break
+            for index, process in enumerate(workers):
+                if not process.is_alive():
+                    print(f"[WARNING] Worker {index + 1} exited (code {process.exitcode}), restarting it")
+                    workers[index] = start_worker(ctx, index + 1, sock)
+    except KeyboardInterrupt:
+        print("\n[EXIT] Stopping workers...")
+    finally:
+        for process in workers:
+            process.terminate()
+        for process in workers:
+            process.join()
+        # SIGTERM makes the store process close (and compact) the store
+        store_process.terminate()
+        store_process.join()
+        sock.close()
+
+
+if __name__ == '__main__':
+    main()
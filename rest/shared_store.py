@@ -0,0 +1,375 @@
+"""
+Shared Store - One Book Store for Several Server Processes
+==========================================================
+A single Flask process is limited to one CPU core, but simply starting more
+processes would give each one its own books. This module lets N worker
+processes (see serve_multi.py) share one consistent store.
+
+Design: One Writer, Many Replicas
+---------------------------------
+- The store process owns the real BookStore (memory, log or columnar) and
+  is the only place where books change, so IDs come from one allocator and
+  every change gets one global version number.
+- It keeps a journal of the most recent changes, numbered by store version,
+  and publishes the current version in an 8-byte memory-mapped file.
+- Every worker holds a ReplicaBookStore: a MemoryBookStore copy of the books
+  that serves all reads locally (no inter-process call). Writes are sent to
+  the store process, which answers with the result plus every change the
+  replica hasn't seen yet, so a worker always sees its own writes.
+- Before each request a worker compares its version with the published one
+  (a memory read) and only asks the store process for the missing changes
+  if they differ. A write finished in any worker is therefore visible to
+  every request that starts after it, in every worker.
+
+Replicas apply the changes in version order and keep the store's version
+numbers, so ETags, change feed offsets and cursors are the same whichever
+worker answers. Search indexes, statistics and caches attach to the replica
+through add_listener() exactly as they do to a local store.
+
+Catching Up:
+------------
+A background thread keeps idle workers current. A replica that falls more
+than JOURNAL_SIZE changes behind can't be patched any more; its process
+exits with EXIT_LAGGED and serve_multi.py starts a fresh worker, which
+loads a complete copy.
+
+Usage:
+    # store process
+    run_store_server('log', 'data', None, authkey, ready_connection)
+    # worker process
+    store = connect_store('127.0.0.1:40123', authkey.hex())
+"""
+
+import mmap
+import os
+import signal
+import sys
+import tempfile
+import threading
+from collections import deque
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+from queue import Empty, LifoQueue
+
+from store import MemoryBookStore, open_store
+
+# Address the store process listens on (port chosen by the OS)
+STORE_HOST = '127.0.0.1'
+
+# Changes kept by the store process for replicas to catch up from
+JOURNAL_SIZE = 100000
+
+# Seconds between a replica's background checks for new changes
+FOLLOW_INTERVAL = 0.05
+
+# Exit status of a worker whose replica fell too far behind to catch up
+EXIT_LAGGED = 3
+
+
+class ReplicaLagError(RuntimeError):
+    """The changes a replica is missing are no longer in the journal."""
+
+
+class StoreService:
+    """
+    Store process side: owns the real store and a journal of its changes.
+
+    Args:
+        store (BookStore): The store every worker shares
+        journal_size (int): Number of most recent changes kept for replicas
+    """
+
+    def __init__(self, store, journal_size=JOURNAL_SIZE):
+        self._store = store
+        self._journal = deque(maxlen=journal_size)  # (version, op, book_id, book)
+        self._lock = threading.Lock()
+        self._first = store.version() + 1  # Oldest version still in the journal
+        self._attached = False
+        fd, self._published_path = tempfile.mkstemp(prefix='books-version-')
+        os.write(fd, bytes(8))
+        self._published = mmap.mmap(fd, 8)
+        os.close(fd)
+        self._publish(store.version())
+        # add_listener() replays the existing books; those aren't changes
+        store.add_listener(self._on_change)
+        self._attached = True
+        self._handlers = {
+            'snapshot': self.snapshot,
+            'changes_since': self.changes_since,
+            'write': self.write
+        }
+
+    def _on_change(self, op, book_id, book, old):
+        """Store listener (runs in the change's turn, in version order): journal and publish a change."""
+        if not self._attached:
+            return
+        version = self._store.version()
+        with self._lock:
+            self._journal.append((version, op, book_id, book))
+            if len(self._journal) == self._journal.maxlen:
+                self._first = self._journal[0][0]
+        # Published only once the change is in the journal, so a worker that
+        # sees the new version always finds the change
+        self._publish(version)
+
+    def _publish(self, version):
+        self._published[:8] = version.to_bytes(8, 'little')
+
+    def snapshot(self):
+        """
+        Return everything a new replica needs to start.
+
+        The books are read without stopping writers, so some may already be
+        newer than "version"; replaying the journal from "version" onwards
+        brings the copy to an exact state.
+
+        Returns:
+            dict: epoch, version, published (path of the version file) and books,
+            a list of (book ID, book version, book)
+        """
+        version = self._store.version()
+        books = [(book_id, self._store.book_version(book_id), book) for book_id, book in self._store.items()]
+        return {"epoch": self._store.epoch(), "version": version,
+                "published": self._published_path, "books": books}
+
+    def changes_since(self, version):
+        """
+        Return the journaled changes after `version`, oldest first.
+
+        Returns:
+            list or None: (version, op, book ID, book) tuples, or None if
+            some of them have already been dropped from the journal
+        """
+        with self._lock:
+            if version + 1 < self._first:
+                return None
+            if not self._journal:
+                return []
+            # Versions in the journal are consecutive, so the start is arithmetic
+            start = max(0, version + 1 - self._journal[0][0])
+            return [self._journal[i] for i in range(start, len(self._journal))]
+
+    def write(self, method, args, since):
+        """
+        Run a store write and return its result with the changes after `since`.
+
+        Raises:
+            KeyError, ValueError, BatchError: As raised by the store method
+        """
+        if method not in ('create', 'update', 'delete', 'restore', 'apply_batch', 'reserve_ids'):
+            raise ValueError(f"Unknown write {method!r}")
+        result = getattr(self._store, method)(*args)
+        return result, self.changes_since(since)
+
+    def serve(self, listener):
+        """Answer replica requests forever, one thread per connection."""
+        while True:
+            try:
+                conn = listener.accept()
+            except (OSError, AuthenticationError):
+                continue  # Failed handshake (e.g. wrong key); keep serving the others
+            threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+
+    def _serve_connection(self, conn):
+        """Handle (method, args) requests on one connection until it closes."""
+        with conn:
+            while True:
+                try:
+                    method, args = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    reply = ('ok', self._handlers[method](*args))
+                except Exception as e:
+                    reply = ('error', e)
+                conn.send(reply)
+
+    def close(self):
+        """Release and remove the version file."""
+        self._published.close()
+        os.remove(self._published_path)
+
+
+class ReplicaBookStore(MemoryBookStore):
+    """
+    Worker side: a local copy of the shared store that forwards writes.
+
+    Args:
+        address (tuple): (host, port) of the store process
+        authkey (bytes): Key shared with the store process
+    """
+
+    def __init__(self, address, authkey):
+        super().__init__()
+        self._address = address
+        self._authkey = authkey
+        self._connections = LifoQueue()  # Idle connections to the store process
+        self._stopped = threading.Event()
+
+        snapshot = self._call('snapshot')
+        self._epoch = snapshot["epoch"]
+        with open(snapshot["published"], 'rb') as f:
+            self._published = mmap.mmap(f.fileno(), 8, access=mmap.ACCESS_READ)
+        with self._turn():
+            self._load(snapshot["version"], snapshot["books"])
+            self._apply_changes(self._call('changes_since', self._version))
+
+    # ------------------------------------------------------------------
+    # Keeping up with the store process
+    # ------------------------------------------------------------------
+
+    def published_version(self):
+        """Return the store process's current version (read from the mapped file)."""
+        return int.from_bytes(self._published[:8], 'little')
+
+    def sync(self):
+        """
+        Apply every change made through other processes since the last sync.
+
+        Raises:
+            ReplicaLagError: If the missing changes are no longer available
+        """
+        if self.published_version() == self._version:
+            return
+        with self._turn():
+            self._apply_changes(self._call('changes_since', self._version))
+
+    def follow(self, interval=FOLLOW_INTERVAL):
+        """Keep syncing in a background thread, so an idle replica never falls far behind."""
+        threading.Thread(target=self._follow, args=(interval,), daemon=True).start()
+
+    def _follow(self, interval):
+        while not self._stopped.wait(interval):
+            try:
+                self.sync()
+            except (ReplicaLagError, OSError, EOFError) as e:
+                # Serving from a copy that can't be updated would be wrong
+                print(f"[ERROR] Replica can't keep up with the store process: {e}", file=sys.stderr)
+                os._exit(EXIT_LAGGED)
+
+    def _load(self, version, books):
+        """Fill an empty replica from a snapshot, keeping the store's versions. Runs in a turn."""
+        for book_id, book_version, book in books:
+            # Books deleted while the snapshot was taken have no version and
+            # are removed again by the journal
+            self._put(book_id, book, book_version or version)
+        self._version = version
+
+    def _apply_changes(self, changes):
+        """Apply journaled changes not seen yet, in order, keeping the store's versions. Runs in a turn."""
+        if changes is None:
+            raise ReplicaLagError(f"changes after version {self._version} were dropped from the journal")
+        for version, op, book_id, book in changes:
+            if version <= self._version:
+                continue  # Already applied (by another thread, or part of the snapshot)
+            if op == 'put':
+                self._put(book_id, book, version)
+            elif self.get(book_id) is not None:
+                self._remove(book_id, version)
+            else:
+                self._version = version
+
+    # ------------------------------------------------------------------
+    # Writes (forwarded to the store process)
+    # ------------------------------------------------------------------
+
+    def create(self, book):
+        return self._write('create', dict(book))
+
+    def update(self, book_id, changes):
+        return self._write('update', book_id, changes)
+
+    def delete(self, book_id):
+        return self._write('delete', book_id)
+
+    def restore(self, book_id, book):
+        self._write('restore', book_id, book)
+
+    def apply_batch(self, operations):
+        # One call: the store process checks and applies the whole batch
+        return self._write('apply_batch', list(operations))
+
+    def reserve_ids(self, next_id):
+        self._write('reserve_ids', next_id)
+
+    def _write(self, method, *args):
+        """Run a write in the store process and apply the resulting changes locally."""
+        result, changes = self._call('write', method, args, self._version)
+        with self._turn():
+            self._apply_changes(changes)
+        return result
+
+    def _call(self, method, *args):
+        """
+        Call a StoreService method in the store process.
+
+        Raises:
+            Whatever the method raised there (e.g. KeyError for a missing book)
+        """
+        try:
+            conn = self._connections.get_nowait()
+        except Empty:
+            conn = Client(self._address, authkey=self._authkey)
+        try:
+            conn.send((method, args))
+            status, value = conn.recv()
+        except BaseException:
+            conn.close()
+            raise
+        self._connections.put(conn)
+        if status == 'error':
+            raise value
+        return value
+
+    def close(self):
+        """Stop following and close the connections to the store process."""
+        self._stopped.set()
+        while True:
+            try:
+                self._connections.get_nowait().close()
+            except Empty:
+                break
+        self._published.close()
+
+
+def connect_store(address, authkey):
+    """
+    Open a replica of the store served at `address` and keep it current.
+
+    Args:
+        address (str): "host:port" of the store process
+        authkey (str): Hex-encoded key shared with the store process
+
+    Returns:
+        ReplicaBookStore: The replica, already following the store
+    """
+    host, port = address.rsplit(':', 1)
+    replica = ReplicaBookStore((host, int(port)), bytes.fromhex(authkey))
+    replica.follow()
+    return replica
+
+
+def run_store_server(kind, data_dir, shards, authkey, ready):
+    """
+    Store process entry point: open the store and serve it until terminated.
+
+    Args:
+        kind (str): Backend name for open_store()
+        data_dir (str): Data directory for the "log" backend
+        shards (int or None): Number of shards, or None for a single store
+        authkey (bytes): Key replicas must present
+        ready (Connection): Receives the (host, port) being listened on
+    """
+    # Ctrl+C is handled by the supervisor, which then terminates us
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    store = open_store(kind, data_dir=data_dir, shards=shards)
+    service = StoreService(store)
+    listener = Listener((STORE_HOST, 0), authkey=authkey)
+    ready.send(listener.address)
+    try:
+        service.serve(listener)
+    finally:
+        listener.close()
+        service.close()
+        store.close()
@@ -0,0 +1,116 @@
+"""
+Price Statistics - Incrementally Maintained Aggregates for the Book Store
+========================================================================
+Answers GET /books/stats (count, min, max, mean and percentiles of the book
+prices) without looking at the books themselves.
+
+Structures:
+- A running count and sum of all prices, so the mean is O(1)
+- Every price in one sorted array('d') (8 bytes per book), so min, max and
+  any percentile are a single index lookup
+
+Each create/update/delete arrives through the store's change notifications
+and costs one O(log n) binary search plus a memmove in the array; no request
+ever rescans the catalogue.
+
+A NaN or infinite price (which the API refuses, but a store opened from an
+old log may still hold) is left out of every aggregate: one would make the
+mean, and the JSON it's sent in, invalid, and NaN can never be found again
+to be removed.
+
+Percentiles use the nearest-rank method: the p-th percentile of n prices is
+the ceil(p/100 * n)-th smallest price, so it is always a real book's price.
+
+Usage:
+    stats = PriceStats()
+    stats.attach(store)
+    stats.summary((50, 95))   # -> {"count": ..., "min": ..., "percentiles": {...}}
+"""
+
+import math
+import threading
+from array import array
+from bisect import bisect_left, insort
+
+# Percentiles reported when the client doesn't ask for specific ones
+DEFAULT_PERCENTILES = (25, 50, 75, 90, 95, 99)
+
+
+class PriceStats:
+    """
+    Count, sum and sorted prices of every book, kept current by store changes.
+
+    Writes come from the store's change notifications; a small lock keeps
+    readers from seeing the array halfway through an insert or delete.
+    """
+
+    def __init__(self):
+        self._prices = array('d')
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def attach(self, store):
+        """Add every book in `store` and follow its changes from now on."""
+        store.add_listener(self.on_change)
+
+    def on_change(self, op, book_id, book, old):
+        """Store listener: account for a book that was put or deleted."""
+        with self._lock:
+            if old is not None:
+                self._remove(float(old['price']))
+            if op == 'put':
+                self._add(float(book['price']))
+
+    def _add(self, price):
+        if not math.isfinite(price):
+            return
+        insort(self._prices, price)
+        self._sum += price
+
+    def _remove(self, price):
+        if not math.isfinite(price):
+            return
+        i = bisect_left(self._prices, price)
+        if i < len(self._prices) and self._prices[i] == price:
+            del self._prices[i]
+            self._sum -= price
+        if not self._prices:
+            self._sum = 0.0  # Don't let rounding errors outlive the data
+
+    def percentile(self, p):
+        """
+        Return the p-th percentile price (nearest rank), or None if there are no books.
+
+        Args:
+            p (float): Percentile between 0 and 100
+        """
+        with self._lock:
+            return self._percentile(p)
+
+    def _percentile(self, p):
+        n = len(self._prices)
+        if n == 0:
+            return None
+        rank = max(1, math.ceil(p / 100 * n))
+        return self._prices[min(rank, n) - 1]
+
+    def summary(self, percentiles=DEFAULT_PERCENTILES):
+        """
+        Return all aggregates as one consistent snapshot.
+
+        Args:
+            percentiles (iterable): Percentiles (0-100) to include
+
+        Returns:
+            dict: {"count", "min", "max", "mean", "percentiles": {"p50": ..., ...}}
+            (every value but count is None while the store is empty)
+        """
+        with self._lock:
+            n = len(self._prices)
+            return {
+                "count": n,
+                "min": self._prices[0] if n else None,
+                "max": self._prices[-1] if n else None,
+                "mean": self._sum / n if n else None,
+                "percentiles": {f"p{p:g}": self._percentile(p) for p in percentiles}
+            }
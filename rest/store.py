@@ -0,0 +1,1365 @@
+"""
+Book Store - Storage Backends for the REST API
+==============================================
+The REST handlers in app.py never touch a dictionary directly; they talk to a
+BookStore. Any class implementing the BookStore methods can be plugged in.
+
+Backends:
+- MemoryBookStore: Everything in process memory. Fast, but lost on restart.
+- DurableBookStore: A MemoryBookStore that also writes every change to an
+  append-only log on disk and periodically compacts the log into a snapshot.
+- ColumnarBookStore: In memory like MemoryBookStore, but books live in typed
+  columns (array('d') prices, interned authors) instead of one dict per book,
+  for catalogues with millions of books. See bench_store.py for numbers.
+- ShardedBookStore: A router over several stores of one of the kinds above,
+  each holding the books whose ID hashes to it (see "Sharding" below).
+
+Durable Storage Layout (inside the data directory):
+---------------------------------------------------
+snapshot.jsonl - Compacted state: a header line, then one line per book
+                 {"version": 42, "next_id": 17, "epoch": "..."}
+                 {"id": 1, "v": 40, "book": {"title": ..., ...}}
+books.log      - Changes made since the snapshot, one JSON record per line
+                 {"v": 43, "op": "put", "id": 7, "book": {...}}
+                 {"v": 44, "op": "delete", "id": 3}
+                 {"v": 46, "op": "batch", "changes": [{"v": 45, ...}, {"v": 46, ...}]}
+
+Every change is appended to the log before it is applied in memory or
+reported to listeners, so nothing is seen that a restart would lose. At
+startup the snapshot is read through a memory map and the (short) log is
+replayed on top of it; a torn last line is dropped, any other unreadable
+line stops the store from opening (CorruptLogError). Every `snapshot_every` writes the log is folded into a
+fresh snapshot, so restart time depends on the size of the catalogue, not on
+how many writes it has seen over its lifetime.
+
+Concurrency:
+-------------
+Stores are safe to share between the threads of a threaded server:
+- IDs come from an atomic allocator, so two creates never get the same ID
+- Writers to the same book are serialized by one of LOCK_STRIPES striped
+  locks (picked by book ID), held for the whole write, so an update's
+  read-modify-write of the book is atomic
+- Every change then goes through a three-step pipeline:
+  1. Sequencing: under a short store-wide lock the change gets its version
+     and a ticket, and DurableBookStore appends its log record (one write()
+     call, no fsync)
+  2. Durability: with fsync=True, DurableBookStore fsyncs the log outside
+     that lock; one fsync covers every record appended before it (group
+     commit), so concurrent writers share it
+  3. Applying: in ticket order, one change at a time, the book, the ID
+     list, the indexes and the version are updated and the listeners run
+  So the log and the listeners still see the changes in version order, but
+  a slow fsync or listener no longer holds up the sequencing of other writes
+- Compaction, add_listener() and close() take a ticket of their own, so
+  they run between two changes with nothing half-applied
+- Readers take no locks at all: books are never modified in place, an
+  update publishes a new dict, so a reader sees either the old or the new
+  book and never a half-applied one
+
+Sharding:
+---------
+open_store(kind, shards=N) partitions the books over N stores ("shards") by
+a jump consistent hash of the book ID:
+- get/update/delete of one book go to the one shard that holds it
+- listings (items, ids_after, by_author, price_range) ask every shard and
+  merge the answers in ID order (scatter-gather)
+- the router allocates IDs and numbers every change from one version clock
+  shared by the shards, so versions, ETags and change feed offsets stay
+  global and consecutive. To keep that numbering in listener order the
+  router still serializes its writes
+- rebalance(M) changes the shard count, moving only the books whose shard
+  changes (about 1/M of them when growing from M-1 shards). Reads keep
+  working while books move; writes wait. A moved book is reported to the
+  listeners as an update (its version changes, its content doesn't)
+With the "log" backend shard i lives in <data_dir>/shard-i. At startup
+every shard directory found is opened and any book not in its shard is
+moved, so changing BOOKS_SHARDS and restarting is enough to reshard, and a
+rebalance interrupted by a crash is completed. A columnar shard allocates
+column rows only for the books it holds.
+
+Usage:
+    store = open_store('log', data_dir='data')
+    book_id = store.create({"title": "SICP", "author": "Abelson", "price": 60.0})
+    store.update(book_id, {"price": 55.0})
+    store.close()
+"""
+
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+import shutil
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from contextlib import ExitStack, contextmanager
+from functools import partial
+from operator import itemgetter
+
+from indexes import AuthorIndex, PackedPriceIndex, PriceIndex
+
+# Available backends for open_store() / the BOOKS_STORE environment variable
+STORE_TYPES = ('memory', 'log', 'columnar')
+
+# Number of per-book write locks; book N uses lock N % LOCK_STRIPES
+LOCK_STRIPES = 64
+
+
+class CorruptLogError(ValueError):
+    """A durable store's log has a damaged record before its last line."""
+
+
+def check_book(book):
+    """
+    Check a book's field types before any store structure is touched.
+
+    Returns:
+        dict: The same book
+
+    Raises:
+        TypeError: If title or author isn't a string, or price isn't a number
+        ValueError: If price is NaN or infinite
+    """
+    price = book.get('price')
+    if not isinstance(book.get('title'), str) or not isinstance(book.get('author'), str):
+        raise TypeError("title and author must be strings")
+    if not isinstance(price, (int, float)) or isinstance(price, bool):
+        raise TypeError("price must be a number")
+    if not math.isfinite(price):
+        raise ValueError("price must be a finite number")
+    return book
+
+
+class BatchError(Exception):
+    """
+    An operation of a batch can't be applied, so none of the batch was.
+
+    Attributes:
+        index (int): Position of the failing operation in the batch
+        error (Exception): Why it failed: KeyError (no such book),
+            TypeError or ValueError (bad fields)
+    """
+
+    def __init__(self, index, error):
+        # Both go to Exception too, so the error pickles (serve_multi)
+        super().__init__(index, error)
+        self.index = index
+        self.error = error
+
+
+def plan_batch(operations, get):
+    """
+    Check a batch against the current books, as if applied in order.
+
+    Args:
+        operations (list): (kind, book ID, fields) triples, see BookStore.apply_batch()
+        get (callable): Returns the current book with an ID, or None
+
+    Returns:
+        list: (op, book ID, book, old book) per operation, where op is
+        "put" or "delete" and book ID is None for a book still to be created
+
+    Raises:
+        BatchError: For the first operation that can't be applied
+    """
+    pending = {}  # Books already changed by earlier operations of the batch
+    plan = []
+    for index, (kind, book_id, fields) in enumerate(operations):
+        try:
+            if kind == 'create':
+                plan.append(('put', None, check_book(dict(fields)), None))
+                continue
+            old = pending[book_id] if book_id in pending else get(book_id)
+            if old is None:
+                raise KeyError(book_id)
+            if kind == 'update':
+                book = check_book({**old, **fields})
+                plan.append(('put', book_id, book, old))
+            elif kind == 'delete':
+                book = None
+                plan.append(('delete', book_id, None, old))
+            else:
+                raise ValueError(f"Unknown batch operation {kind!r}")
+            pending[book_id] = book
+        except (KeyError, TypeError, ValueError) as e:
+            raise BatchError(index, e) from None
+    return plan
+
+
+class BookStore:
+    """
+    Interface implemented by every storage backend.
+
+    Books are plain dicts with "title", "author" and "price". Books returned
+    by the store must be treated as read-only; changes go through update().
+    Every method takes and returns plain data, so a store can also be used
+    through a proxy in another process.
+    """
+
+    def get(self, book_id):
+        """Return the book with `book_id`, or None if it doesn't exist."""
+        raise NotImplementedError
+
+    def count(self):
+        """Return the number of books in the store."""
+        raise NotImplementedError
+
+    def items(self):
+        """Return a list of (book ID, book) pairs in ID order."""
+        raise NotImplementedError
+
+    def ids_after(self, after_id, limit):
+        """Return up to `limit` book IDs greater than `after_id`, ascending."""
+        raise NotImplementedError
+
+    def by_author(self, author):
+        """Return the sorted IDs of all books by `author` (case-insensitive)."""
+        raise NotImplementedError
+
+    def price_range(self, min_price=None, max_price=None):
+        """Return the IDs of books priced within [min_price, max_price]."""
+        raise NotImplementedError
+
+    def version(self):
+        """Return the store version, bumped by every change."""
+        raise NotImplementedError
+
+    def book_version(self, book_id):
+        """Return the store version at which `book_id` last changed, or None."""
+        raise NotImplementedError
+
+    def epoch(self):
+        """Return a token identifying this store's version history."""
+        raise NotImplementedError
+
+    def next_id(self):
+        """Return the ID the next create() will hand out."""
+        raise NotImplementedError
+
+    def reserve_ids(self, next_id):
+        """
+        Never hand out an ID below `next_id`, even after a restart.
+
+        Used by ShardedBookStore to keep its ID high-water mark when a shard
+        is removed, so IDs of deleted books are never reused.
+        """
+        raise NotImplementedError
+
+    def create(self, book):
+        """
+        Store a new book and return its newly allocated ID.
+
+        Raises:
+            TypeError: If title or author isn't a string, or price isn't a number
+            ValueError: If price is NaN or infinite
+        """
+        raise NotImplementedError
+
+    def update(self, book_id, changes):
+        """
+        Apply `changes` to an existing book.
+
+        Returns:
+            dict: The book as it was before the update
+
+        Raises:
+            KeyError: If the book doesn't exist
+            TypeError: If the updated book has a field of the wrong type
+        """
+        raise NotImplementedError
+
+    def delete(self, book_id):
+        """
+        Delete a book.
+
+        Returns:
+            dict: The deleted book
+
+        Raises:
+            KeyError: If the book doesn't exist
+        """
+        raise NotImplementedError
+
+    def restore(self, book_id, book):
+        """Put a deleted book back under its old ID."""
+        raise NotImplementedError
+
+    def apply_batch(self, operations):
+        """
+        Apply several creates, updates and deletes all together or not at all.
+
+        Every operation is checked before any is applied, so a failing batch
+        changes nothing: no ID is allocated, no listener is called.
+        Otherwise the changes are applied in order with consecutive
+        versions, and no other write is seen between them.
+
+        Args:
+            operations (list): (kind, book ID, fields) triples, where kind is
+                "create" (book ID is ignored, fields is the new book),
+                "update" (fields are the changes) or "delete" (fields is ignored)
+
+        Returns:
+            list: Per operation, the new book's ID for a create, or the book
+            as it was before the operation for an update or delete
+
+        Raises:
+            BatchError: If an operation can't be applied
+        """
+        raise NotImplementedError
+
+    def add_listener(self, callback):
+        """
+        Call `callback(op, book_id, book, old)` after every change.
+
+        `op` is "put" (create/update/restore, `book` is the new book) or
+        "delete" (`book` is None); `old` is the previous book or None.
+        Listeners run one at a time, in change order. Right after
+        registering, the callback receives a "put" for every existing book,
+        so derived structures (search indexes, statistics...) start complete.
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """Flush and release any resources held by the store."""
+
+
+class MemoryBookStore(BookStore):
+    """
+    BookStore keeping every book, index and version counter in memory.
+
+    Args:
+        version_clock (callable or None): Returns the version number of each
+            new change. By default the store counts its own changes;
+            ShardedBookStore passes one clock shared by all its shards.
+    """
+
+    def __init__(self, version_clock=None):
+        self._books = {}
+        self._ids = []  # Sorted book IDs, for paging in ID order
+        self._authors = AuthorIndex()
+        self._prices = PriceIndex()
+        self._version = 0
+        self._book_versions = {}
+        self._next_id = 1
+        self._version_clock = version_clock
+        self._listeners = []
+        self._id_lock = threading.Lock()
+        self._stripes = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        # The sequencer: held only to number a change and append its log
+        # record, never across an fsync, an index update or a listener
+        self._write_lock = threading.Lock()
+        self._tickets = 0          # Changes (and turns) handed out
+        self._issued_version = 0   # Highest version handed out
+        # Changes are applied one at a time in ticket order: _applied is the
+        # last ticket done, and a ticket waiting for its turn parks on a lock
+        # in _waiters that the previous ticket releases (waking only it)
+        self._applied = 0
+        self._waiters = {}
+        self._turn_lock = threading.Lock()
+        # Versions restart from zero with the process, so ETags and change
+        # feed offsets also carry the process start time (in nanoseconds, so
+        # even a quick restart gets a new one) to tell runs apart
+        self._epoch = format(time.time_ns(), 'x')
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def get(self, book_id):
+        return self._books.get(book_id)
+
+    def count(self):
+        return len(self._books)
+
+    def items(self):
+        pairs = []
+        # Copy the ID list first: it may change under us while we iterate
+        for book_id in self._ids[:]:
+            book = self.get(book_id)
+            if book is not None:
+                pairs.append((book_id, book))
+        return pairs
+
+    def ids_after(self, after_id, limit):
+        start = bisect_right(self._ids, after_id)
+        return list(self._ids[start:start + limit])
+
+    def by_author(self, author):
+        return self._authors.lookup(author)
+
+    def price_range(self, min_price=None, max_price=None):
+        return self._prices.range(min_price, max_price)
+
+    def version(self):
+        return self._version
+
+    def book_version(self, book_id):
+        return self._book_versions.get(book_id)
+
+    def epoch(self):
+        return self._epoch
+
+    def next_id(self):
+        return self._next_id
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def reserve_ids(self, next_id):
+        with self._id_lock:
+            self._next_id = max(self._next_id, next_id)
+
+    def create(self, book):
+        book = check_book(dict(book))
+        book_id = self._allocate_id()
+        with self._stripe(book_id):
+            self._commit([('put', book_id, book)])
+        return book_id
+
+    def update(self, book_id, changes):
+        with self._stripe(book_id):
+            old = self._existing(book_id)
+            # Build a new dict rather than mutating the old one, so readers
+            # holding the previous version never see a half-applied update
+            new = check_book({**old, **changes})
+            self._commit([('put', book_id, new)])
+        return old
+
+    def delete(self, book_id):
+        with self._stripe(book_id):
+            old = self._existing(book_id)
+            self._commit([('delete', book_id, None)])
+        return old
+
+    def restore(self, book_id, book):
+        with self._stripe(book_id):
+            if self.get(book_id) is not None:
+                raise ValueError(f"Book {book_id} already exists")
+            book = check_book(dict(book))
+            self._commit([('put', book_id, book)])
+
+    def apply_batch(self, operations):
+        # Lock every book the batch touches, in stripe order so two batches
+        # can't deadlock; new books get IDs no other writer knows yet
+        stripes = sorted({book_id % LOCK_STRIPES for kind, book_id, _ in operations if kind != 'create'})
+        with ExitStack() as locks:
+            for index in stripes:
+                locks.enter_context(self._stripes[index])
+            plan = plan_batch(operations, self.get)
+            # Only now that the whole batch is known to apply are IDs handed out
+            changes, results = [], []
+            for op, book_id, book, old in plan:
+                if book_id is None:
+                    book_id = self._allocate_id()
+                    results.append(book_id)
+                else:
+                    results.append(old)
+                changes.append((op, book_id, book))
+            self._commit(changes)
+        return results
+
+    def add_listener(self, callback):
+        with self._turn():
+            for book_id, book in self.items():
+                callback('put', book_id, book, None)
+            self._listeners.append(callback)
+
+    def _existing(self, book_id):
+        """Return the book with `book_id`, raising KeyError if there is none."""
+        book = self.get(book_id)
+        if book is None:
+            raise KeyError(book_id)
+        return book
+
+    def _allocate_id(self):
+        """Atomically hand out the next unused book ID."""
+        with self._id_lock:
+            book_id = self._next_id
+            self._next_id += 1
+        return book_id
+
+    def _stripe(self, book_id):
+        """Return the lock serializing writers to `book_id`."""
+        return self._stripes[book_id % LOCK_STRIPES]
+
+    def _commit(self, changes):
+        """
+        Put ("put") or delete ("delete") books through the write pipeline.
+
+        `changes` is a list of (op, book ID, book) that is numbered, logged
+        and applied as one: it takes a single ticket, so no other change and
+        no listener call comes between its parts. Callers hold the books'
+        stripes. The changes are numbered and logged first: if that fails,
+        nothing has changed yet.
+        """
+        with self._write_lock:
+            issued = self._issued_version
+            numbered = []
+            try:
+                for op, book_id, book in changes:
+                    self._issued_version = self._next_version()
+                    numbered.append((op, book_id, book, self._issued_version))
+                self._record(numbered)
+            except BaseException:
+                self._issued_version = issued
+                raise
+            self._tickets += 1
+            ticket = self._tickets
+        try:
+            self._sync(ticket)
+        except BaseException:
+            # Pass the turn on in order; the change isn't applied
+            self._wait_turn(ticket)
+            self._end_turn(ticket)
+            raise
+        self._wait_turn(ticket)
+        try:
+            self._apply(numbered)
+        finally:
+            self._end_turn(ticket)
+
+    def _wait_turn(self, ticket):
+        """Block until every ticket before `ticket` is done."""
+        if self._applied == ticket - 1:
+            return  # Only our own _end_turn() can move it on from here
+        with self._turn_lock:
+            if self._applied == ticket - 1:
+                return
+            waiter = self._waiters[ticket] = threading.Lock()
+            waiter.acquire()
+        waiter.acquire()  # Released by ticket - 1 when it is done
+
+    def _end_turn(self, ticket):
+        """Mark `ticket` done and wake the next one if it is waiting."""
+        with self._turn_lock:
+            self._applied = ticket
+            waiter = self._waiters.pop(ticket + 1, None)
+        if waiter is not None:
+            waiter.release()
+
+    @contextmanager
+    def _turn(self):
+        """
+        Take a ticket and run the block in its turn, between two changes.
+
+        The store is at rest in the block: every change numbered before it
+        is applied and none after it is (used by add_listener and compaction).
+        """
+        with self._write_lock:
+            self._tickets += 1
+            ticket = self._tickets
+        self._wait_turn(ticket)
+        try:
+            yield
+        finally:
+            self._end_turn(ticket)
+
+    def _apply(self, numbered):
+        """Apply sequenced (op, book ID, book, version) changes. Runs in their turn."""
+        for op, book_id, book, version in numbered:
+            if op == 'put':
+                self._put(book_id, book, version)
+            else:
+                self._remove(book_id, version)
+
+    def _put(self, book_id, book, version):
+        """
+        Insert or replace a book, keeping the ID list, indexes and versions current.
+
+        Runs in the change's turn (or while the store is being loaded).
+        """
+        old = self.get(book_id)
+        if old is None:
+            if not self._ids or self._ids[-1] < book_id:
+                self._ids.append(book_id)
+            else:
+                insort(self._ids, book_id)  # Restoring an older book
+        else:
+            self._authors.remove(book_id, old['author'])
+            self._prices.remove(book_id, old['price'])
+        self._version = version
+        self._store_book(book_id, book, version)
+        self._authors.add(book_id, book['author'])
+        self._prices.add(book_id, book['price'])
+        with self._id_lock:
+            self._next_id = max(self._next_id, book_id + 1)
+        self._changed('put', book_id, book, old)
+
+    def _remove(self, book_id, version):
+        """
+        Delete a book from the dict, the ID list, the indexes and the versions.
+
+        Runs in the change's turn (or while the store is being loaded).
+        """
+        book = self.get(book_id)
+        self._drop_book(book_id)
+        del self._ids[bisect_left(self._ids, book_id)]
+        self._authors.remove(book_id, book['author'])
+        self._prices.remove(book_id, book['price'])
+        self._version = version
+        self._changed('delete', book_id, None, book)
+
+    def _next_version(self):
+        """Return the version number of a new change. Callers must hold the write lock."""
+        if self._version_clock is None:
+            # Changes numbered before this one may not be applied yet
+            return max(self._issued_version, self._version) + 1
+        return self._version_clock()
+
+    def _store_book(self, book_id, book, version):
+        """Save a book and its version. Overridden by other in-memory layouts."""
+        self._books[book_id] = book
+        self._book_versions[book_id] = version
+
+    def _drop_book(self, book_id):
+        """Forget a book and its version. Overridden by other in-memory layouts."""
+        del self._books[book_id]
+        self._book_versions.pop(book_id, None)
+
+    def _record(self, numbered):
+        """Called under the write lock as changes are numbered; DurableBookStore logs them here."""
+
+    def _sync(self, ticket):
+        """Called (without the write lock) before change `ticket` is applied; DurableBookStore fsyncs here."""
+
+    def _changed(self, op, book_id, book, old):
+        """Called after every change ("put" or "delete") to notify the listeners."""
+        for callback in self._listeners:
+            callback(op, book_id, book, old)
+
+
+class DurableBookStore(MemoryBookStore):
+    """
+    MemoryBookStore backed by an append-only log plus compacted snapshots.
+
+    Args:
+        data_dir (str): Directory holding snapshot.jsonl and books.log
+        snapshot_every (int): Compact the log after this many writes
+        fsync (bool): fsync the log after every write (slower, survives
+            power loss rather than just process crashes)
+        version_clock (callable or None): See MemoryBookStore
+    """
+
+    SNAPSHOT_FILE = 'snapshot.jsonl'
+    LOG_FILE = 'books.log'
+
+    def __init__(self, data_dir, snapshot_every=10000, fsync=False, version_clock=None):
+        super().__init__(version_clock)
+        self._data_dir = data_dir
+        self._snapshot_path = os.path.join(data_dir, self.SNAPSHOT_FILE)
+        self._log_path = os.path.join(data_dir, self.LOG_FILE)
+        self._snapshot_every = snapshot_every
+        self._fsync = fsync
+        self._log = None
+        self._unapplied = {}  # version -> log line, for changes waiting for their turn
+        # Held by the one writer fsyncing for everybody, and to swap the log
+        self._sync_lock = threading.Lock()
+        self._synced = 0  # Every ticket up to this one is fsynced
+        os.makedirs(data_dir, exist_ok=True)
+
+        has_snapshot = self._load_snapshot()
+        self._log_records = self._replay_log()
+        # Unbuffered: each record reaches the OS in one write() call
+        self._log = open(self._log_path, 'ab', buffering=0)
+        if not has_snapshot:
+            # Persist the epoch straight away so ETags survive restarts
+            self.compact()
+
+    def _record(self, numbered):
+        """
+        Append changes to the log before they are applied (write-ahead).
+
+        Several changes go into one "batch" record, a single line: replay
+        either sees all of them or, if the line was torn, none.
+        """
+        if self._log is None:
+            return  # Closed
+        records = []
+        for op, book_id, book, version in numbered:
+            record = {"v": version, "op": op, "id": book_id}
+            if book is not None:
+                record["book"] = book
+            records.append(record)
+        version = numbered[-1][3]
+        if len(records) > 1:
+            record = {"v": version, "op": "batch", "changes": records}
+        line = (json.dumps(record, separators=(',', ':')) + '\n').encode('utf-8')
+        self._write_log(line)
+        self._unapplied[version] = line
+        self._log_records += 1
+
+    def _write_log(self, data):
+        view = memoryview(data)
+        while view:
+            view = view[self._log.write(view):]
+
+    def _sync(self, ticket):
+        """Group commit: one fsync makes every record appended so far durable."""
+        if not self._fsync:
+            return
+        with self._sync_lock:
+            if self._synced >= ticket:
+                return  # Another writer's fsync already covered this record
+            # Every ticket handed out so far has its record in the file
+            done = self._tickets
+            if self._log is not None:
+                os.fsync(self._log.fileno())
+            self._synced = done
+
+    def _apply(self, numbered):
+        self._unapplied.pop(numbered[-1][3], None)
+        super()._apply(numbered)
+        if self._log is not None and self._log_records >= self._snapshot_every:
+            self._compact()
+
+    def reserve_ids(self, next_id):
+        # The snapshot header is the only place next_id is saved
+        with self._turn():
+            if next_id > self._next_id:
+                super().reserve_ids(next_id)
+                self._compact()
+
+    def compact(self):
+        """
+        Write the current state to a new snapshot and truncate the log.
+
+        The snapshot is written to a temporary file and atomically renamed
+        over the old one, so a crash at any point leaves a usable snapshot.
+        Log records already contained in the snapshot are skipped on replay
+        (by version), so a crash between the rename and the truncate is safe.
+        """
+        with self._turn():
+            self._compact()
+
+    def _compact(self):
+        """Snapshot and truncate. Runs in a turn: no change is half-applied."""
+        tmp_path = self._snapshot_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            header = {"version": self._version, "next_id": self._next_id, "epoch": self._epoch}
+            f.write(json.dumps(header, separators=(',', ':')) + '\n')
+            for book_id in self._ids:
+                line = {"id": book_id, "v": self._book_versions[book_id], "book": self._books[book_id]}
+                f.write(json.dumps(line, separators=(',', ':')) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._snapshot_path)
+
+        with self._sync_lock, self._write_lock:
+            # Changes logged since our turn began wait for theirs: carry
+            # their records over into the new log
+            pending = sorted((v, line) for v, line in self._unapplied.items() if v > self._version)
+            self._unapplied = dict(pending)
+            if self._log is not None:
+                self._log.close()
+            self._log = open(self._log_path, 'wb', buffering=0)
+            self._write_log(b''.join(line for _, line in pending))
+            if self._fsync and pending:
+                os.fsync(self._log.fileno())
+            self._synced = self._tickets
+            self._log_records = len(pending)
+
+    def close(self):
+        """Compact the log into a snapshot and close it."""
+        with self._turn():
+            if self._log is not None:
+                self._compact()
+                self._log.close()
+                self._log = None
+
+    def _load_snapshot(self):
+        """
+        Load snapshot.jsonl through a read-only memory map.
+
+        Returns:
+            bool: True if a snapshot was found
+        """
+        if not os.path.exists(self._snapshot_path) or os.path.getsize(self._snapshot_path) == 0:
+            return False
+
+        prices = []
+        with open(self._snapshot_path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                header = json.loads(mm.readline())
+                for line in iter(mm.readline, b''):
+                    record = json.loads(line)
+                    book_id, book = record['id'], record['book']
+                    self._books[book_id] = book
+                    self._ids.append(book_id)  # Snapshots are written in ID order
+                    self._book_versions[book_id] = record['v']
+                    self._authors.add(book_id, book['author'])
+                    prices.append((book_id, book['price']))
+
+        self._prices.add_many(prices)
+        self._version = header['version']
+        self._next_id = header['next_id']
+        self._epoch = header['epoch']
+        return True
+
+    def _replay_log(self):
+        """
+        Re-apply the changes logged since the snapshot.
+
+        A torn final line (no trailing newline: a crash mid-write) is cut
+        off; that change was never acknowledged.
+
+        Returns:
+            int: Number of records in the log
+
+        Raises:
+            CorruptLogError: If a complete line can't be parsed
+        """
+        if not os.path.exists(self._log_path):
+            return 0
+
+        count = 0
+        good_size = 0
+        with open(self._log_path, 'rb') as f:
+            for number, line in enumerate(f, 1):
+                if not line.endswith(b'\n'):
+                    break  # Torn final line
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    record = None
+                changes = [record]
+                if isinstance(record, dict) and record.get('op') == 'batch':
+                    changes = record.get('changes')
+                    if not isinstance(changes, list) or not changes:
+                        changes = [None]
+                if not all(isinstance(change, dict) and {'v', 'op', 'id'} <= change.keys() for change in changes):
+                    raise CorruptLogError(f"{self._log_path}, line {number}: unreadable record")
+                good_size += len(line)
+                count += 1
+                for change in changes:
+                    if change['v'] <= self._version:
+                        continue  # Already part of the snapshot
+                    if change['op'] == 'put':
+                        self._put(change['id'], change['book'], change['v'])
+                    elif self.get(change['id']) is not None:
+                        self._remove(change['id'], change['v'])
+                    # Keep the logged version numbers even if the log has gaps
+                    self._version = change['v']
+
+        if good_size < os.path.getsize(self._log_path):
+            with open(self._log_path, 'r+b') as f:
+                f.truncate(good_size)
+        return count
+
+
+class ColumnarBookStore(MemoryBookStore):
+    """
+    MemoryBookStore that keeps books in typed columns instead of dicts.
+
+    Every book gets a row of its own in each column. Rows are allocated
+    densely (a deleted book's row is reused by the next new one) and found
+    through an ID -> row hash table kept in two typed arrays, so a store
+    holding only some of the IDs (a shard) has only as many rows as books.
+    Each book costs a title string plus about 64 bytes of array slots
+    (its row and its hash table slots), instead of a dict, a float object
+    and its own author string. Authors are interned: each distinct name is
+    stored once and rows hold a small integer code. The ID list and indexes
+    use typed arrays as well.
+
+    Books are rebuilt as dicts on the way out of get(), so callers see the
+    same interface as with MemoryBookStore. Sequence counters (seqlocks),
+    one per row and one for the hash table, let get() detect and retry a
+    read that raced with a writer, so readers still never take a lock or
+    see half-written rows.
+    """
+
+    # Hash table keys of a never used and of a vacated slot (IDs are >= 0)
+    _EMPTY = -1
+    _VACATED = -2
+
+    def __init__(self, version_clock=None):
+        super().__init__(version_clock)
+        self._books = None
+        self._book_versions = None
+        self._ids = array('q')
+        self._authors = AuthorIndex(bucket_type=partial(array, 'q'))
+        self._prices = PackedPriceIndex()
+        self._titles = []                # title per row (None = no book)
+        self._author_codes = array('l')  # index into _author_names (-1 = no book)
+        self._price_column = array('d')
+        self._version_column = array('q')
+        self._row_seq = array('L')       # odd while the row is being written
+        self._free_rows = []             # Rows of deleted books, for reuse
+        # ID -> row: linear probing over (keys, rows, size), replaced as a
+        # whole when it grows. _map_seq is odd while a writer changes it.
+        self._table = (array('q', [self._EMPTY]) * 8, array('q', [0]) * 8, 8)
+        self._table_used = 0             # Slots not _EMPTY (books + vacated)
+        self._map_seq = 0
+        self._author_names = []
+        self._author_codes_by_name = {}
+        self._count = 0
+
+    def _row_of(self, book_id):
+        """Return the row of `book_id`, or -1 if it has none (readers check _map_seq around it)."""
+        keys, rows, size = self._table
+        i = book_id % size
+        while True:
+            key = keys[i]
+            if key == book_id:
+                return rows[i]
+            if key == self._EMPTY:
+                return -1
+            i = (i + 1) % size
+
+    def get(self, book_id):
+        if book_id < 0:
+            return None
+        while True:
+            map_seq = self._map_seq
+            # _row_of(), inlined: get() is the hot path of every listing
+            keys, rows, size = self._table
+            i = book_id % size
+            key = keys[i]
+            while key != book_id and key != -1:
+                i = (i + 1) % size
+                key = keys[i]
+            book = None
+            if key == book_id:
+                row = rows[i]
+                seq = self._row_seq[row]
+                code = self._author_codes[row]
+                if code >= 0:
+                    book = {
+                        "title": self._titles[row],
+                        "author": self._author_names[code],
+                        "price": self._price_column[row]
+                    }
+                if seq & 1 or self._row_seq[row] != seq:
+                    time.sleep(0)  # A writer is mid-row; let it finish
+                    continue
+            if map_seq & 1 or self._map_seq != map_seq:
+                time.sleep(0)  # A writer changed the table meanwhile
+                continue
+            return book
+
+    def count(self):
+        return self._count
+
+    def book_version(self, book_id):
+        if book_id < 0:
+            return None
+        while True:
+            map_seq = self._map_seq
+            row = self._row_of(book_id)
+            version = self._version_column[row] if row >= 0 and self._author_codes[row] >= 0 else None
+            if not map_seq & 1 and self._map_seq == map_seq:
+                return version
+
+    def _intern_author(self, author):
+        """Return the integer code for `author`, adding it to the table if new."""
+        code = self._author_codes_by_name.get(author)
+        if code is None:
+            code = len(self._author_names)
+            self._author_names.append(author)
+            self._author_codes_by_name[author] = code
+        return code
+
+    def _new_row(self):
+        """Return a free row, reusing a deleted book's or adding one to every column."""
+        if self._free_rows:
+            return self._free_rows.pop()
+        self._titles.append(None)
+        self._author_codes.append(-1)
+        self._price_column.append(0.0)
+        self._version_column.append(0)
+        self._row_seq.append(0)
+        return len(self._row_seq) - 1
+
+    def _map_row(self, book_id, row):
+        """Add `book_id` -> `row` to the hash table, rebuilding it first if it is 2/3 used."""
+        keys, rows, size = self._table
+        if (self._table_used + 1) * 3 > size * 2:
+            self._rebuild_table()
+            keys, rows, size = self._table
+        i = book_id % size
+        while keys[i] >= 0:
+            i = (i + 1) % size
+        if keys[i] == self._EMPTY:
+            self._table_used += 1
+        # Row first: a reader that finds the key finds its row
+        rows[i] = row
+        keys[i] = book_id
+
+    def _rebuild_table(self):
+        """Replace the hash table by one without vacated slots, half full."""
+        keys, rows, _ = self._table
+        size = max(8, (self._count + 1) * 2)
+        table = (array('q', [self._EMPTY]) * size, array('q', [0]) * size, size)
+        new_keys, new_rows, _ = table
+        for book_id, row in zip(keys, rows):
+            if book_id >= 0:
+                i = book_id % size
+                while new_keys[i] != self._EMPTY:
+                    i = (i + 1) % size
+                new_keys[i] = book_id
+                new_rows[i] = row
+        self._map_seq += 1
+        self._table = table
+        self._table_used = self._count
+        self._map_seq += 1
+
+    def _store_book(self, book_id, book, version):
+        # Everything that can fail comes before the first change to a column
+        if book_id < 0:
+            raise ValueError("Book IDs can't be negative")
+        code = self._intern_author(book['author'])
+        price = float(book['price'])
+        row = self._row_of(book_id)
+        new = row < 0
+        if new:
+            row = self._new_row()
+
+        self._row_seq[row] += 1
+        self._titles[row] = book['title']
+        self._author_codes[row] = code
+        self._price_column[row] = price
+        self._version_column[row] = version
+        self._row_seq[row] += 1
+
+        if new:
+            # The row is filled in first, so a reader finding it in the table finds the book
+            self._map_row(book_id, row)
+            self._count += 1
+
+    def _drop_book(self, book_id):
+        keys, rows, size = self._table
+        i = book_id % size
+        while keys[i] != book_id:
+            i = (i + 1) % size
+        row = rows[i]
+        self._map_seq += 1
+        keys[i] = self._VACATED
+        self._map_seq += 1
+
+        self._row_seq[row] += 1
+        self._titles[row] = None
+        self._author_codes[row] = -1
+        self._version_column[row] = 0
+        self._row_seq[row] += 1
+        self._free_rows.append(row)
+        self._count -= 1
+
+
+def jump_hash(key, buckets):
+    """
+    Map an integer key to a bucket in range(buckets) (jump consistent hash).
+
+    Growing from n to n + 1 buckets moves only about 1/(n + 1) of the keys,
+    all of them into the new bucket; plain `key % buckets` would move almost
+    all of them. (Lamping & Veach, "A Fast, Minimal Memory, Consistent Hash
+    Algorithm", 2014.)
+    """
+    bucket, jump = -1, 0
+    while jump < buckets:
+        bucket = jump
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        jump = int((bucket + 1) * (2147483648.0 / ((key >> 33) + 1)))
+    return bucket
+
+
+def _merge_ids(id_lists, limit=None):
+    """Merge ascending ID lists into one, dropping duplicates (a book mid-move is in two shards)."""
+    merged = []
+    for book_id in heapq.merge(*id_lists):
+        if not merged or merged[-1] != book_id:
+            merged.append(book_id)
+            if len(merged) == limit:
+                break
+    return merged
+
+
+class ShardedBookStore(BookStore):
+    """
+    Router partitioning the books over several stores by a hash of their ID.
+
+    Args:
+        kind (str): Backend of every shard ("memory", "log" or "columnar")
+        shards (int): Number of shards
+        data_dir (str): For the "log" backend, shard i lives in data_dir/shard-i
+        **options: Extra keyword arguments for each shard's constructor
+    """
+
+    SHARD_DIR = re.compile(r'shard-(\d+)$')
+
+    def __init__(self, kind='memory', shards=4, data_dir='data', **options):
+        if shards < 1:
+            raise ValueError("A sharded store needs at least one shard")
+        if kind not in STORE_TYPES:
+            raise ValueError(f"Unknown store type {kind!r} (expected one of {', '.join(STORE_TYPES)})")
+        self._kind = kind
+        self._data_dir = data_dir
+        self._options = options
+        self._listeners = []
+        # Serializes writes, so the shared version clock numbers them in the
+        # order the listeners see them. Held for the whole of a rebalance.
+        self._write_lock = threading.RLock()
+        self._version = 0
+        self._moved_book = None  # Book being moved by a rebalance (its "old" value)
+        self._silent = False     # Set while a shard reports changes the router hides
+
+        # Open every shard left by a previous run too (a rebalance at the
+        # end moves their books where they belong)
+        existing = 0
+        if kind == 'log' and os.path.isdir(data_dir):
+            for name in os.listdir(data_dir):
+                match = self.SHARD_DIR.match(name)
+                if match:
+                    existing = max(existing, int(match.group(1)) + 1)
+        stores = [self._open_shard(i) for i in range(max(shards, existing))]
+        # (shards, number of shards books are placed by, target count while rebalancing)
+        self._layout = (stores, len(stores), None)
+        self._version = max(store.version() for store in stores)
+        self._next_id = max(store.next_id() for store in stores)
+        self._epoch = stores[0].epoch()
+        self.rebalance(shards)
+
+    def _open_shard(self, index):
+        """Open shard `index` and follow its changes."""
+        options = dict(self._options, version_clock=self._next_version)
+        # Loading the shard's log and replaying its books to our listener
+        # aren't new changes: keep them off the clock and the listeners
+        self._silent = True
+        try:
+            if self._kind == 'log':
+                shard = DurableBookStore(self._shard_dir(index), **options)
+            elif self._kind == 'columnar':
+                shard = ColumnarBookStore(**options)
+            else:
+                shard = MemoryBookStore(**options)
+            shard.add_listener(self._on_shard_change)
+        finally:
+            self._silent = False
+        return shard
+
+    def _shard_dir(self, index):
+        return os.path.join(self._data_dir, f'shard-{index}')
+
+    def _next_version(self):
+        """Version clock shared by the shards. Called under the router's write lock."""
+        if not self._silent:
+            self._version += 1
+        return self._version
+
+    def _on_shard_change(self, op, book_id, book, old):
+        """Shard listener: forward a change to the router's listeners."""
+        if self._silent:
+            return
+        if self._moved_book is not None:
+            old = self._moved_book
+        for callback in self._listeners:
+            callback(op, book_id, book, old)
+
+    def _shard_for(self, book_id):
+        """Return the shard a book belongs to (writers only: the layout is stable under the write lock)."""
+        stores, count, _ = self._layout
+        return stores[jump_hash(book_id, count)]
+
+    def _read(self, book_id, method):
+        """
+        Call a single-book read on the shard holding the book.
+
+        Lock-free: during a rebalance a book may already have moved to its
+        new shard, so the new place is tried as well, and the lookup is
+        repeated if the layout changed while it ran.
+        """
+        while True:
+            layout = self._layout
+            stores, count, target = layout
+            value = getattr(stores[jump_hash(book_id, count)], method)(book_id)
+            if value is None and target is not None:
+                value = getattr(stores[jump_hash(book_id, target)], method)(book_id)
+            if value is not None or layout is self._layout:
+                return value
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def get(self, book_id):
+        return self._read(book_id, 'get')
+
+    def count(self):
+        return sum(store.count() for store in self._layout[0])
+
+    def items(self):
+        pairs = []
+        for pair in heapq.merge(*(store.items() for store in self._layout[0]), key=itemgetter(0)):
+            if not pairs or pairs[-1][0] != pair[0]:
+                pairs.append(pair)
+        return pairs
+
+    def ids_after(self, after_id, limit):
+        return _merge_ids([store.ids_after(after_id, limit) for store in self._layout[0]], limit)
+
+    def by_author(self, author):
+        return _merge_ids([store.by_author(author) for store in self._layout[0]])
+
+    def price_range(self, min_price=None, max_price=None):
+        return _merge_ids([sorted(store.price_range(min_price, max_price)) for store in self._layout[0]])
+
+    def version(self):
+        return self._version
+
+    def book_version(self, book_id):
+        return self._read(book_id, 'book_version')
+
+    def epoch(self):
+        return self._epoch
+
+    def next_id(self):
+        return self._next_id
+
+    def shard_sizes(self):
+        """Return the number of books in each shard."""
+        return [store.count() for store in self._layout[0]]
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def create(self, book):
+        with self._write_lock:
+            book_id = self._next_id
+            self._next_id += 1
+            self._shard_for(book_id).restore(book_id, book)
+        return book_id
+
+    def update(self, book_id, changes):
+        with self._write_lock:
+            return self._shard_for(book_id).update(book_id, changes)
+
+    def delete(self, book_id):
+        with self._write_lock:
+            return self._shard_for(book_id).delete(book_id)
+
+    def restore(self, book_id, book):
+        with self._write_lock:
+            self._shard_for(book_id).restore(book_id, book)
+            self._next_id = max(self._next_id, book_id + 1)
+
+    def apply_batch(self, operations):
+        # Nothing else writes while the router's lock is held. Each shard
+        # applies its part change by change, so with the "log" backend a
+        # crash in the middle of a batch can keep its first changes
+        with self._write_lock:
+            results = []
+            for op, book_id, book, old in plan_batch(operations, self.get):
+                if book_id is None:
+                    book_id = self._next_id
+                    self._next_id += 1
+                    self._shard_for(book_id).restore(book_id, book)
+                    results.append(book_id)
+                elif op == 'put':
+                    self._shard_for(book_id).update(book_id, book)
+                    results.append(old)
+                else:
+                    self._shard_for(book_id).delete(book_id)
+                    results.append(old)
+        return results
+
+    def reserve_ids(self, next_id):
+        with self._write_lock:
+            self._next_id = max(self._next_id, next_id)
+            for store in self._layout[0]:
+                store.reserve_ids(self._next_id)
+
+    def add_listener(self, callback):
+        with self._write_lock:
+            for book_id, book in self.items():
+                callback('put', book_id, book, None)
+            self._listeners.append(callback)
+
+    def rebalance(self, shards):
+        """
+        Change the number of shards, moving only the books whose shard changes.
+
+        Reads are served throughout; writes wait until the move is done.
+        With the "log" backend, emptied shard directories are removed. The
+        router's next ID is reserved in every remaining shard first, since at
+        startup it is recovered from the shards that are left.
+
+        Returns:
+            int: Number of books moved
+        """
+        if shards < 1:
+            raise ValueError("A sharded store needs at least one shard")
+        with self._write_lock:
+            stores, count, _ = self._layout
+            stores = stores + [self._open_shard(i) for i in range(len(stores), shards)]
+            self._layout = (stores, count, shards)
+
+            moved = 0
+            for index, store in enumerate(stores):
+                for book_id, book in store.items():
+                    target = jump_hash(book_id, shards)
+                    if target != index:
+                        self._move(book_id, book, store, stores[target])
+                        moved += 1
+
+            self._layout = (stores[:shards], shards, None)
+            if len(stores) > shards:
+                for store in stores[:shards]:
+                    store.reserve_ids(self._next_id)
+            for index in range(len(stores) - 1, shards - 1, -1):
+                stores[index].close()
+                if self._kind == 'log':
+                    shutil.rmtree(self._shard_dir(index))
+        return moved
+
+    def _move(self, book_id, book, source, target):
+        """Copy a book to its new shard, then drop it from the old one. Caller holds the write lock."""
+        # Readers look in the old shard first, then the new one, so the book
+        # is visible throughout. A copy left in the target by a crash during
+        # an earlier rebalance is kept as is.
+        if target.get(book_id) is None:
+            self._moved_book = book
+            try:
+                target.restore(book_id, book)
+            finally:
+                self._moved_book = None
+        self._silent = True
+        try:
+            source.delete(book_id)
+        finally:
+            self._silent = False
+
+    def close(self):
+        with self._write_lock:
+            for store in self._layout[0]:
+                store.close()
+
+
+def open_store(kind='memory', data_dir='data', shards=None, **options):
+    """
+    Create a storage backend by name.
+
+    Args:
+        kind (str): One of STORE_TYPES ("memory", "log" or "columnar")
+        data_dir (str): Data directory for the "log" backend
+        shards (int or None): If given, a ShardedBookStore over this many
+            stores of `kind`
+        **options: Extra keyword arguments for the backend's constructor
+
+    Returns:
+        BookStore: The new store
+
+    Raises:
+        ValueError: If `kind` is not a known backend
+    """
+    if shards is not None:
+        return ShardedBookStore(kind, shards, data_dir, **options)
+    if kind == 'memory':
+        return MemoryBookStore(**options)
+    if kind == 'log':
+        return DurableBookStore(data_dir, **options)
+    if kind == 'columnar':
+        return ColumnarBookStore(**options)
+    raise ValueError(f"Unknown store type {kind!r} (expected one of {', '.join(STORE_TYPES)})")
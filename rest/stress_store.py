@@ -0,0 +1,234 @@
+"""
+Store Stress Test - Book Management System
+==========================================
+Hammers a BookStore from many threads at once and checks that nothing was
+lost or corrupted along the way.
+
+Checks:
+1. Concurrent creates: every create gets a unique ID and no book goes missing
+2. Concurrent updates to shared books: two threads per book write disjoint
+   fields, so a racy read-modify-write would undo the other thread's
+   change (a lost update)
+3. Torn reads: readers running alongside the writers must only ever see
+   complete, consistent books
+4. Index consistency: after the dust settles, the author and price indexes
+   must agree with the books themselves
+5. With --shards: rebalancing to more and then fewer shards while readers
+   look up every book; no book may disappear, even for a moment
+6. Change order: writes run concurrently up to the point where they are
+   applied, so a listener must still see every change once, in version
+   order (the log backend also fsyncs and compacts while this runs, and
+   must reopen to the same books)
+
+The thread switch interval is lowered so that races show up quickly.
+
+Usage:
+    python stress_store.py                 # every backend
+    python stress_store.py --threads 16 --ops 5000
+    python stress_store.py --shards 4      # every backend, sharded
+Exits with status 1 if any check fails.
+"""
+
+import argparse
+import sys
+import tempfile
+import threading
+
+from store import STORE_TYPES, open_store
+
+# Number of distinct authors the writers rotate through
+AUTHORS = ['Tanenbaum', 'Knuth', 'Lamport', 'Liskov']
+
+
+def run_threads(count, target):
+    """Start `count` threads running target(thread_number) and wait for them."""
+    threads = [threading.Thread(target=target, args=(n,)) for n in range(count)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def check_creates(store, threads, ops):
+    """Create books from every thread at once; IDs must be unique and complete."""
+    created = [[] for _ in range(threads)]
+    before = store.count()
+
+    def worker(n):
+        for i in range(ops):
+            book = {"title": f"t{n}-{i}", "author": AUTHORS[i % len(AUTHORS)], "price": float(i)}
+            created[n].append(store.create(book))
+
+    run_threads(threads, worker)
+    ids = [book_id for ids in created for book_id in ids]
+    failures = []
+    if len(set(ids)) != len(ids):
+        failures.append(f"duplicate IDs handed out: {len(ids) - len(set(ids))}")
+    if store.count() != before + threads * ops:
+        failures.append(f"expected {before + threads * ops} books, found {store.count()}")
+    return failures
+
+
+def check_updates(store, threads, ops):
+    """
+    Update shared books from pairs of threads while readers look for torn books.
+
+    In each pair, one thread writes title and price together (always with
+    matching values) and the other writes only the author. A racy
+    read-modify-write would let one thread put back a stale copy of the
+    other's fields; a torn read would show a title and price that disagree.
+    """
+    book_ids = [store.create({"title": "0", "author": AUTHORS[0], "price": 0.0})
+                for _ in range(max(1, threads // 2))]
+    stop = threading.Event()
+    torn = []
+
+    def reader():
+        while not stop.is_set():
+            for book_id in book_ids:
+                book = store.get(book_id)
+                if book is None or float(book['title']) != book['price']:
+                    torn.append(book)
+            store.by_author(AUTHORS[0])
+            store.price_range(0.0, 10.0)
+            store.ids_after(0, 50)
+
+    def writer(n):
+        book_id = book_ids[(n // 2) % len(book_ids)]
+        for i in range(1, ops + 1):
+            if n % 2 == 0:
+                store.update(book_id, {"title": str(i), "price": float(i)})
+            else:
+                store.update(book_id, {"author": AUTHORS[i % len(AUTHORS)]})
+
+    readers = [threading.Thread(target=reader) for _ in range(2)]
+    for t in readers:
+        t.start()
+    run_threads(2 * len(book_ids), writer)
+    stop.set()
+    for t in readers:
+        t.join()
+
+    failures = []
+    expected_author = AUTHORS[ops % len(AUTHORS)]
+    lost = [book_id for book_id in book_ids
+            if store.get(book_id) != {"title": str(ops), "author": expected_author, "price": float(ops)}]
+    if lost:
+        failures.append(f"lost updates on books {lost}")
+    if torn:
+        failures.append(f"{len(torn)} torn reads")
+    return failures
+
+
+def check_indexes(store):
+    """Compare the indexes with a full scan of the books."""
+    failures = []
+    items = store.items()
+    for author in AUTHORS:
+        expected = [book_id for book_id, b in items if b['author'] == author]
+        if store.by_author(author) != expected:
+            failures.append(f"author index out of sync for {author!r}")
+    expected = sorted(book_id for book_id, b in items if 0.0 <= b['price'] <= 10.0)
+    if sorted(store.price_range(0.0, 10.0)) != expected:
+        failures.append("price index out of sync")
+    if [book_id for book_id, _ in items] != sorted(book_id for book_id, _ in items):
+        failures.append("ID list out of order")
+    return failures
+
+
+def check_rebalance(store, threads):
+    """Grow and shrink a sharded store while readers look up every book."""
+    items = store.items()
+    shards = len(store.shard_sizes())
+    stop = threading.Event()
+    missing = []
+
+    def reader(n):
+        while not stop.is_set():
+            for book_id, book in items[n::threads]:
+                if store.get(book_id) != book:
+                    missing.append(book_id)
+
+    readers = [threading.Thread(target=reader, args=(n,)) for n in range(threads)]
+    for t in readers:
+        t.start()
+    store.rebalance(shards + 2)
+    store.rebalance(max(1, shards - 1))
+    store.rebalance(shards)
+    stop.set()
+    for t in readers:
+        t.join()
+
+    failures = []
+    if missing:
+        failures.append(f"{len(missing)} lookups missed a book during a rebalance")
+    if store.items() != items:
+        failures.append("books changed across rebalances")
+    return failures
+
+
+def follow_versions(store):
+    """Attach a listener recording the store version at every change it is told about."""
+    versions = []
+    store.add_listener(lambda op, book_id, book, old: versions.append(store.version()))
+    return versions
+
+
+def check_change_order(versions, shards):
+    """Listeners must have seen the changes in version order, each exactly once."""
+    if any(b <= a for a, b in zip(versions, versions[1:])):
+        return ["listener saw changes out of version order"]
+    if shards is None and versions and versions[-1] - versions[0] != len(versions) - 1:
+        return [f"listener saw {len(versions)} changes spanning {versions[-1] - versions[0] + 1} versions"]
+    return []
+
+
+def stress(kind, threads, ops, shards=None):
+    """Run every check against a fresh store of the given kind."""
+    with tempfile.TemporaryDirectory() as data_dir:
+        store = open_store(kind, data_dir=data_dir, shards=shards,
+                           **({'snapshot_every': 1000, 'fsync': True} if kind == 'log' else {}))
+        versions = follow_versions(store)
+        failures = check_creates(store, threads, ops)
+        failures += check_updates(store, threads, ops)
+        failures += check_indexes(store)
+        failures += check_change_order(versions, shards)
+        if shards is not None:
+            failures += check_rebalance(store, threads)
+        if kind == 'log':
+            # Everything must also survive a restart
+            expected = store.items()
+            store.close()
+            store = open_store(kind, data_dir=data_dir, shards=shards)
+            if store.items() != expected:
+                failures.append("state differs after reopening the log")
+        store.close()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-threaded stress test for the book stores")
+    parser.add_argument('--threads', type=int, default=8, help="writer threads (default: 8)")
+    parser.add_argument('--ops', type=int, default=2000, help="operations per thread (default: 2000)")
+    parser.add_argument('--store', choices=STORE_TYPES, action='append',
+                        help="backend to test (repeatable, default: all)")
+    parser.add_argument('--shards', type=int, help="test a ShardedBookStore with this many shards")
+    args = parser.parse_args()
+
+    # Switch threads as often as possible to shake out races
+    sys.setswitchinterval(1e-6)
+
+    ok = True
+    for kind in args.store or STORE_TYPES:
+        failures = stress(kind, args.threads, args.ops, args.shards)
+        status = "PASS" if not failures else "FAIL"
+        label = kind if args.shards is None else f"{kind}, {args.shards} shards"
+        print(f"[{status}] {label}: {args.threads} threads x {args.ops} ops")
+        for failure in failures:
+            print(f"    - {failure}")
+        ok = ok and not failures
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
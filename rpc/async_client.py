@@ -0,0 +1,351 @@
+"""
+Async RPC Client - Pipelined Calls with asyncio
+===============================================
+ServerProxy (and BinaryRPCClient) block: one call, wait for the answer,
+next call. AsyncRPCClient talks the binary protocol of binary_rpc.py from
+asyncio instead, so a single thread can keep thousands of calls in flight.
+
+How it Works:
+-------------
+- A pool of up to `pool_size` persistent connections to the binary
+  endpoint, opened on first use; each call goes to the connection with
+  the fewest calls in flight
+- Every request is written with a fresh request ID and its future is
+  parked in the connection's table of pending calls; one reader task per
+  connection resolves the futures as the answers arrive
+- Requests made in the same event loop iteration are sent together in
+  one write, so a burst of calls costs a few system calls, not one each
+- If a write leaves more than the transport's high-water mark unsent (a
+  slow or stalled server), new requests wait until it has drained, so the
+  client's send buffer stays bounded
+- At most `max_in_flight` calls are outstanding per client; further
+  calls wait for a free slot instead of piling up in memory
+
+Timeouts and Cancellation:
+--------------------------
+Every call has a timeout (per client, or per call with timeout=...) and
+raises asyncio.TimeoutError when it expires. The timeout counts from the
+moment call() is entered: waiting for an in-flight slot and for a new
+connection to open use up the same deadline as waiting for the answer. A call can also be cancelled
+like any asyncio task. Either way the call is forgotten on the client and
+its answer is dropped when it arrives; the server can't be told to stop,
+so a call that was already sent still runs there.
+
+Errors:
+-------
+- xmlrpc.client.Fault: the method failed on the server (only that call)
+- ConnectionError: the connection broke; every call in flight on it fails,
+  and the next call opens a new connection
+
+Usage:
+    async with AsyncRPCClient(('127.0.0.1', 9002), pool_size=4) as client:
+        total = await client.add(2, 3)
+        results = await asyncio.gather(*(client.add(i, i) for i in range(5000)))
+        task = client.submit('echo', 'hi')     # an asyncio.Task, already running
+"""
+
+import asyncio
+import itertools
+import socket
+from collections import deque
+
+from binary_rpc import BINARY_PORT, ProtocolError, decode_response, encode_request, frame_length
+
+# Default pool size, call timeout (seconds) and limit on calls in flight
+DEFAULT_POOL_SIZE = 4
+DEFAULT_TIMEOUT = 10.0
+DEFAULT_MAX_IN_FLIGHT = 1024
+
+
+class AsyncRPCConnection:
+    """
+    One persistent connection and the calls in flight on it.
+
+    Use AsyncRPCConnection.open() to create one.
+    """
+
+    def __init__(self, reader, writer):
+        self._reader = reader
+        self._writer = writer
+        self._pending = {}  # request ID -> future of the answer
+        self._ids = itertools.count()
+        self._error = None
+        self._outgoing = []  # Frames waiting for the next flush
+        self._outgoing_size = 0
+        self._draining = None  # Task waiting for a full send buffer to drain
+        self._high_water = writer.transport.get_write_buffer_limits()[1]
+        self._loop = asyncio.get_running_loop()
+        self._reader_task = self._loop.create_task(self._read_answers())
+
+    @classmethod
+    async def open(cls, address):
+        reader, writer = await asyncio.open_connection(*address)
+        writer.get_extra_info('socket').setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return cls(reader, writer)
+
+    @property
+    def in_flight(self):
+        return len(self._pending)
+
+    @property
+    def closed(self):
+        return self._error is not None
+
+    async def call(self, method, params, timeout=None):
+        """
+        Send one request and wait for its answer.
+
+        Raises:
+            asyncio.TimeoutError: If no answer came within `timeout` seconds
+            xmlrpc.client.Fault: If the method failed on the server
+            ConnectionError: If the connection broke
+        """
+        if self._error is not None:
+            raise self._error
+        request_id = next(self._ids) & 0xFFFFFFFF
+        future = self._loop.create_future()
+        self._pending[request_id] = future
+        # A timer instead of asyncio.wait_for(), which costs an extra task per call
+        timer = self._loop.call_later(timeout, self._expire, future) if timeout is not None else None
+        try:
+            while self._draining is not None:
+                # Backpressure: earlier frames are still waiting for the socket
+                await asyncio.shield(self._draining)
+            if not future.done():  # Not timed out or failed while waiting
+                self._queue(encode_request(request_id, method, params))
+            return await future
+        finally:
+            # Answered, failed, timed out or cancelled: forget the call either way
+            self._pending.pop(request_id, None)
+            if timer is not None:
+                timer.cancel()
+
+    def _queue(self, frame):
+        """Queue a frame for the next flush; flush right away once the queue is over the high-water mark."""
+        if not self._outgoing:
+            self._loop.call_soon(self._flush)
+        self._outgoing.append(frame)
+        self._outgoing_size += len(frame)
+        if self._outgoing_size > self._high_water:
+            self._flush()
+
+    def _flush(self):
+        """Write every frame queued since the last flush in one go."""
+        frames, self._outgoing, self._outgoing_size = self._outgoing, [], 0
+        if self._error is not None or not frames:
+            return
+        self._writer.write(b''.join(frames))
+        if self._draining is None and self._writer.transport.get_write_buffer_size() > self._high_water:
+            self._draining = self._loop.create_task(self._drain())
+
+    async def _drain(self):
+        """Wait until the send buffer is below its low-water mark again."""
+        try:
+            await self._writer.drain()
+        except (OSError, RuntimeError):
+            pass  # The reader task notices the broken connection and fails the calls
+        finally:
+            self._draining = None
+
+    @staticmethod
+    def _expire(future):
+        if not future.done():
+            future.set_exception(asyncio.TimeoutError())
+
+    async def _read_answers(self):
+        """Reader task: resolve pending futures as their answers arrive."""
+        try:
+            while True:
+                length = frame_length(await self._reader.readexactly(4))
+                request_id, value = decode_response(await self._reader.readexactly(length))
+                future = self._pending.get(request_id)
+                if future is None or future.done():
+                    continue  # Timed out or cancelled meanwhile
+                if isinstance(value, Exception):
+                    future.set_exception(value)
+                else:
+                    future.set_result(value)
+        except (OSError, EOFError, asyncio.IncompleteReadError, ProtocolError) as e:
+            self._fail(ConnectionError(f"RPC connection lost ({type(e).__name__}: {e})"))
+        except asyncio.CancelledError:
+            self._fail(ConnectionError("RPC connection closed"))
+            raise
+
+    def _fail(self, error):
+        """Mark the connection broken and fail every call still waiting on it."""
+        self._error = error
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(error)
+        self._pending.clear()
+        self._writer.close()
+
+    async def close(self):
+        self._reader_task.cancel()
+        try:
+            await self._reader_task
+        except asyncio.CancelledError:
+            pass
+        try:
+            await self._writer.wait_closed()
+        except OSError:
+            pass
+
+
+class AsyncRPCClient:
+    """
+    asyncio client for the binary RPC endpoint, with a connection pool.
+
+    Args:
+        address (tuple): (host, port) of the binary endpoint
+        pool_size (int): Most connections opened to the server
+        timeout (float or None): Default seconds a call may take (None = no limit)
+        max_in_flight (int): Most calls outstanding at once
+
+    client.add(1, 2) is client.call('add', 1, 2), a coroutine.
+    """
+
+    def __init__(self, address=('127.0.0.1', BINARY_PORT), pool_size=DEFAULT_POOL_SIZE,
+                 timeout=DEFAULT_TIMEOUT, max_in_flight=DEFAULT_MAX_IN_FLIGHT):
+        if pool_size < 1 or max_in_flight < 1:
+            raise ValueError("pool_size and max_in_flight must be at least 1")
+        self.address = address
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._connections = []
+        self._connecting = None  # Task opening a connection, shared by concurrent callers
+        # Free call slots and the calls waiting for one. (asyncio.Semaphore
+        # rescans its woken waiters on every release, which gets quadratic
+        # with thousands of calls queued.)
+        self._free_slots = max_in_flight
+        self._slot_waiters = deque()
+        self._closed = False
+        self.calls = 0
+        self.timeouts = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return lambda *params, **kwargs: self.call(name, *params, **kwargs)
+
+    async def call(self, method, *params, timeout=...):
+        """
+        Call a remote method and return its result.
+
+        Args:
+            timeout (float or None): Overrides the client's timeout for this call
+
+        Raises:
+            asyncio.TimeoutError: If no answer came within the timeout
+            xmlrpc.client.Fault: If the method failed on the server
+            ConnectionError: If the connection broke or the client is closed
+        """
+        timeout = self.timeout if timeout is ... else timeout
+        deadline = None if timeout is None else asyncio.get_running_loop().time() + timeout
+        try:
+            await self._acquire_slot(deadline)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+        try:
+            connection = await self._connection(deadline)
+            self.calls += 1
+            return await connection.call(method, params, self._remaining(deadline))
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            self._release_slot()
+
+    @staticmethod
+    def _remaining(deadline):
+        """Seconds left until `deadline` (None = no limit); TimeoutError if none are."""
+        if deadline is None:
+            return None
+        remaining = deadline - asyncio.get_running_loop().time()
+        if remaining <= 0:
+            raise asyncio.TimeoutError()
+        return remaining
+
+    async def _acquire_slot(self, deadline=None):
+        """
+        Wait until fewer than max_in_flight calls are outstanding, first come first served.
+
+        Raises:
+            asyncio.TimeoutError: If no slot was free by `deadline` (loop time)
+        """
+        if self._free_slots > 0 and not self._slot_waiters:
+            self._free_slots -= 1
+            return
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        self._slot_waiters.append(waiter)
+        # An expired waiter is done, so _release_slot() passes it over
+        timer = loop.call_at(deadline, AsyncRPCConnection._expire, waiter) if deadline is not None else None
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release_slot()  # Handed a slot just as we were cancelled
+            raise
+        finally:
+            if timer is not None:
+                timer.cancel()
+
+    def _release_slot(self):
+        """Hand the slot to the next waiting call, or put it back."""
+        while self._slot_waiters:
+            waiter = self._slot_waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._free_slots += 1
+
+    def submit(self, method, *params, timeout=...):
+        """Start a call in the background and return its asyncio.Task (a future)."""
+        return asyncio.get_running_loop().create_task(self.call(method, *params, timeout=timeout))
+
+    async def _connection(self, deadline=None):
+        """
+        Return the least busy open connection, opening another while the pool isn't full.
+
+        Raises:
+            asyncio.TimeoutError: If the connection being opened isn't ready by `deadline`
+        """
+        if self._closed:
+            raise ConnectionError("AsyncRPCClient is closed")
+        self._connections = [c for c in self._connections if not c.closed]
+        idle = min(self._connections, key=lambda c: c.in_flight, default=None)
+        if idle is not None and (idle.in_flight == 0 or len(self._connections) >= self.pool_size):
+            return idle
+        if self._connecting is None:
+            self._connecting = asyncio.get_running_loop().create_task(self._open())
+        try:
+            # Shielded: a call that gives up doesn't stop the open for the others
+            return await asyncio.wait_for(asyncio.shield(self._connecting), self._remaining(deadline))
+        except asyncio.TimeoutError:
+            raise  # A subclass of OSError, but not a failed connection
+        except OSError:
+            if idle is not None:
+                return idle
+            raise
+
+    async def _open(self):
+        try:
+            connection = await AsyncRPCConnection.open(self.address)
+            self._connections.append(connection)
+            return connection
+        finally:
+            self._connecting = None
+
+    async def close(self):
+        """Close every connection; calls still in flight fail with ConnectionError."""
+        self._closed = True
+        connections, self._connections = self._connections, []
+        await asyncio.gather(*(c.close() for c in connections))
@@ -0,0 +1,188 @@
+"""
+Call Batching - Many XML-RPC Calls per Round Trip
+=================================================
+Every ServerProxy call is a full HTTP request with its own XML encoding
+and decoding. CallBatcher queues calls instead and sends them together as
+one system.multicall request, which the server answers with all of the
+results at once.
+
+Flushing:
+---------
+A queued batch is sent as soon as one of these happens:
+- it holds max_batch calls (sent by the thread that queued the last one)
+- max_delay seconds passed since its first call (sent by a background thread)
+- flush() or close() is called, or the `with` block ends
+flush() and close() also wait for batches already on their way (sent by
+the background thread or by other threads), so once they return every
+call queued before them has its result.
+
+Results:
+--------
+Every queued call returns a concurrent.futures.Future. Its result() is the
+method's return value, or raises xmlrpc.client.Fault if that one call
+failed (the other calls of the batch are not affected). If the whole
+request fails (e.g. connection refused), every future of the batch raises
+that error.
+
+Usage:
+    with CallBatcher('http://127.0.0.1:9001', max_batch=100) as batcher:
+        futures = [batcher.add(i, i) for i in range(1000)]
+    results = [f.result() for f in futures]    # 1000 calls, 10 round trips
+"""
+
+import itertools
+import threading
+import time
+import xmlrpc.client
+from concurrent.futures import Future
+
+# Default batch size and time window
+DEFAULT_MAX_BATCH = 100
+DEFAULT_MAX_DELAY = 0.01
+
+
+class CallBatcher:
+    """
+    Queues XML-RPC calls and sends them in system.multicall batches.
+
+    Args:
+        url (str): Server endpoint, e.g. "http://127.0.0.1:9001"
+        max_batch (int): Calls per request; a full batch is sent immediately
+        max_delay (float): Seconds a queued call may wait for more calls
+            (None = only send full batches and on flush())
+
+    Raises:
+        ValueError: If max_batch is less than 1
+    """
+
+    def __init__(self, url, max_batch=DEFAULT_MAX_BATCH, max_delay=DEFAULT_MAX_DELAY):
+        if max_batch < 1:
+            raise ValueError("max_batch must be at least 1")
+        self._proxy = xmlrpc.client.ServerProxy(url, allow_none=True)
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._pending = []  # (method, params, future) not sent yet
+        self._deadline = None  # When the pending batch must go out
+        self._in_flight = set()  # Numbers of batches taken but not answered yet
+        self._batch_numbers = itertools.count()
+        self._lock = threading.Condition()
+        self._send_lock = threading.Lock()  # ServerProxy is not thread-safe
+        self._closed = False
+        self.calls = 0
+        self.round_trips = 0
+        self._timer = None
+        if max_delay is not None:
+            self._timer = threading.Thread(target=self._flush_on_timeout, name='rpc-batcher', daemon=True)
+            self._timer.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __getattr__(self, name):
+        """batcher.add(1, 2) is batcher.call('add', 1, 2)."""
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return lambda *params: self.call(name, *params)
+
+    def call(self, method, *params):
+        """
+        Queue one call.
+
+        Returns:
+            Future: Resolves to the call's result once its batch was sent
+
+        Raises:
+            RuntimeError: If the batcher was closed
+        """
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("CallBatcher is closed")
+            self._pending.append((method, params, future))
+            if len(self._pending) == 1 and self.max_delay is not None:
+                self._deadline = time.monotonic() + self.max_delay
+                self._lock.notify_all()
+            taken = self._take() if len(self._pending) >= self.max_batch else None
+        if taken:
+            self._send(*taken)
+        return future
+
+    def flush(self):
+        """
+        Send every queued call now and wait until their results are in.
+
+        Batches already being sent by other threads (or the background
+        thread) are waited for too.
+        """
+        with self._lock:
+            earlier = set(self._in_flight)
+            taken = self._take()
+        if taken:
+            self._send(*taken)
+        with self._lock:
+            self._lock.wait_for(lambda: not earlier & self._in_flight)
+
+    def close(self):
+        """Send what is still queued, wait for every answer and stop the background thread."""
+        with self._lock:
+            self._closed = True
+            self._lock.notify_all()
+        self.flush()
+        if self._timer is not None:
+            self._timer.join()
+
+    def _take(self):
+        """
+        Remove the pending batch and mark it in flight. Caller holds the lock.
+
+        Returns:
+            tuple or None: (batch number, batch), None if nothing is queued
+        """
+        batch, self._pending, self._deadline = self._pending, [], None
+        if not batch:
+            return None
+        number = next(self._batch_numbers)
+        self._in_flight.add(number)
+        return number, batch
+
+    def _flush_on_timeout(self):
+        """Background thread: send a batch whose first call has waited max_delay."""
+        while True:
+            with self._lock:
+                while not self._closed and (self._deadline is None or time.monotonic() < self._deadline):
+                    timeout = None if self._deadline is None else self._deadline - time.monotonic()
+                    self._lock.wait(timeout)
+                if self._closed:
+                    return
+                taken = self._take()
+            if taken:
+                self._send(*taken)
+
+    def _send(self, number, batch):
+        """Send one batch as a single system.multicall and resolve its futures."""
+        try:
+            self._send_batch(batch)
+        finally:
+            with self._lock:
+                self._in_flight.discard(number)
+                self._lock.notify_all()
+
+    def _send_batch(self, batch):
+        calls = [{'methodName': method, 'params': list(params)} for method, params, _ in batch]
+        try:
+            with self._send_lock:
+                self.round_trips += 1
+                self.calls += len(batch)
+                results = self._proxy.system.multicall(calls)
+        except Exception as e:
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, _, future), result in zip(batch, results):
+            if isinstance(result, dict):
+                future.set_exception(xmlrpc.client.Fault(result['faultCode'], result['faultString']))
+            else:
+                future.set_result(result[0])
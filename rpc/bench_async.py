@@ -0,0 +1,168 @@
+"""
+Async Client Benchmark - Thousands of Concurrent Calls from One Thread
+======================================================================
+Drives server_interactive.py's binary endpoint with AsyncRPCClient: all
+calls are started at once (asyncio.gather) and pipelined over a small
+connection pool. For comparison the same calls are made one at a time
+with the blocking clients: ServerProxy (XML-RPC, as client_interactive.py
+does) and BinaryRPCClient.
+
+On a single core over loopback a blocking round trip is mostly CPU time
+that client and server share, so async and blocking binary calls come out
+close; the pipelined client pulls ahead as soon as round trips involve
+waiting (a real network, a busy server, more cores).
+
+Also checks timeouts and cancellation under load: a share of the calls
+is cancelled right after being started, and one call is given a timeout
+too short to be met. The remaining calls must all return correct results.
+A last check runs against a server that never answers: a call queued
+behind a full in-flight limit must still time out on time.
+
+Usage:
+    python bench_async.py                          # 10,000 calls, pools of 1 and 4
+    python bench_async.py --calls 50000 --pools 1,2,4,8 --json
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import xmlrpc.client
+
+from async_client import AsyncRPCClient
+from bench_transport import BINARY_PORT, HOST, XML_PORT, start_server
+from binary_rpc import BinaryRPCClient
+
+ADDRESS = (HOST, BINARY_PORT)
+
+
+def run_xmlrpc(calls):
+    """One ServerProxy call at a time (XML over HTTP, a connection per call)."""
+    proxy = xmlrpc.client.ServerProxy(f"http://{HOST}:{XML_PORT}")
+    start = time.perf_counter()
+    results = [proxy.add(i, i) for i in range(calls)]
+    elapsed = time.perf_counter() - start
+    if results != [2 * i for i in range(calls)]:
+        raise SystemExit("[ERROR] Wrong results from ServerProxy")
+    return elapsed
+
+
+def run_blocking(calls):
+    """One call at a time on one connection."""
+    with BinaryRPCClient(ADDRESS) as client:
+        start = time.perf_counter()
+        results = [client.add(i, i) for i in range(calls)]
+        elapsed = time.perf_counter() - start
+    if results != [2 * i for i in range(calls)]:
+        raise SystemExit("[ERROR] Wrong results from the blocking client")
+    return elapsed
+
+
+async def run_async(calls, pool_size):
+    """Start every call at once and wait for all of them."""
+    async with AsyncRPCClient(ADDRESS, pool_size=pool_size) as client:
+        start = time.perf_counter()
+        results = await asyncio.gather(*(client.add(i, i) for i in range(calls)))
+        elapsed = time.perf_counter() - start
+    if results != [2 * i for i in range(calls)]:
+        raise SystemExit(f"[ERROR] Wrong results from the async client (pool of {pool_size})")
+    return elapsed
+
+
+async def check_cancellation(calls, pool_size):
+    """
+    Cancel every fourth call and time one out; the rest must still succeed.
+
+    Returns:
+        dict: completed, cancelled and timed_out counts
+    """
+    async with AsyncRPCClient(ADDRESS, pool_size=pool_size) as client:
+        tasks = [client.submit('add', i, 1) for i in range(calls)]
+        for task in tasks[::4]:
+            task.cancel()
+        try:
+            await client.echo('x' * 1_000_000, timeout=1e-6)
+            timed_out = 0
+        except asyncio.TimeoutError:
+            timed_out = 1
+        outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+        completed = sum(1 for i, value in enumerate(outcomes) if value == i + 1)
+        cancelled = sum(1 for value in outcomes if isinstance(value, asyncio.CancelledError))
+        # The connections are still usable afterwards
+        if await client.add(20, 22) != 42 or completed + cancelled != calls:
+            raise SystemExit("[ERROR] Calls failed after cancellations")
+    return {"completed": completed, "cancelled": cancelled, "timed_out": timed_out}
+
+
+async def check_deadline(timeout=0.2):
+    """
+    A call waiting for an in-flight slot must time out like any other.
+
+    Returns:
+        float: Seconds the queued call took to time out
+    """
+    held = []  # Keep the server's streams open; it just never answers
+    silent = await asyncio.start_server(lambda reader, writer: held.append(writer), HOST, 0)
+    address = silent.sockets[0].getsockname()[:2]
+    try:
+        async with AsyncRPCClient(address, max_in_flight=1, timeout=None) as client:
+            blocker = client.submit('add', 1, 1)  # Holds the only slot forever
+            await asyncio.sleep(0)
+            start = time.perf_counter()
+            try:
+                await client.add(2, 2, timeout=timeout)
+                raise SystemExit("[ERROR] A call to a silent server returned")
+            except asyncio.TimeoutError:
+                elapsed = time.perf_counter() - start
+            blocker.cancel()
+    finally:
+        silent.close()
+    if elapsed > timeout * 5:
+        raise SystemExit(f"[ERROR] Queued call timed out after {elapsed:.2f}s, not {timeout}s")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput of the asyncio RPC client")
+    parser.add_argument('--calls', type=int, default=10000, help="calls per run (default: 10000)")
+    parser.add_argument('--pools', default='1,4', help="comma-separated pool sizes (default: 1,4)")
+    parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = parser.parse_args()
+
+    server = start_server()
+    try:
+        results = [{"client": "xml-rpc", "pool_size": 1, "seconds": run_xmlrpc(args.calls)},
+                   {"client": "blocking", "pool_size": 1, "seconds": run_blocking(args.calls)}]
+        for pool_size in (int(n) for n in args.pools.split(',')):
+            results.append({"client": "async", "pool_size": pool_size,
+                            "seconds": asyncio.run(run_async(args.calls, pool_size))})
+        cancellation = asyncio.run(check_cancellation(args.calls, max(r["pool_size"] for r in results)))
+        cancellation["queued_timeout_seconds"] = asyncio.run(check_deadline())
+    finally:
+        server.terminate()
+        server.wait()
+    for r in results:
+        r["calls_per_sec"] = args.calls / r["seconds"]
+
+    if args.json:
+        print(json.dumps({"calls": args.calls, "results": results, "cancellation": cancellation}, indent=2))
+        return
+    print("=" * 70)
+    print(f"ASYNC CLIENT BENCHMARK - {args.calls:,} add() calls")
+    print("=" * 70)
+    print(f"{'Client':<10} {'pool':>6} {'seconds':>10} {'calls/s':>12} {'speed-up':>10}")
+    print("-" * 70)
+    base = results[0]["seconds"]
+    for r in results:
+        print(f"{r['client']:<10} {r['pool_size']:>6} {r['seconds']:>10.3f} "
+              f"{r['calls_per_sec']:>12,.0f} {base / r['seconds']:>9.1f}x")
+    print("-" * 70)
+    print(f"Cancellation check: {cancellation['completed']:,} completed, {cancellation['cancelled']:,} cancelled, "
+          f"{cancellation['timed_out']} timed out")
+    print(f"Deadline check: a call queued for a slot timed out after "
+          f"{cancellation['queued_timeout_seconds']:.2f}s")
+    print("=" * 70)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Batching Benchmark - One Call per Request vs system.multicall
+=============================================================
+Issues the same bulk workload (random add/multiply calls) against a fresh
+server_interactive.py, first one ServerProxy call at a time and then
+through CallBatcher with growing batch sizes, and reports the round trips
+and time each needed.
+
+Also checks that flush() waits for a batch the background thread is
+still sending: a large echo() is left for the timer to send, and the
+flush() that follows must not return before its result is in.
+
+Usage:
+    python bench_batching.py                       # 2,000 calls, batches of 10/100/1000
+    python bench_batching.py --calls 10000 --batch-sizes 100,1000 --json
+"""
+
+import argparse
+import json
+import random
+import time
+import xmlrpc.client
+
+from batching import CallBatcher
+from bench_concurrency import HOST, start_server
+
+# Port of the server under test
+PORT = 9120
+
+
+def workload(calls, seed=7):
+    """Return `calls` (method, a, b) tuples, the same for every run."""
+    rng = random.Random(seed)
+    return [(rng.choice(('add', 'multiply')), rng.randint(0, 1000), rng.randint(0, 1000))
+            for _ in range(calls)]
+
+
+def expected(calls):
+    return [a + b if method == 'add' else a * b for method, a, b in calls]
+
+
+def run_single(url, calls):
+    """One request per call, like client_interactive.py's menu options."""
+    proxy = xmlrpc.client.ServerProxy(url)
+    start = time.perf_counter()
+    results = [getattr(proxy, method)(a, b) for method, a, b in calls]
+    return results, len(calls), time.perf_counter() - start
+
+
+def run_batched(url, calls, batch_size):
+    """All calls through one CallBatcher."""
+    start = time.perf_counter()
+    with CallBatcher(url, max_batch=batch_size) as batcher:
+        futures = [batcher.call(method, a, b) for method, a, b in calls]
+    results = [f.result() for f in futures]
+    return results, batcher.round_trips, time.perf_counter() - start
+
+
+def check_flush(url, payload=4_000_000, max_delay=0.01):
+    """
+    Flush while the timer thread is sending a batch; its future must be done after.
+
+    Returns:
+        dict: How many times flush() returned before the batch had its answer
+    """
+    early = 0
+    for _ in range(3):
+        with CallBatcher(url, max_batch=1000, max_delay=max_delay) as batcher:
+            future = batcher.echo('x' * payload)
+            time.sleep(max_delay * 3)  # Let the timer take the batch and start sending
+            batcher.flush()
+            early += not future.done()
+        if future.result() != 'Server echoes: ' + 'x' * payload:
+            raise SystemExit("[ERROR] Wrong echo result in the flush check")
+    return {"flushes": 3, "returned_early": early}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare unbatched and batched XML-RPC calls")
+    parser.add_argument('--calls', type=int, default=2000, help="calls per run (default: 2000)")
+    parser.add_argument('--batch-sizes', default='10,100,1000',
+                        help="comma-separated batch sizes (default: 10,100,1000)")
+    parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = parser.parse_args()
+
+    calls = workload(args.calls)
+    want = expected(calls)
+    url = f"http://{HOST}:{PORT}"
+    server = start_server('threads', PORT, workers=8, queue_depth=64)
+    results = []
+    try:
+        runs = [('one per request', lambda: run_single(url, calls))]
+        runs += [(f'batches of {size}', lambda size=size: run_batched(url, calls, size))
+                 for size in (int(n) for n in args.batch_sizes.split(','))]
+        for label, run in runs:
+            values, round_trips, elapsed = run()
+            if values != want:
+                raise SystemExit(f"[ERROR] Wrong results for {label}")
+            results.append({"mode": label, "calls": len(calls), "round_trips": round_trips,
+                            "seconds": elapsed, "calls_per_sec": len(calls) / elapsed})
+        flush = check_flush(url)
+        if flush["returned_early"]:
+            raise SystemExit(f"[ERROR] flush() returned before an in-flight batch was answered "
+                             f"({flush['returned_early']} of {flush['flushes']} times)")
+    finally:
+        server.terminate()
+        server.wait()
+
+    if args.json:
+        print(json.dumps({"results": results, "flush_check": flush}, indent=2))
+        return
+    print("=" * 70)
+    print(f"BATCHING BENCHMARK - {args.calls:,} add/multiply calls")
+    print("=" * 70)
+    print(f"{'Mode':<18} {'round trips':>12} {'seconds':>10} {'calls/s':>12} {'speed-up':>10}")
+    print("-" * 70)
+    base = results[0]["seconds"]
+    for r in results:
+        print(f"{r['mode']:<18} {r['round_trips']:>12,} {r['seconds']:>10.3f} "
+              f"{r['calls_per_sec']:>12,.0f} {base / r['seconds']:>9.1f}x")
+    print("-" * 70)
+    print(f"Flush check: flush() waited for the in-flight batch {flush['flushes']} of {flush['flushes']} times")
+    print("=" * 70)
+
+
+if __name__ == '__main__':
+    main()
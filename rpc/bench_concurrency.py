@@ -0,0 +1,191 @@
+"""
+Concurrency Benchmark - XML-RPC Throughput vs Concurrent Clients
+================================================================
+Starts server_interactive.py in each serving mode and measures how many
+calls per second it answers as the number of concurrent clients grows.
+
+How it Works:
+- Every mode gets a fresh server on its own port, started with --quiet so
+  console logging doesn't dominate the measurement
+- Each client is an asyncio task sending add(a, b) calls back to back
+  (one connection per call, as the XML-RPC server speaks HTTP/1.0)
+- Optionally some "slow clients" take part: each sends its request body
+  in small pieces over --slow-seconds, like a caller on a bad network.
+  A serial server can do nothing else meanwhile; a pooled server keeps
+  answering the others from its remaining threads
+
+Results per mode and client count: calls/s, p50/p99 latency in ms,
+errors (including 503 answers when the queue is full).
+
+Usage:
+    python bench_concurrency.py                          # serial vs threads, 1-64 clients
+    python bench_concurrency.py --modes serial,threads,processes --slow-clients 2
+    python bench_concurrency.py --concurrency 1,8,32 --duration 5 --json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import xmlrpc.client
+
+HOST = '127.0.0.1'
+
+# First port used for the servers under test (one per mode)
+BASE_PORT = 9101
+
+# Pieces a slow client splits its request body into
+SLOW_CHUNKS = 10
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def start_server(mode, port, workers, queue_depth, timeout=15.0):
+    """Start server_interactive.py in `mode` and wait until it accepts connections."""
+    server = subprocess.Popen([sys.executable, os.path.join(HERE, 'server_interactive.py'),
+                               '--port', str(port), '--mode', mode, '--workers', str(workers),
+                               '--queue-depth', str(queue_depth), '--binary-port', '0', '--quiet'],
+                              cwd=HERE, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                              stderr=subprocess.DEVNULL)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server in {mode} mode exited with code {server.returncode}")
+        try:
+            socket.create_connection((HOST, port), timeout=0.5).close()
+            return server
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError(f"Server in {mode} mode did not start")
+
+
+def build_request(port, method, params):
+    """Return the complete HTTP request (head, body) of one XML-RPC call."""
+    body = xmlrpc.client.dumps(params, method).encode('utf-8')
+    head = (f"POST /RPC2 HTTP/1.0\r\nHost: {HOST}:{port}\r\n"
+            f"Content-Type: text/xml\r\nContent-Length: {len(body)}\r\n\r\n").encode('latin-1')
+    return head, body
+
+
+async def call(port, head, body, slow_seconds=0.0):
+    """Send one call on a new connection; raises on any failure."""
+    reader, writer = await asyncio.open_connection(HOST, port)
+    try:
+        writer.write(head)
+        if slow_seconds:
+            step = max(1, len(body) // SLOW_CHUNKS)
+            for i in range(0, len(body), step):
+                writer.write(body[i:i + step])
+                await writer.drain()
+                await asyncio.sleep(slow_seconds / SLOW_CHUNKS)
+        else:
+            writer.write(body)
+        await writer.drain()
+        response = await reader.read()  # HTTP/1.0: the server closes when done
+    finally:
+        writer.close()
+    status = int(response.split(b' ', 2)[1]) if response.startswith(b'HTTP/') else 0
+    if status != 200 or b'<fault>' in response:
+        raise RuntimeError(f"call failed with status {status}")
+
+
+async def client(port, deadline, latencies, errors, slow_seconds=0.0):
+    """Send add() calls back to back until the deadline, recording each latency."""
+    head, body = build_request(port, 'add', (17, 25))
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            await call(port, head, body, slow_seconds)
+            if not slow_seconds:
+                latencies.append(time.perf_counter() - start)
+        except (OSError, RuntimeError, ValueError, IndexError):
+            errors.append(1)
+            await asyncio.sleep(0.01)
+
+
+def percentile(sorted_values, fraction):
+    """Return the value at `fraction` (0-1) of an already sorted list."""
+    if not sorted_values:
+        return float('nan')
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+async def run_load(port, clients, duration, slow_clients, slow_seconds):
+    """Drive the server with `clients` fast clients (plus slow ones) for `duration` seconds."""
+    latencies, errors = [], []
+    start = time.perf_counter()
+    deadline = start + duration
+    tasks = [client(port, deadline, latencies, errors) for _ in range(clients)]
+    tasks += [client(port, deadline, [], [], slow_seconds) for _ in range(slow_clients)]
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "calls": len(latencies),
+        "errors": len(errors),
+        "calls_per_sec": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000
+    }
+
+
+def print_table(results, args):
+    """Print calls per second per mode and client count as a human-readable table."""
+    print("=" * 70)
+    slow = f", {args.slow_clients} slow client(s)" if args.slow_clients else ""
+    print(f"XML-RPC CONCURRENCY BENCHMARK - add(a, b){slow}, {os.cpu_count()} CPU core(s)")
+    print("=" * 70)
+    print(f"{'Mode':<10} {'Clients':>8} {'calls/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'errors':>8}")
+    print("-" * 70)
+    for r in results:
+        print(f"{r['mode']:<10} {r['clients']:>8} {r['calls_per_sec']:>10,.0f} "
+              f"{r['p50_ms']:>9.2f} {r['p99_ms']:>9.2f} {r['errors']:>8}")
+    print("=" * 70)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure XML-RPC throughput against concurrent clients")
+    parser.add_argument('--modes', default='serial,threads', help="comma-separated serving modes "
+                        "(serial, threads, processes; default: serial,threads)")
+    parser.add_argument('--concurrency', default='1,4,16,64',
+                        help="comma-separated client counts (default: 1,4,16,64)")
+    parser.add_argument('--duration', type=float, default=3.0, help="seconds per run (default: 3)")
+    parser.add_argument('--workers', type=int, default=16, help="server threads (default: 16)")
+    parser.add_argument('--queue-depth', type=int, default=128, help="server queue depth (default: 128)")
+    parser.add_argument('--slow-clients', type=int, default=0,
+                        help="clients that trickle their requests in (default: 0)")
+    parser.add_argument('--slow-seconds', type=float, default=0.5,
+                        help="seconds a slow client takes to send one request (default: 0.5)")
+    parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = parser.parse_args()
+    levels = [int(n) for n in args.concurrency.split(',')]
+
+    results = []
+    for index, mode in enumerate(args.modes.split(',')):
+        port = BASE_PORT + index
+        server = start_server(mode, port, args.workers, args.queue_depth)
+        try:
+            for clients in levels:
+                result = asyncio.run(run_load(port, clients, args.duration, args.slow_clients, args.slow_seconds))
+                results.append({"mode": mode, "clients": clients, **result})
+                if not args.json:
+                    print(f"[INFO] {mode}, {clients} client(s): {result['calls_per_sec']:,.0f} calls/s",
+                          flush=True)
+        finally:
+            server.terminate()
+            server.wait()
+
+    if args.json:
+        print(json.dumps({"cpu_count": os.cpu_count(), "slow_clients": args.slow_clients,
+                          "results": results}, indent=2))
+    else:
+        print_table(results, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+"""
+Transport Benchmark - XML-RPC vs the Binary Protocol
+====================================================
+Starts server_interactive.py (which serves both protocols) and makes the
+same calls over each, one at a time, reporting the latency per call and
+the bytes each call puts on the wire in both directions.
+
+Transports:
+- xml-rpc:   HTTP/1.0 + XML, a new TCP connection per call (as ServerProxy
+             does against this server); bytes include the HTTP headers
+- binary:    binary_rpc.py frames on one persistent connection
+- pipelined: binary, but all calls are sent before the answers are read
+             (latency is the total time divided by the number of calls)
+
+Calls: add(17, 25) and echo() with a --payload character message.
+
+Before measuring, the binary endpoint is checked to answer a request
+nested too deeply to decode with a fault (and keep the connection), and
+to close connections beyond its max_connections.
+
+Usage:
+    python bench_transport.py                      # 2,000 calls per case
+    python bench_transport.py --calls 10000 --payload 4096 --json
+"""
+
+import argparse
+import json
+import os
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import time
+import xmlrpc.client
+
+from bench_concurrency import HOST, build_request, percentile
+from binary_rpc import BinaryRPCClient, BinaryRPCServer, ProtocolError, encode_request
+
+# Ports of the server under test
+XML_PORT = 9130
+BINARY_PORT = 9131
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def start_server(timeout=15.0):
+    """Start server_interactive.py with both endpoints and wait until they accept connections."""
+    server = subprocess.Popen([sys.executable, os.path.join(HERE, 'server_interactive.py'),
+                               '--port', str(XML_PORT), '--binary-port', str(BINARY_PORT), '--quiet'],
+                              cwd=HERE, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                              stderr=subprocess.DEVNULL)
+    deadline = time.time() + timeout
+    for port in (XML_PORT, BINARY_PORT):
+        while True:
+            if server.poll() is not None or time.time() > deadline:
+                server.kill()
+                raise RuntimeError("server_interactive.py did not start")
+            try:
+                socket.create_connection((HOST, port), timeout=0.5).close()
+                break
+            except OSError:
+                time.sleep(0.1)
+    return server
+
+
+def xml_call(head, body):
+    """One XML-RPC call on a new connection; return the response size in bytes."""
+    with socket.create_connection((HOST, XML_PORT)) as sock:
+        sock.sendall(head + body)
+        received = 0
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                return received
+            received += len(chunk)
+
+
+def run_xml(method, params, calls):
+    head, body = build_request(XML_PORT, method, params)
+    latencies, received = [], 0
+    for _ in range(calls):
+        start = time.perf_counter()
+        received += xml_call(head, body)
+        latencies.append(time.perf_counter() - start)
+    return latencies, len(head) + len(body), received / calls
+
+
+def run_binary(method, params, calls):
+    latencies = []
+    with BinaryRPCClient((HOST, BINARY_PORT)) as client:
+        client.call(method, *params)  # Connect outside the measurement
+        client.bytes_sent = client.bytes_received = 0
+        for _ in range(calls):
+            start = time.perf_counter()
+            client.call(method, *params)
+            latencies.append(time.perf_counter() - start)
+        return latencies, client.bytes_sent / calls, client.bytes_received / calls
+
+
+def run_pipelined(method, params, calls):
+    with BinaryRPCClient((HOST, BINARY_PORT)) as client:
+        client.call(method, *params)
+        client.bytes_sent = client.bytes_received = 0
+        start = time.perf_counter()
+        client.pipeline([(method, params)] * calls)
+        per_call = (time.perf_counter() - start) / calls
+        return [per_call], client.bytes_sent / calls, client.bytes_received / calls
+
+
+def check_protocol_limits():
+    """A too-deep request gets a fault on a live connection; extra connections are closed."""
+    with BinaryRPCClient((HOST, BINARY_PORT)) as client:
+        client.call('add', 1, 2)
+        body = struct.pack('!IB', 1, 4) + b'echo' + b'l\x00\x00\x00\x01' * 100_000 + b'N'
+        client._sock.sendall(struct.pack('!I', len(body)) + body)
+        try:
+            answer = client._receive([1])[0]
+        except (ProtocolError, OSError) as e:
+            answer = e
+        if not isinstance(answer, xmlrpc.client.Fault) or client.call('add', 2, 3) != 5:
+            raise SystemExit(f"[ERROR] A deeply nested request got {answer!r}, expected a fault")
+
+    server = BinaryRPCServer((HOST, 0), lambda method, params: sum(params), max_connections=1)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        with BinaryRPCClient(server.server_address) as first, BinaryRPCClient(server.server_address) as second:
+            first.call('add', 1, 2)
+            try:
+                second.call('add', 1, 2)
+                raise SystemExit("[ERROR] The binary server served more connections than max_connections")
+            except (ProtocolError, OSError):
+                pass
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-call latency and wire size of XML-RPC vs binary RPC")
+    parser.add_argument('--calls', type=int, default=2000, help="calls per case (default: 2000)")
+    parser.add_argument('--payload', type=int, default=64, help="echo message length (default: 64)")
+    parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = parser.parse_args()
+
+    cases = [('add', (17, 25)), ('echo', ('x' * args.payload,))]
+    transports = [('xml-rpc', run_xml), ('binary', run_binary), ('pipelined', run_pipelined)]
+    results = []
+    server = start_server()
+    try:
+        check_protocol_limits()
+        for method, params in cases:
+            for transport, run in transports:
+                latencies, sent, received = run(method, params, args.calls)
+                latencies.sort()
+                results.append({"call": method, "transport": transport, "calls": args.calls,
+                                "mean_us": sum(latencies) / len(latencies) * 1e6,
+                                "p50_us": percentile(latencies, 0.50) * 1e6,
+                                "p99_us": percentile(latencies, 0.99) * 1e6,
+                                "request_bytes": sent, "response_bytes": received})
+    finally:
+        server.terminate()
+        server.wait()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print("=" * 70)
+    print(f"TRANSPORT BENCHMARK - {args.calls:,} calls per case, echo payload {args.payload} chars")
+    print("=" * 70)
+    print(f"{'Call':<6} {'Transport':<10} {'mean us':>9} {'p50 us':>9} {'p99 us':>9} "
+          f"{'req bytes':>10} {'resp bytes':>11}")
+    print("-" * 70)
+    for r in results:
+        print(f"{r['call']:<6} {r['transport']:<10} {r['mean_us']:>9,.1f} {r['p50_us']:>9,.1f} "
+              f"{r['p99_us']:>9,.1f} {r['request_bytes']:>10,.0f} {r['response_bytes']:>11,.0f}")
+    print("=" * 70)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+"""
+Vector Benchmark - One RPC per Pair vs Batch Arithmetic
+=======================================================
+Adds two series of --pairs numbers on the server in four ways and reports
+the time and the request + response body bytes of each:
+- per pair:          one add(a, b) XML-RPC call per pair (timed on a sample
+                     of --sample pairs and scaled up)
+- xml list:          one add_many(a, b) call with XML-RPC arrays
+- xml blob:          one add_many(a, b) call with pack_floats() blobs
+                     (xmlrpc.client.Binary, base64 in the XML)
+- binary blob:       the same blobs over the binary protocol (raw bytes)
+Every result is checked against a local computation.
+
+Before timing anything, a set of edge cases (ints, mixed int/float, ints
+beyond int64, -0.0, inf/nan, empty and invalid operands) is run through
+every available backend (see vectors.BACKENDS) and each answer compared,
+value and type, with plain Python arithmetic.
+
+Usage:
+    python bench_vectors.py                        # 100,000 pairs
+    python bench_vectors.py --pairs 1000000 --json
+"""
+
+import argparse
+import json
+import math
+import operator
+import random
+import time
+import xmlrpc.client
+
+from bench_transport import BINARY_PORT, HOST, XML_PORT, start_server
+from binary_rpc import BinaryRPCClient
+from vectors import BACKEND, BACKENDS, elementwise, pack_floats, unpack_floats
+
+# (a, b) operand pairs every backend must handle exactly like Python
+EDGE_CASES = [
+    ([1.5, -2.25, 1e308, -0.0], [2.0, 4.0, 10.0, 0.0]),
+    ([1, 2, -3], [4, 5, 6]),
+    ([1, 2.5, 3], [0.5, 2, 7]),
+    ([2 ** 62, 2 ** 63, -2 ** 70], [2 ** 62, 1, 3]),
+    ([math.inf, math.nan, -math.inf], [1.0, 2.0, math.inf]),
+    ([], []),
+]
+# Operands every backend must reject with a Fault
+INVALID_CASES = [
+    (['a'], ['b']),
+    ([True, 1.0], [1.0, False]),
+    ([1.0, None], [1.0, 2.0]),
+    ([1.0, 2.0], [1.0]),
+    ([1.0], pack_floats([1.0])),
+]
+
+
+def describe(values):
+    """Values with their types, comparable even when they hold NaN."""
+    return [(type(v).__name__, repr(v)) for v in values]
+
+
+def check_backends():
+    """
+    Run EDGE_CASES and INVALID_CASES through every backend.
+
+    Returns:
+        list: Descriptions of the answers that differ from Python's
+    """
+    failures = []
+    for operation, function in (('add', operator.add), ('multiply', operator.mul)):
+        for a, b in EDGE_CASES:
+            expected = describe(map(function, a, b))
+            blob_expected = describe(unpack_floats(pack_floats(map(function, map(float, a), map(float, b)))))
+            for backend in BACKENDS:
+                got = describe(elementwise(operation, a, b, backend=backend))
+                if got != expected:
+                    failures.append(f"{backend} {operation}{(a, b)}: {got} != {expected}")
+                blob = elementwise(operation, pack_floats(a), pack_floats(b), backend=backend)
+                if describe(unpack_floats(blob)) != blob_expected:
+                    failures.append(f"{backend} {operation} on blobs of {(a, b)} differs")
+        for a, b in INVALID_CASES:
+            for backend in BACKENDS:
+                try:
+                    elementwise(operation, a, b, backend=backend)
+                    failures.append(f"{backend} {operation}{(a, b)} was accepted")
+                except xmlrpc.client.Fault as e:
+                    if e.faultCode != xmlrpc.client.INVALID_METHOD_PARAMS:
+                        failures.append(f"{backend} {operation}{(a, b)}: fault code {e.faultCode}")
+    return failures
+
+
+def xml_size(params, method, result):
+    """Body bytes of an XML-RPC request and its response."""
+    return (len(xmlrpc.client.dumps(params, method).encode('utf-8'))
+            + len(xmlrpc.client.dumps((result,), methodresponse=True).encode('utf-8')))
+
+
+def run_per_pair(proxy, a, b, sample):
+    """Time `sample` single add() calls and scale to every pair."""
+    start = time.perf_counter()
+    results = [proxy.add(x, y) for x, y in zip(a[:sample], b[:sample])]
+    elapsed = (time.perf_counter() - start) * len(a) / sample
+    size = sum(xml_size((x, y), 'add', r) for x, y, r in zip(a[:sample], b[:sample], results))
+    return results, elapsed, size * len(a) / sample
+
+
+def run_xml_list(proxy, a, b):
+    start = time.perf_counter()
+    results = proxy.add_many(a, b)
+    return results, time.perf_counter() - start, xml_size((a, b), 'add_many', results)
+
+
+def run_xml_blob(proxy, a, b):
+    start = time.perf_counter()
+    blob_a, blob_b = pack_floats(a), pack_floats(b)
+    result = proxy.add_many(blob_a, blob_b)
+    results = unpack_floats(result).tolist()
+    return results, time.perf_counter() - start, xml_size((blob_a, blob_b), 'add_many', result)
+
+
+def run_binary_blob(client, a, b):
+    client.bytes_sent = client.bytes_received = 0
+    start = time.perf_counter()
+    result = client.add_many(pack_floats(a, binary=False), pack_floats(b, binary=False))
+    results = unpack_floats(result).tolist()
+    return results, time.perf_counter() - start, client.bytes_sent + client.bytes_received
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-pair add() calls vs add_many() on whole arrays")
+    parser.add_argument('--pairs', type=int, default=100000, help="operand pairs (default: 100000)")
+    parser.add_argument('--sample', type=int, default=1000,
+                        help="pairs actually sent one by one in the per-pair case (default: 1000)")
+    parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = parser.parse_args()
+
+    failures = check_backends()
+    if failures:
+        for failure in failures:
+            print(f"[ERROR] {failure}")
+        raise SystemExit(1)
+    if not args.json:
+        print(f"[INFO] Backend(s) {', '.join(BACKENDS)} match Python arithmetic on {len(EDGE_CASES)} cases")
+
+    rng = random.Random(11)
+    a = [rng.uniform(-1000, 1000) for _ in range(args.pairs)]
+    b = [rng.uniform(-1000, 1000) for _ in range(args.pairs)]
+    expected = [x + y for x, y in zip(a, b)]
+    sample = min(args.sample, args.pairs)
+
+    results = []
+    server = start_server()
+    try:
+        proxy = xmlrpc.client.ServerProxy(f"http://{HOST}:{XML_PORT}")
+        with BinaryRPCClient((HOST, BINARY_PORT), timeout=60) as client:
+            runs = [('per pair', lambda: run_per_pair(proxy, a, b, sample), sample),
+                    ('xml list', lambda: run_xml_list(proxy, a, b), args.pairs),
+                    ('xml blob', lambda: run_xml_blob(proxy, a, b), args.pairs),
+                    ('binary blob', lambda: run_binary_blob(client, a, b), args.pairs)]
+            for label, run, checked in runs:
+                values, seconds, size = run()
+                if values != expected[:checked]:
+                    raise SystemExit(f"[ERROR] Wrong results for {label}")
+                results.append({"mode": label, "seconds": seconds, "bytes": size})
+    finally:
+        server.terminate()
+        server.wait()
+
+    if args.json:
+        print(json.dumps({"pairs": args.pairs, "backend": BACKEND, "results": results}, indent=2))
+        return
+    print("=" * 70)
+    print(f"VECTOR BENCHMARK - {args.pairs:,} pairs, server backend: {BACKEND}")
+    print("=" * 70)
+    print(f"{'Mode':<14} {'seconds':>10} {'speed-up':>10} {'bytes':>16} {'bytes/pair':>12}")
+    print("-" * 70)
+    base = results[0]["seconds"]
+    for r in results:
+        estimated = " (est.)" if r["mode"] == 'per pair' and sample < args.pairs else ""
+        print(f"{r['mode']:<14} {r['seconds']:>10.3f} {base / r['seconds']:>9.0f}x "
+              f"{r['bytes']:>16,.0f} {r['bytes'] / args.pairs:>12.1f}{estimated}")
+    print("=" * 70)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,483 @@
+"""
+Binary RPC - Compact Length-Prefixed Protocol over Persistent TCP
+=================================================================
+For small calls such as add(a, b), most of an XML-RPC call is spent on
+XML and HTTP: building and parsing the markup, plus a new TCP connection
+per call (the XML-RPC server speaks HTTP/1.0). This module serves the
+same methods over a much lighter protocol:
+- one TCP connection is kept open and reused for every call
+- messages are binary frames encoded with struct (stdlib only)
+- every request carries an ID, so a client may send many requests
+  before reading the answers (pipelining)
+
+server_interactive.py runs a BinaryRPCServer on BINARY_PORT next to the
+XML-RPC endpoint, dispatching into the same methods, counters and log.
+See bench_transport.py for latency and bytes on the wire of both.
+
+Framing:
+--------
+Every message is a 4-byte big-endian length followed by that many bytes:
+    request:  request ID (uint32) | method name length (uint8) | method name | params
+    response: request ID (uint32) | status (uint8: 0 = ok, 1 = fault) | value
+`params` is an encoded list. The value is the result, or for a fault the
+list [fault code, fault string], raised as xmlrpc.client.Fault. A request
+frame whose content can't be decoded (e.g. values nested too deeply) is
+answered with an INVALID_XMLRPC fault; a frame that can't be read at all
+closes the connection.
+
+Connections:
+------------
+Every open connection holds a server thread, so at most `max_connections`
+are served at once; a connection beyond that is closed straight away
+(the client sees "server closed the connection") and counted in
+BinaryRPCServer.rejected.
+
+Values:
+-------
+A one-byte tag followed by the data:
+    N None   T True   F False
+    i int64            L larger int (length-prefixed decimal text)
+    d float64          s str (uint32 length + UTF-8)
+    b bytes or xmlrpc.client.Binary (uint32 length + data; decoded as bytes)
+    l list / tuple (uint32 count + values)    m dict (uint32 count + key, value pairs)
+
+Usage:
+    client = BinaryRPCClient(('127.0.0.1', 9002))
+    client.add(2, 3)                                  # -> 5
+    client.pipeline([('add', (1, 2)), ('echo', ('hi',))])
+"""
+
+import socket
+import socketserver
+import struct
+import threading
+import xmlrpc.client
+
+# Default port of the binary endpoint (the XML-RPC one is 9001)
+BINARY_PORT = 9002
+
+# Largest frame accepted from the other side
+MAX_FRAME = 16 * 1024 * 1024
+
+# Connections a BinaryRPCServer serves at once, unless told otherwise
+DEFAULT_MAX_CONNECTIONS = 64
+
+# Requests a client sends before it reads their answers. Bounded so that
+# neither side ever blocks writing while the other blocks writing too.
+PIPELINE_WINDOW = 256
+PIPELINE_BYTES = 64 * 1024
+
+# Response status codes
+STATUS_OK = 0
+STATUS_FAULT = 1
+
+_LENGTH = struct.Struct('!I')
+_REQUEST_HEAD = struct.Struct('!IB')  # request ID, method name length
+_RESPONSE_HEAD = struct.Struct('!IB')  # request ID, status
+_INT = struct.Struct('!q')
+_FLOAT = struct.Struct('!d')
+_INT_MIN, _INT_MAX = -2 ** 63, 2 ** 63 - 1
+
+
+class ProtocolError(ValueError):
+    """A frame or value that doesn't follow the protocol."""
+
+
+# ----------------------------------------------------------------------
+# Values
+# ----------------------------------------------------------------------
+
+def encode_value(value, out):
+    """
+    Append the encoding of `value` to the bytearray `out`.
+
+    Raises:
+        TypeError: If the value (or something inside it) can't be encoded
+    """
+    if value is None:
+        out += b'N'
+    elif value is True:
+        out += b'T'
+    elif value is False:
+        out += b'F'
+    elif isinstance(value, int):
+        if _INT_MIN <= value <= _INT_MAX:
+            out += b'i' + _INT.pack(value)
+        else:
+            text = str(value).encode('ascii')
+            out += b'L' + _LENGTH.pack(len(text)) + text
+    elif isinstance(value, float):
+        out += b'd' + _FLOAT.pack(value)
+    elif isinstance(value, str):
+        data = value.encode('utf-8')
+        out += b's' + _LENGTH.pack(len(data)) + data
+    elif isinstance(value, (bytes, bytearray, memoryview, xmlrpc.client.Binary)):
+        data = value.data if isinstance(value, xmlrpc.client.Binary) else bytes(value)
+        out += b'b' + _LENGTH.pack(len(data)) + data
+    elif isinstance(value, (list, tuple)):
+        out += b'l' + _LENGTH.pack(len(value))
+        for item in value:
+            encode_value(item, out)
+    elif isinstance(value, dict):
+        out += b'm' + _LENGTH.pack(len(value))
+        for key, item in value.items():
+            encode_value(key, out)
+            encode_value(item, out)
+    else:
+        raise TypeError(f"cannot encode {type(value).__name__}")
+
+
+def decode_value(data, offset=0):
+    """
+    Decode one value from `data` starting at `offset`.
+
+    Returns:
+        tuple: (value, offset just after it)
+
+    Raises:
+        ProtocolError: If the data is truncated, has an unknown tag or is
+            nested deeper than the interpreter's recursion limit allows
+    """
+    try:
+        tag = data[offset]
+        offset += 1
+        if tag == 0x4E:  # N
+            return None, offset
+        if tag == 0x54:  # T
+            return True, offset
+        if tag == 0x46:  # F
+            return False, offset
+        if tag == 0x69:  # i
+            return _INT.unpack_from(data, offset)[0], offset + 8
+        if tag == 0x64:  # d
+            return _FLOAT.unpack_from(data, offset)[0], offset + 8
+        if tag in (0x73, 0x62, 0x4C):  # s, b, L
+            size = _LENGTH.unpack_from(data, offset)[0]
+            start, offset = offset + 4, offset + 4 + size
+            if offset > len(data):
+                raise ProtocolError("truncated value")
+            raw = bytes(data[start:offset])
+            if tag == 0x73:
+                return raw.decode('utf-8'), offset
+            if tag == 0x62:
+                return raw, offset
+            return int(raw), offset
+        if tag == 0x6C:  # l
+            count = _LENGTH.unpack_from(data, offset)[0]
+            offset += 4
+            items = []
+            for _ in range(count):
+                item, offset = decode_value(data, offset)
+                items.append(item)
+            return items, offset
+        if tag == 0x6D:  # m
+            count = _LENGTH.unpack_from(data, offset)[0]
+            offset += 4
+            mapping = {}
+            for _ in range(count):
+                key, offset = decode_value(data, offset)
+                mapping[key], offset = decode_value(data, offset)
+            return mapping, offset
+    except ProtocolError:
+        raise  # From a nested value, already described
+    except RecursionError:
+        raise ProtocolError("value nested too deeply") from None
+    except (IndexError, struct.error, UnicodeDecodeError, ValueError, TypeError) as e:
+        raise ProtocolError(f"malformed value: {e}") from None
+    raise ProtocolError(f"unknown value tag {tag:#04x}")
+
+
+# ----------------------------------------------------------------------
+# Frames
+# ----------------------------------------------------------------------
+
+def encode_request(request_id, method, params):
+    """Return the complete frame (length prefix included) of one call."""
+    name = method.encode('utf-8')
+    if len(name) > 255:
+        raise ValueError("method name too long")
+    body = bytearray(_REQUEST_HEAD.pack(request_id, len(name)))
+    body += name
+    encode_value(list(params), body)
+    return _LENGTH.pack(len(body)) + body
+
+
+def decode_request(body):
+    """
+    Decode a request frame body.
+
+    Returns:
+        tuple: (request ID, method name, params list)
+    """
+    try:
+        request_id, name_length = _REQUEST_HEAD.unpack_from(body)
+        start = _REQUEST_HEAD.size
+        method = bytes(body[start:start + name_length]).decode('utf-8')
+    except (struct.error, UnicodeDecodeError) as e:
+        raise ProtocolError(f"malformed request: {e}") from None
+    params, end = decode_value(body, start + name_length)
+    if not isinstance(params, list) or end != len(body):
+        raise ProtocolError("malformed request parameters")
+    return request_id, method, params
+
+
+def encode_response(request_id, status, value):
+    """Return the complete frame (length prefix included) of one answer."""
+    body = bytearray(_RESPONSE_HEAD.pack(request_id, status))
+    encode_value(value, body)
+    return _LENGTH.pack(len(body)) + body
+
+
+def decode_response(body):
+    """
+    Decode a response frame body.
+
+    Returns:
+        tuple: (request ID, result or xmlrpc.client.Fault)
+    """
+    try:
+        request_id, status = _RESPONSE_HEAD.unpack_from(body)
+    except struct.error as e:
+        raise ProtocolError(f"malformed response: {e}") from None
+    value, end = decode_value(body, _RESPONSE_HEAD.size)
+    if end != len(body):
+        raise ProtocolError("trailing data in response")
+    if status == STATUS_FAULT:
+        return request_id, xmlrpc.client.Fault(*value)
+    return request_id, value
+
+
+def frame_length(prefix):
+    """
+    Return the body length announced by a 4-byte frame prefix.
+
+    Raises:
+        ProtocolError: If it exceeds MAX_FRAME
+    """
+    length = _LENGTH.unpack(prefix)[0]
+    if length > MAX_FRAME:
+        raise ProtocolError(f"frame of {length} bytes exceeds the {MAX_FRAME} byte limit")
+    return length
+
+
+def read_frame(stream):
+    """
+    Read one frame body from a binary file-like object.
+
+    Returns:
+        bytes or None: The body, or None if the peer closed the connection
+        between frames
+
+    Raises:
+        ProtocolError: If the frame is too large or cut short
+    """
+    prefix = stream.read(_LENGTH.size)
+    if not prefix:
+        return None
+    if len(prefix) < _LENGTH.size:
+        raise ProtocolError("connection closed inside a frame")
+    length = frame_length(prefix)
+    body = stream.read(length)
+    if len(body) < length:
+        raise ProtocolError("connection closed inside a frame")
+    return body
+
+
+# ----------------------------------------------------------------------
+# Server
+# ----------------------------------------------------------------------
+
+class BinaryRPCHandler(socketserver.StreamRequestHandler):
+    """Answers the frames of one persistent connection, in order."""
+
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def handle(self):
+        dispatch = self.server.dispatch
+        while True:
+            try:
+                body = read_frame(self.rfile)
+                if body is None:
+                    return
+            except (ProtocolError, OSError):
+                return  # Can't find the next frame boundary; drop the connection
+            try:
+                request_id, method, params = decode_request(body)
+            except ProtocolError as e:
+                # The frame was read whole, so the next one can still be found
+                if len(body) < _REQUEST_HEAD.size:
+                    return
+                request_id = _REQUEST_HEAD.unpack_from(body)[0]
+                response = encode_response(request_id, STATUS_FAULT, [xmlrpc.client.INVALID_XMLRPC, str(e)])
+            else:
+                try:
+                    response = encode_response(request_id, STATUS_OK, dispatch(method, params))
+                except Exception as e:
+                    fault = [e.faultCode, e.faultString] if isinstance(e, xmlrpc.client.Fault) \
+                        else [1, f"{type(e)}:{e}"]
+                    response = encode_response(request_id, STATUS_FAULT, fault)
+            try:
+                self.wfile.write(response)
+            except OSError:
+                return
+
+
+class BinaryRPCServer(socketserver.ThreadingTCPServer):
+    """
+    Binary RPC endpoint: one thread per persistent connection, at most
+    `max_connections` of them.
+
+    Args:
+        address (tuple): (host, port) to listen on
+        dispatch (callable): dispatch(method, params) -> result, e.g. the
+            _dispatch() of the XML-RPC server whose methods it shares
+        max_connections (int): Connections served at once; more are closed
+            as soon as they are accepted
+
+    Raises:
+        ValueError: If max_connections is below 1
+    """
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address, dispatch, max_connections=DEFAULT_MAX_CONNECTIONS):
+        if max_connections < 1:
+            raise ValueError("max_connections must be at least 1")
+        self.dispatch = dispatch
+        self.max_connections = max_connections
+        self.rejected = 0  # Only changed by the thread accepting connections
+        self._slots = threading.BoundedSemaphore(max_connections)
+        super().__init__(address, BinaryRPCHandler)
+
+    def process_request(self, request, client_address):
+        """Serve a new connection on a thread of its own, or close it if none is free."""
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            self.shutdown_request(request)
+            return
+        try:
+            super().process_request(request, client_address)
+        except BaseException:
+            self._slots.release()  # The thread never started
+            raise
+
+    def process_request_thread(self, request, client_address):
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            self._slots.release()
+
+
+# ----------------------------------------------------------------------
+# Client
+# ----------------------------------------------------------------------
+
+class BinaryRPCClient:
+    """
+    Blocking client for BinaryRPCServer over one persistent connection.
+
+    Args:
+        address (tuple): (host, port) of the binary endpoint
+        timeout (float): Socket timeout in seconds
+
+    client.add(1, 2) is client.call('add', 1, 2). Calls from several threads
+    are serialized on the connection.
+    """
+
+    def __init__(self, address=('127.0.0.1', BINARY_PORT), timeout=10.0):
+        self.address = address
+        self.timeout = timeout
+        self._sock = None
+        self._stream = None
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return lambda *params: self.call(name, *params)
+
+    def call(self, method, *params):
+        """
+        Call one remote method and wait for its result.
+
+        Raises:
+            xmlrpc.client.Fault: If the method failed on the server
+            OSError, ProtocolError: If the connection failed
+        """
+        result = self.pipeline([(method, params)])[0]
+        if isinstance(result, xmlrpc.client.Fault):
+            raise result
+        return result
+
+    def pipeline(self, calls):
+        """
+        Send several calls back to back, then collect all the answers.
+
+        Args:
+            calls (list): (method, params) pairs
+
+        Returns:
+            list: Results in the order of `calls`; a call that failed on the
+            server has its xmlrpc.client.Fault in its place (not raised)
+        """
+        with self._lock:
+            if self._sock is None:
+                self._connect()
+            try:
+                results = []
+                window, frames, size = [], [], 0
+                for i, (method, params) in enumerate(calls):
+                    frame = encode_request(self._next_id, method, params)
+                    window.append(self._next_id)
+                    frames.append(frame)
+                    size += len(frame)
+                    self._next_id = (self._next_id + 1) & 0xFFFFFFFF
+                    if len(window) >= PIPELINE_WINDOW or size >= PIPELINE_BYTES or i == len(calls) - 1:
+                        self._sock.sendall(b''.join(frames))
+                        self.bytes_sent += size
+                        results += self._receive(window)
+                        window, frames, size = [], [], 0
+                return results
+            except BaseException:
+                self._disconnect()  # Answers may be half-read; start over next time
+                raise
+
+    def _receive(self, request_ids):
+        """Read the answers to `request_ids` and return them in that order."""
+        answers = {}
+        while len(answers) < len(request_ids):
+            body = read_frame(self._stream)
+            if body is None:
+                raise ProtocolError("server closed the connection")
+            self.bytes_received += _LENGTH.size + len(body)
+            request_id, value = decode_response(body)
+            answers[request_id] = value
+        return [answers[request_id] for request_id in request_ids]
+
+    def _connect(self):
+        self._sock = socket.create_connection(self.address, timeout=self.timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._stream = self._sock.makefile('rb')
+
+    def _disconnect(self):
+        if self._sock is not None:
+            self._stream.close()
+            self._sock.close()
+        self._sock = self._stream = None
+
+    def close(self):
+        """Close the connection (the next call opens a new one)."""
+        with self._lock:
+            self._disconnect()
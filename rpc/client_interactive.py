@@ -8,6 +8,8 @@ Features:
 - User can input custom names for the greet() method
 - Error handling and user-friendly feedback
 - Multiple calls in one session
+- Bulk mode: many add/multiply calls batched into a few requests
+  (system.multicall, see batching.py)
 
 Usage:
 1. Start the RPC server: python server.py
@@ -15,12 +17,19 @@ Usage:
 3. Follow the interactive prompts
 """
 
-import xmlrpc.client
+import random
 import sys
+import time
+import xmlrpc.client
+
+from batching import CallBatcher
 
 # Server endpoint URL
 HOST = 'http://127.0.0.1:9001'
 
+# Calls per system.multicall request in bulk mode
+BULK_BATCH_SIZE = 500
+
 print("=" * 70)
 print("RPC INTERACTIVE CLIENT - Remote Procedure Call Demo")
 print("=" * 70)
@@ -46,6 +55,7 @@ try:
     print("  3. multiply(a, b)        : Multiply two numbers")
     print("  4. get_server_info()     : Get server information")
     print("  5. echo(message)         : Echo a message")
+    print("  6. bulk add/multiply     : Many calls, batched into few requests")
     print("=" * 70)
     
     call_count = 0
@@ -58,10 +68,11 @@ try:
         print("  3. multiply(a, b)")
         print("  4. get_server_info()")
         print("  5. echo(message)")
-        print("  6. Exit")
+        print("  6. bulk add/multiply (batched)")
+        print("  7. Exit")
         print("-" * 70)
         
-        choice = input("Enter your choice (1-6): ").strip()
+        choice = input("Enter your choice (1-7): ").strip()
         
         if choice == '1':
             # Call greet method
@@ -141,11 +152,38 @@ try:
                 print(f"[ERROR] {e}")
         
         elif choice == '6':
+            # Random add/multiply calls, sent BULK_BATCH_SIZE at a time
+            try:
+                count = int(input("\nHow many calls? "))
+                if count < 1:
+                    print("[WARNING] Enter a positive number.")
+                    continue
+                
+                print(f"\n[RPC CALL] Invoking {count} x add/multiply in batches of {BULK_BATCH_SIZE}")
+                start = time.perf_counter()
+                with CallBatcher(HOST, max_batch=BULK_BATCH_SIZE) as batcher:
+                    futures = [batcher.call(random.choice(('add', 'multiply')),
+                                            random.randint(0, 1000), random.randint(0, 1000))
+                               for _ in range(count)]
+                elapsed = time.perf_counter() - start
+                failed = sum(1 for f in futures if f.exception() is not None)
+                call_count += count - failed
+                print(f"[RESPONSE] First results: {[f.result() for f in futures[:5] if f.exception() is None]}")
+                print(f"[SUCCESS] {count - failed} calls in {batcher.round_trips} round trip(s), "
+                      f"{elapsed * 1000:.0f} ms ({count / elapsed:,.0f} calls/s)")
+                if failed:
+                    print(f"[ERROR] {failed} calls failed: {next(f.exception() for f in futures if f.exception())}")
+            except ValueError:
+                print("[ERROR] Invalid number format.")
+            except Exception as e:
+                print(f"[ERROR] {e}")
+        
+        elif choice == '7':
             print("\n[CLIENT] Exiting...")
             break
         
         else:
-            print("[WARNING] Invalid choice. Please enter 1-6.")
+            print("[WARNING] Invalid choice. Please enter 1-7.")
     
     print("\n" + "=" * 70)
     print(f"[SUMMARY] Total remote calls made: {call_count}")
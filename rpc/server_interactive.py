@@ -9,160 +9,441 @@ Available Remote Methods:
 - multiply(a: int, b: int) -> int
 - get_server_info() -> dict
 - echo(message: str) -> str
+- add_many(a, b) -> list or blob          (element-wise, whole arrays per call)
+- multiply_many(a, b) -> list or blob
+- system.multicall(calls: list) -> list   (many of the above in one request)
 
 Features:
 - Multiple remote methods exposed
 - Request logging with timestamps
 - Graceful shutdown handling
+- Concurrent serving from a bounded pool of threads (or processes)
+- Batched calls through system.multicall (see batching.py for the client side)
+- The same methods over a compact binary protocol on BINARY_PORT
+  (persistent connections, pipelining; see binary_rpc.py)
+- Batch arithmetic on whole arrays, sent as lists or as packed float64
+  blobs (NumPy when installed, stdlib otherwise; see vectors.py)
+
+Serving Modes (--mode):
+-----------------------
+- serial:    one call at a time, like SimpleXMLRPCServer.serve_forever();
+             a slow client or a large echo payload stalls everyone else
+- threads:   (default) connections are handled by a fixed pool of
+             --workers threads; at most --queue-depth more wait for a
+             free thread, anything beyond that is answered with
+             503 Service Unavailable instead of piling up
+- processes: like threads, but the methods themselves run in a pool of
+             --processes worker processes, so CPU-heavy calls can use
+             more than one core (the threads only do the HTTP/XML work)
+
+Binary connections are long-lived, so each gets its own thread rather
+than a slot in the pool above; at most --binary-connections are served at
+once and any more are closed right away. --binary-port 0 turns the
+endpoint off.
+
+Call numbers and statistics are kept in AtomicCounter objects, so
+concurrent calls never lose an increment. See bench_concurrency.py for
+throughput versus the number of concurrent clients.
 
 Usage:
 1. Start this server: python server_interactive.py
+   (or e.g. python server_interactive.py --workers 16 --queue-depth 128)
 2. Start the interactive client: python client_interactive.py
 """
 
-from xmlrpc.server import SimpleXMLRPCServer
+import argparse
 import datetime
+import os
+import threading
+import xmlrpc.client
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from xmlrpc.server import SimpleXMLRPCServer
+
+import vectors
+from binary_rpc import BINARY_PORT, DEFAULT_MAX_CONNECTIONS, BinaryRPCServer
 
 # Server configuration
 HOST = '127.0.0.1'
 PORT = 9001
 
-# Request counter for logging
-request_counter = 0
+# Defaults of the concurrent serving modes
+SERVING_MODES = ('serial', 'threads', 'processes')
+DEFAULT_WORKERS = 8
+DEFAULT_QUEUE_DEPTH = 64
+
+# Pending connections the OS queues before accept() (SimpleXMLRPCServer: 5)
+LISTEN_BACKLOG = 128
+
+# Logged parameters are cut to this many characters (echo payloads can be large)
+MAX_LOGGED_PARAM = 60
+
+# Answer to a connection that finds the pool and its queue full
+BUSY_RESPONSE = (b"HTTP/1.0 503 Service Unavailable\r\n"
+                 b"Content-Length: 0\r\nRetry-After: 1\r\nConnection: close\r\n\r\n")
+
+# Methods that must run in the server process itself (they read its counters)
+LOCAL_METHODS = {'get_server_info'}
+
+
+class AtomicCounter:
+    """An integer counter that is safe to increment from several threads."""
+
+    def __init__(self):
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def increment(self):
+        """Add one and return the new value."""
+        with self._lock:
+            self._value += 1
+            return self._value
+
+    @property
+    def value(self):
+        return self._value
+
+
+# Request counters for logging and get_server_info()
+request_counter = AtomicCounter()
+rejected_counter = AtomicCounter()
+
+# The running server (set by main(); read by get_server_info())
+server = None
 
 
 def greet(name):
     """
     Remote method: Generate a personalized greeting.
-    
+
     Args:
         name (str): Name of the person to greet
-        
+
     Returns:
         str: Personalized greeting message
     """
-    global request_counter
-    request_counter += 1
-    log_request('greet', f"name='{name}'")
     return f"Hello {name}, this is the server!"
 
 
 def add(a, b):
     """
     Remote method: Add two numbers.
-    
+
     Args:
         a (int/float): First number
         b (int/float): Second number
-        
+
     Returns:
         int/float: Sum of a and b
     """
-    global request_counter
-    request_counter += 1
-    log_request('add', f"a={a}, b={b}")
-    result = a + b
-    print(f"    → Result: {result}")
-    return result
+    return a + b
 
 
 def multiply(a, b):
     """
     Remote method: Multiply two numbers.
-    
+
     Args:
         a (int/float): First number
         b (int/float): Second number
-        
+
     Returns:
         int/float: Product of a and b
     """
-    global request_counter
-    request_counter += 1
-    log_request('multiply', f"a={a}, b={b}")
-    result = a * b
-    print(f"    → Result: {result}")
-    return result
+    return a * b
 
 
 def get_server_info():
     """
     Remote method: Get server information.
-    
+
     Returns:
         dict: Dictionary containing server details
     """
-    global request_counter
-    request_counter += 1
-    log_request('get_server_info', 'no parameters')
-    
     info = {
         'server_type': 'XML-RPC',
         'host': HOST,
-        'port': PORT,
-        'total_requests': request_counter,
+        'port': server.server_address[1] if server else PORT,
+        'total_requests': request_counter.value,
         'timestamp': str(datetime.datetime.now())
     }
+    if server is not None:
+        info.update(server.describe())
     return info
 
 
 def echo(message):
     """
     Remote method: Echo back the received message.
-    
+
     Args:
         message (str): Message to echo
-        
+
     Returns:
         str: The same message with prefix
     """
-    global request_counter
-    request_counter += 1
-    log_request('echo', f"message='{message}'")
     return f"Server echoes: {message}"
 
 
-def log_request(method_name, params):
-    """Log an incoming RPC request."""
+def add_many(a, b):
+    """
+    Remote method: Add two arrays element by element.
+
+    Args:
+        a, b (list or blob): Equal-length lists of numbers, or blobs from
+            vectors.pack_floats() (xmlrpc.client.Binary or bytes)
+
+    Returns:
+        list or blob: a[i] + b[i] for every i, in the form of the operands
+
+    Raises:
+        xmlrpc.client.Fault: If the operands are invalid (see vectors.elementwise)
+    """
+    return vectors.elementwise('add', a, b)
+
+
+def multiply_many(a, b):
+    """
+    Remote method: Multiply two arrays element by element.
+
+    Args:
+        a, b (list or blob): Equal-length lists of numbers, or blobs from
+            vectors.pack_floats() (xmlrpc.client.Binary or bytes)
+
+    Returns:
+        list or blob: a[i] * b[i] for every i, in the form of the operands
+
+    Raises:
+        xmlrpc.client.Fault: If the operands are invalid (see vectors.elementwise)
+    """
+    return vectors.elementwise('multiply', a, b)
+
+
+# Every remote method, by the name clients call it with
+RPC_METHODS = {
+    'greet': greet,
+    'add': add,
+    'multiply': multiply,
+    'get_server_info': get_server_info,
+    'echo': echo,
+    'add_many': add_many,
+    'multiply_many': multiply_many
+}
+
+
+def format_params(params):
+    """Render call parameters for the log, shortening long values."""
+    shown = []
+    for value in params:
+        # Batch operands can hold millions of numbers: don't render them
+        if isinstance(value, (list, tuple)) and len(value) > 8:
+            shown.append(f"[{len(value)} items]")
+            continue
+        if isinstance(value, xmlrpc.client.Binary):
+            value = value.data
+        if isinstance(value, (bytes, bytearray)):
+            shown.append(f"<{len(value)} bytes>")
+            continue
+        text = repr(value)
+        if len(text) > MAX_LOGGED_PARAM:
+            text = f"{text[:MAX_LOGGED_PARAM]}... ({len(text)} chars)"
+        shown.append(text)
+    return ', '.join(shown) or 'no parameters'
+
+
+def log_request(number, method_name, params, result):
+    """Log a finished RPC call (one print, so concurrent calls don't interleave)."""
     timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    print(f"\n[{timestamp}] RPC Call #{request_counter}")
-    print(f"  Method: {method_name}({params})")
-
-
-print("=" * 70)
-print("RPC INTERACTIVE SERVER - Remote Procedure Call Demo (XML-RPC)")
-print("=" * 70)
-print(f"Configuration:")
-print(f"  - Host: {HOST}")
-print(f"  - Port: {PORT}")
-print(f"  - Protocol: XML-RPC")
-print("\nExposed Remote Methods:")
-print("  1. greet(name: str) -> str")
-print("  2. add(a: int, b: int) -> int")
-print("  3. multiply(a: int, b: int) -> int")
-print("  4. get_server_info() -> dict")
-print("  5. echo(message: str) -> str")
-print("=" * 70)
-
-# Create XML-RPC server
-server = SimpleXMLRPCServer((HOST, PORT), allow_none=True)
-
-# Register all remote methods
-server.register_function(greet, 'greet')
-server.register_function(add, 'add')
-server.register_function(multiply, 'multiply')
-server.register_function(get_server_info, 'get_server_info')
-server.register_function(echo, 'echo')
-
-print(f"\n[SERVER] ✓ XML-RPC Server listening on {HOST}:{PORT}")
-print("[SERVER] All methods registered and ready!")
-print("[INFO] Press Ctrl+C to stop the server")
-print("-" * 70)
-
-try:
-    server.serve_forever()
-except KeyboardInterrupt:
-    print(f'\n\n[SERVER] Received shutdown signal')
-    print(f"[SUMMARY] Total RPC calls processed: {request_counter}")
-    print('[SERVER] Shutting down...')
+    print(f"\n[{timestamp}] RPC Call #{number}\n"
+          f"  Method: {method_name}({format_params(params)})\n"
+          f"    → Result: {format_params([result])}")
+
+
+class ConcurrentXMLRPCServer(SimpleXMLRPCServer):
+    """
+    XML-RPC server that serves connections from a bounded worker pool.
+
+    Args:
+        address (tuple): (host, port) to listen on
+        mode (str): "serial", "threads" or "processes" (see module docstring)
+        workers (int): Threads handling connections (threads/processes modes)
+        queue_depth (int): Connections allowed to wait for a free thread
+        processes (int): Processes running the methods (processes mode)
+        quiet (bool): Don't log every call
+
+    Raises:
+        ValueError: If the mode is unknown or a pool size is out of range
+    """
+
+    request_queue_size = LISTEN_BACKLOG
+
+    def __init__(self, address, mode='threads', workers=DEFAULT_WORKERS,
+                 queue_depth=DEFAULT_QUEUE_DEPTH, processes=None, quiet=False):
+        if mode not in SERVING_MODES:
+            raise ValueError(f"mode must be one of: {', '.join(SERVING_MODES)}")
+        if workers < 1 or queue_depth < 0:
+            raise ValueError("workers must be at least 1 and queue_depth at least 0")
+        super().__init__(address, allow_none=True, logRequests=False)
+        self.mode = mode
+        self.workers = workers if mode != 'serial' else 1
+        self.queue_depth = queue_depth if mode != 'serial' else 0
+        self.quiet = quiet
+        self._threads = None
+        self._processes = None
+        self._slots = None
+        if mode != 'serial':
+            self._threads = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='rpc-worker')
+            # Connections being served plus those waiting for a thread
+            self._slots = threading.BoundedSemaphore(workers + queue_depth)
+        if mode == 'processes':
+            self.processes = processes or os.cpu_count() or 1
+            self._processes = ProcessPoolExecutor(max_workers=self.processes)
+
+    def describe(self):
+        """Return the serving configuration and counters for get_server_info()."""
+        info = {'mode': self.mode, 'workers': self.workers, 'queue_depth': self.queue_depth,
+                'rejected_connections': rejected_counter.value}
+        if self._processes is not None:
+            info['processes'] = self.processes
+        return info
+
+    def process_request(self, request, client_address):
+        """Hand a new connection to the pool, or turn it away if the queue is full."""
+        if self._threads is None:
+            return super().process_request(request, client_address)
+        if not self._slots.acquire(blocking=False):
+            rejected_counter.increment()
+            try:
+                request.sendall(BUSY_RESPONSE)
+            except OSError:
+                pass
+            self.shutdown_request(request)
+            return
+        try:
+            self._threads.submit(self._process_in_worker, request, client_address)
+        except RuntimeError:  # Pool already shut down
+            self._slots.release()
+            self.shutdown_request(request)
+
+    def _process_in_worker(self, request, client_address):
+        """Worker thread: serve one connection, then free its slot."""
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._slots.release()
+
+    def _dispatch(self, method, params):
+        """Run one call (also each call of a system.multicall), counting and logging it."""
+        func = RPC_METHODS.get(method)
+        if func is None:
+            # system.multicall, which dispatches each of its calls back here
+            return super()._dispatch(method, params)
+        number = request_counter.increment()
+        if self._processes is not None and method not in LOCAL_METHODS:
+            result = self._processes.submit(func, *params).result()
+        else:
+            result = func(*params)
+        if not self.quiet:
+            log_request(number, method, params, result)
+        return result
+
+    def server_close(self):
+        """Stop accepting, then let the pools finish what they already started."""
+        super().server_close()
+        if self._threads is not None:
+            self._threads.shutdown(wait=True)
+        if self._processes is not None:
+            self._processes.shutdown(wait=True)
+
+
+def main():
+    global server
+    parser = argparse.ArgumentParser(description="XML-RPC demo server")
+    parser.add_argument('--host', default=HOST, help=f"address to listen on (default: {HOST})")
+    parser.add_argument('--port', type=int, default=PORT, help=f"port to listen on (default: {PORT})")
+    parser.add_argument('--mode', choices=SERVING_MODES, default='threads',
+                        help="how calls are served (default: threads)")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f"threads serving connections (default: {DEFAULT_WORKERS})")
+    parser.add_argument('--queue-depth', type=int, default=DEFAULT_QUEUE_DEPTH,
+                        help=f"connections allowed to wait for a thread (default: {DEFAULT_QUEUE_DEPTH})")
+    parser.add_argument('--processes', type=int, default=None,
+                        help="processes running the methods in processes mode (default: one per CPU core)")
+    parser.add_argument('--binary-port', type=int, default=BINARY_PORT,
+                        help=f"port of the binary protocol endpoint, 0 to disable (default: {BINARY_PORT})")
+    parser.add_argument('--binary-connections', type=int, default=DEFAULT_MAX_CONNECTIONS,
+                        help=f"binary connections served at once (default: {DEFAULT_MAX_CONNECTIONS})")
+    parser.add_argument('--quiet', action='store_true', help="don't log every call")
+    args = parser.parse_args()
+
+    try:
+        server = ConcurrentXMLRPCServer((args.host, args.port), args.mode, args.workers,
+                                        args.queue_depth, args.processes, args.quiet)
+        # Shares the XML-RPC server's methods, counters and log
+        binary_server = None
+        if args.binary_port:
+            binary_server = BinaryRPCServer((args.host, args.binary_port), server._dispatch,
+                                            args.binary_connections)
+    except ValueError as e:
+        parser.error(str(e))
+
+    print("=" * 70)
+    print("RPC INTERACTIVE SERVER - Remote Procedure Call Demo (XML-RPC)")
     print("=" * 70)
+    print(f"Configuration:")
+    print(f"  - Host: {args.host}")
+    print(f"  - Port: {args.port}")
+    print(f"  - Protocol: XML-RPC")
+    if binary_server is not None:
+        print(f"  - Binary protocol port: {args.binary_port} (up to {args.binary_connections} connections)")
+    if server.mode == 'serial':
+        print(f"  - Serving: serial (one call at a time)")
+    else:
+        processes = f", methods in {server.processes} processes" if server.mode == 'processes' else ""
+        print(f"  - Serving: {server.workers} threads, queue depth {server.queue_depth}{processes}")
+    print("\nExposed Remote Methods:")
+    print("  1. greet(name: str) -> str")
+    print("  2. add(a: int, b: int) -> int")
+    print("  3. multiply(a: int, b: int) -> int")
+    print("  4. get_server_info() -> dict")
+    print("  5. echo(message: str) -> str")
+    print(f"  6. add_many(a, b) / multiply_many(a, b) -> list or blob ({vectors.BACKEND})")
+    print("  +  system.multicall(calls: list) -> list")
+    print("=" * 70)
+
+    # Register all remote methods
+    for name, func in RPC_METHODS.items():
+        server.register_function(func, name)
+    # One request can carry many calls: [{'methodName': ..., 'params': [...]}, ...]
+    server.register_multicall_functions()
+
+    print(f"\n[SERVER] ✓ XML-RPC Server listening on {args.host}:{args.port}")
+    if binary_server is not None:
+        threading.Thread(target=binary_server.serve_forever, name='binary-rpc', daemon=True).start()
+        print(f"[SERVER] ✓ Binary RPC Server listening on {args.host}:{args.binary_port}")
+    print("[SERVER] All methods registered and ready!")
+    print("[INFO] Press Ctrl+C to stop the server")
+    print("-" * 70)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f'\n\n[SERVER] Received shutdown signal')
+        print(f"[SUMMARY] Total RPC calls processed: {request_counter.value}")
+        if rejected_counter.value:
+            print(f"[SUMMARY] Connections turned away (queue full): {rejected_counter.value}")
+        if binary_server is not None and binary_server.rejected:
+            print(f"[SUMMARY] Binary connections turned away (limit reached): {binary_server.rejected}")
+        print('[SERVER] Shutting down...')
+        print("=" * 70)
+    finally:
+        if binary_server is not None:
+            binary_server.shutdown()
+            binary_server.server_close()
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""
+Vectors - Element-wise Arithmetic on Whole Arrays
+=================================================
+Backs the add_many() and multiply_many() remote methods: instead of one
+RPC per pair of operands, a caller sends two whole arrays and gets the
+element-wise results back in a single call.
+
+Operands:
+---------
+Either form may be used, as long as both operands use the same one:
+- lists of numbers: plain XML-RPC arrays (every element is its own XML
+  element); the result is a list. Elements must be ints or floats (not
+  bools); each result is what Python's + or * gives for that pair, so
+  int + int stays an exact int and int + float is a float
+- blobs: the numbers packed as little-endian float64 (8 bytes each) in an
+  xmlrpc.client.Binary (base64 in XML-RPC) or plain bytes (binary
+  protocol); the result is a blob of the same kind. pack_floats() and
+  unpack_floats() convert to and from blobs
+
+Backends:
+---------
+NumPy computes the results when it is installed; otherwise the stdlib
+array module does, with identical results. BACKEND names the one in use.
+For lists NumPy is only used when every element is a float: float64
+arithmetic is exactly Python's, while ints would lose precision or
+overflow int64. Lists holding ints always take the stdlib path.
+
+Errors:
+-------
+Bad operands (mismatched forms or lengths, non-numeric elements) raise
+xmlrpc.client.Fault with code xmlrpc.client.INVALID_METHOD_PARAMS, which
+reaches the caller as is over both XML-RPC and the binary protocol.
+
+Usage:
+    a, b = pack_floats([1.5, 2.0]), pack_floats([2.0, 4.0])
+    unpack_floats(elementwise('multiply', a, b))    # -> array('d', [3.0, 8.0])
+"""
+
+import operator
+import sys
+import xmlrpc.client
+from array import array
+
+try:
+    import numpy
+except ImportError:  # Optional: the stdlib fallback gives the same results
+    numpy = None
+
+BACKEND = 'numpy' if numpy is not None else 'stdlib'
+BACKENDS = ('numpy', 'stdlib') if numpy is not None else ('stdlib',)
+
+# Supported operations
+OPERATIONS = {'add': operator.add, 'multiply': operator.mul}
+
+# Wire format of a blob element: little-endian IEEE 754 float64
+ITEM_SIZE = 8
+_NUMPY_DTYPE = '<f8'
+
+
+def pack_floats(values, binary=True):
+    """
+    Pack numbers as a blob of little-endian float64s.
+
+    Args:
+        values (iterable): The numbers
+        binary (bool): Wrap the bytes in an xmlrpc.client.Binary (for XML-RPC)
+
+    Returns:
+        xmlrpc.client.Binary or bytes: The blob
+    """
+    packed = array('d', values)
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    data = packed.tobytes()
+    return xmlrpc.client.Binary(data) if binary else data
+
+
+def unpack_floats(blob):
+    """
+    Unpack a blob made by pack_floats().
+
+    Returns:
+        array: array('d') of the numbers
+
+    Raises:
+        ValueError: If the blob's size isn't a multiple of ITEM_SIZE
+    """
+    data = blob.data if isinstance(blob, xmlrpc.client.Binary) else blob
+    if len(data) % ITEM_SIZE:
+        raise ValueError(f"blob size {len(data)} is not a multiple of {ITEM_SIZE}")
+    values = array('d')
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def is_blob(value):
+    return isinstance(value, (xmlrpc.client.Binary, bytes, bytearray))
+
+
+def invalid_operands(message):
+    """Return the Fault reported for bad add_many()/multiply_many() operands."""
+    return xmlrpc.client.Fault(xmlrpc.client.INVALID_METHOD_PARAMS, message)
+
+
+def elementwise(operation, a, b, backend=None):
+    """
+    Apply `operation` to each pair of elements of `a` and `b`.
+
+    Args:
+        operation (str): "add" or "multiply"
+        a, b: Two lists, or two blobs (see module docstring), of equal length
+        backend (str or None): One of BACKENDS (default: BACKEND)
+
+    Returns:
+        list or blob: The results, in the same form as the operands
+
+    Raises:
+        xmlrpc.client.Fault: If the operands are not two lists or two blobs,
+            differ in length, or a list holds something other than numbers
+        ValueError: If the operation or backend is unknown
+    """
+    if operation not in OPERATIONS:
+        raise ValueError(f"operation must be one of: {', '.join(OPERATIONS)}")
+    backend = backend or BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"backend must be one of: {', '.join(BACKENDS)}")
+    if is_blob(a) and is_blob(b):
+        data_a = a.data if isinstance(a, xmlrpc.client.Binary) else a
+        data_b = b.data if isinstance(b, xmlrpc.client.Binary) else b
+        if len(data_a) != len(data_b):
+            raise invalid_operands("operands must have the same length")
+        if len(data_a) % ITEM_SIZE:
+            raise invalid_operands(f"blob size {len(data_a)} is not a multiple of {ITEM_SIZE}")
+        result = _blob_op(operation, data_a, data_b, backend)
+        return xmlrpc.client.Binary(result) if isinstance(a, xmlrpc.client.Binary) else result
+    if isinstance(a, (list, tuple)) and isinstance(b, (list, tuple)):
+        if len(a) != len(b):
+            raise invalid_operands("operands must have the same length")
+        return _list_op(operation, a, b, backend)
+    raise invalid_operands("operands must be two lists or two binary blobs")
+
+
+def _blob_op(operation, data_a, data_b, backend):
+    """Element-wise operation on two packed blobs, returning a packed blob."""
+    if backend == 'numpy':
+        x = numpy.frombuffer(data_a, dtype=_NUMPY_DTYPE)
+        y = numpy.frombuffer(data_b, dtype=_NUMPY_DTYPE)
+        return _numpy_op(operation, x, y).astype(_NUMPY_DTYPE, copy=False).tobytes()
+    x, y = unpack_floats(data_a), unpack_floats(data_b)
+    return pack_floats(map(OPERATIONS[operation], x, y), binary=False)
+
+
+def _list_op(operation, a, b, backend):
+    """Element-wise operation on two lists of numbers, returning a list."""
+    # type() rather than isinstance(): bool is a subclass of int
+    kinds = set(map(type, a)) | set(map(type, b))
+    if not kinds <= {int, float}:
+        bad = sorted(kind.__name__ for kind in kinds - {int, float})
+        raise invalid_operands(f"list elements must be numbers, not {', '.join(bad)}")
+    if backend == 'numpy' and kinds == {float}:
+        return _numpy_op(operation, numpy.asarray(a, dtype=float), numpy.asarray(b, dtype=float)).tolist()
+    return list(map(OPERATIONS[operation], a, b))
+
+
+def _numpy_op(operation, x, y):
+    """NumPy element-wise operation, silent on overflow and NaN like Python floats."""
+    with numpy.errstate(all='ignore'):
+        return getattr(numpy, operation)(x, y)
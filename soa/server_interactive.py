@@ -20,6 +20,40 @@ import socket
 HOST = '127.0.0.1'
 PORT = 9000
 
+
+def generate_response(message, count):
+    """
+    Generate an intelligent response based on the received message.
+    
+    Args:
+        message (str): The message received from client
+        count (int): The message sequence number
+        
+    Returns:
+        str: The response to send back
+    """
+    msg_lower = message.lower().strip()
+    
+    # Predefined responses for common messages
+    if msg_lower == 'i am client':
+        return 'I am Server'
+    elif 'hello' in msg_lower or 'hi' in msg_lower:
+        return 'Hello! Nice to hear from you.'
+    elif 'nice to meet you' in msg_lower:
+        return 'Nice to meet you too!'
+    elif 'how are you' in msg_lower:
+        return 'I am functioning optimally. Thank you for asking!'
+    elif 'bye' in msg_lower or 'goodbye' in msg_lower:
+        return 'Goodbye! Thanks for connecting.'
+    elif 'help' in msg_lower:
+        return 'I am a simple SOA server. I respond to your messages!'
+    elif '?' in message:
+        return f'That is an interesting question! (Message #{count})'
+    else:
+        # Default echo response with confirmation
+        return f'Server received: "{message}" (Message #{count})'
+
+
 print("=" * 60)
 print("SOA INTERACTIVE SERVER")
 print("=" * 60)
@@ -86,36 +120,3 @@ with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
         print('[CONNECTION] Client disconnected')
         print('[SERVER] Shutting down...')
         print("=" * 60)
-
-
-def generate_response(message, count):
-    """
-    Generate an intelligent response based on the received message.
-    
-    Args:
-        message (str): The message received from client
-        count (int): The message sequence number
-        
-    Returns:
-        str: The response to send back
-    """
-    msg_lower = message.lower().strip()
-    
-    # Predefined responses for common messages
-    if msg_lower == 'i am client':
-        return 'I am Server'
-    elif 'hello' in msg_lower or 'hi' in msg_lower:
-        return 'Hello! Nice to hear from you.'
-    elif 'nice to meet you' in msg_lower:
-        return 'Nice to meet you too!'
-    elif 'how are you' in msg_lower:
-        return 'I am functioning optimally. Thank you for asking!'
-    elif 'bye' in msg_lower or 'goodbye' in msg_lower:
-        return 'Goodbye! Thanks for connecting.'
-    elif 'help' in msg_lower:
-        return 'I am a simple SOA server. I respond to your messages!'
-    elif '?' in message:
-        return f'That is an interesting question! (Message #{count})'
-    else:
-        # Default echo response with confirmation
-        return f'Server received: "{message}" (Message #{count})'